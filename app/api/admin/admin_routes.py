@@ -2,12 +2,16 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 
+from app.core.metrics import metrics
+from app.db.mongo_indexes import get_index_manager
 from app.db.session import get_db
 from app.db.models.admin_user import AdminUser  # your actual Admin model
 from app.schemas.admin_user import AdminUserCreate  # your actual schema
 from app.services.admin_service import create_admin_service
+from app.services.serpapi_budget import get_serpapi_budget
+from app.core.responses import FastJSONRoute
 
-router = APIRouter()
+router = APIRouter(route_class=FastJSONRoute)
 
 @router.post("/create", status_code=201)
 async def create_admin(payload: AdminUserCreate, db: AsyncSession = Depends(get_db)):
@@ -15,6 +19,15 @@ async def create_admin(payload: AdminUserCreate, db: AsyncSession = Depends(get_
     print("admin", admin)
     return {"message": "Admin created successfully", "admin_id": admin.id}
 
+@router.get("/metrics")
+async def get_metrics():
+    return metrics.snapshot()
 
+@router.get("/indexes")
+async def get_index_status():
+    return get_index_manager().report()
 
 
+@router.get("/serpapi-budget")
+async def get_serpapi_budget_status():
+    return get_serpapi_budget().report()
\ No newline at end of file
@@ -0,0 +1,52 @@
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.session import get_db
+from app.core.auth import require_admin
+from app.core.responses import FastJSONRoute
+from app.schemas.article import ArticleCreate, ArticleListResponse, ArticleResponse, ArticleUpdate
+from app.services.article_service import (
+    ARTICLE_CACHE_CONTROL,
+    ARTICLE_LIST_MAX_LIMIT,
+    create_article_service,
+    delete_article_service,
+    get_article_cache,
+    update_article_service,
+)
+from app.utils.http_cache import cached_json_response
+
+router = APIRouter(route_class=FastJSONRoute)
+
+# Public reads are served from the rendered-response cache and never open a DB session on a hit
+
+@router.get("", response_model=ArticleListResponse)
+async def list_articles(
+    request: Request,
+    page: int = Query(1, ge=1),
+    limit: int = Query(20, ge=1, le=ARTICLE_LIST_MAX_LIMIT),
+    category: Optional[str] = None,
+    tag: Optional[str] = None,
+):
+    rendered = await get_article_cache().listing(page, limit, category, tag)
+    return cached_json_response(request.headers, rendered.body, rendered.etag, rendered.last_modified, ARTICLE_CACHE_CONTROL)
+
+@router.get("/{slug}", response_model=ArticleResponse)
+async def get_article(slug: str, request: Request):
+    rendered = await get_article_cache().article(slug)
+    if rendered.missing:
+        raise HTTPException(status_code=404, detail="Article not found")
+    return cached_json_response(request.headers, rendered.body, rendered.etag, rendered.last_modified, ARTICLE_CACHE_CONTROL)
+
+# Writes drop the cached copies they affect
+
+@router.post("", response_model=ArticleResponse, status_code=201)
+async def create_article(payload: ArticleCreate, claims: dict = Depends(require_admin), db: AsyncSession = Depends(get_db)):
+    return await create_article_service(payload, db)
+
+@router.patch("/{article_id}", response_model=ArticleResponse)
+async def update_article(article_id: int, payload: ArticleUpdate, claims: dict = Depends(require_admin), db: AsyncSession = Depends(get_db)):
+    return await update_article_service(article_id, payload, db)
+
+@router.delete("/{article_id}")
+async def delete_article(article_id: int, claims: dict = Depends(require_admin), db: AsyncSession = Depends(get_db)):
+    return await delete_article_service(article_id, db)
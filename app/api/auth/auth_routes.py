@@ -1,11 +1,14 @@
+from typing import Optional
 from fastapi import APIRouter, Depends, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.db.session import get_db
 from app.schemas.auth import OTPRequest, OTPVerifyRequest, LoginResponse
 from app.services.auth_service import send_otp_service, verify_otp_service
+from app.core.auth import get_token_verifier, optional_admin, require_admin
 from app.utils.cookies import clear_access_cookie
+from app.core.responses import FastJSONRoute
 
-router = APIRouter()
+router = APIRouter(route_class=FastJSONRoute)
 
 @router.post("/send-otp")
 async def send_otp(payload: OTPRequest, db: AsyncSession = Depends(get_db)):
@@ -30,7 +33,13 @@ async def verify_otp(payload: OTPVerifyRequest,response: Response, db: AsyncSess
         "message": "OTP verified successfully"
     }
 
+@router.get("/me")
+async def me(claims: dict = Depends(require_admin)):
+    return {"status": True, "email": claims["sub"], "expires_at": claims["exp"]}
+
 @router.post("/logout")
-async def logout(response: Response):
+async def logout(response: Response, claims: Optional[dict] = Depends(optional_admin), db: AsyncSession = Depends(get_db)):
+    if claims is not None:
+        await get_token_verifier().revoke(claims, db)
     clear_access_cookie(response)
     return {"status": True, "message": "Logged out successfully"}
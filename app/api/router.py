@@ -1,10 +1,13 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
+from app.core.auth import require_admin
 from app.api.admin import admin_routes
 from app.api.auth import auth_routes
 from app.api.trend_keyword import keyword_routes
+from app.api.articles import article_routes
 
 router = APIRouter()
-router.include_router(admin_routes.router, prefix="/admin", tags=["admin"])
+# Every /admin route requires a verified admin token (first admin: insert into admin_users directly)
+router.include_router(admin_routes.router, prefix="/admin", tags=["admin"], dependencies=[Depends(require_admin)])
 router.include_router(auth_routes.router, prefix="/auth", tags=["auth"])
-router.include_router(keyword_routes.router, prefix="/admin/trends", tags=["trend-keyword"])
-
+router.include_router(keyword_routes.router, prefix="/admin/trends", tags=["trend-keyword"], dependencies=[Depends(require_admin)])
+router.include_router(article_routes.router, prefix="/articles", tags=["articles"])
@@ -1,11 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException
+from datetime import datetime
+from typing import Literal, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.schemas.keyword import KeywordRequest, KeywordResponse
-from app.services.keyword_service import KeywordService
+from app.schemas.keyword import KeywordRequest, KeywordResponse, KeywordBatchRequest, KeywordBatchResponse
+from app.services.keyword_service import KeywordService, stream_keyword_events
 from app.db.session import get_db
+from app.schemas.trends import ScrapeMatrixRequest, TrendListResponse, TrendSeriesResponse
 from app.services.trend_scrape import TrendsScraper
+from app.services.scrape_jobs import SliceBusy, get_scrape_jobs
+from app.services.trend_series import TREND_SERIES_MAX_POINTS, as_naive_utc, get_trend_series
+from app.services.trend_query import InvalidCursor, TrendQuery
+from app.utils.streaming import ndjson_stream, sse_stream
+from app.core.responses import FastJSONRoute
 
-router = APIRouter()
+router = APIRouter(route_class=FastJSONRoute)
 
 
 @router.post("/keywords", response_model=KeywordResponse)
@@ -14,12 +23,101 @@ async def get_keywords(req: KeywordRequest, db: AsyncSession = Depends(get_db)):
         raise HTTPException(status_code=400, detail="keyword is required")
     
     service = KeywordService(db)
-    return await service.get_keyword_data(req.keyword.strip())
+    return await service.get_keyword_data(req.keyword.strip(), req.geo)
+
+@router.post("/keywords/stream")
+async def stream_keywords(req: KeywordRequest, format: Literal["ndjson", "sse"] = "ndjson"):
+    if not req.keyword or not req.keyword.strip():
+        raise HTTPException(status_code=400, detail="keyword is required")
+
+    # No get_db here: the stream opens its own short session and releases it before fetching
+    events = stream_keyword_events(req.keyword.strip(), req.geo)
+    if format == "sse":
+        return StreamingResponse(
+            sse_stream(events),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+    return StreamingResponse(ndjson_stream(events), media_type="application/x-ndjson")
+
+@router.post("/keywords/batch", response_model=KeywordBatchResponse)
+async def get_keywords_batch(req: KeywordBatchRequest, db: AsyncSession = Depends(get_db)):
+    keywords = [k.strip() for k in req.keywords if k and k.strip()]
+    if not keywords:
+        raise HTTPException(status_code=400, detail="keywords are required")
+
+    service = KeywordService(db)
+    return await service.get_keywords_batch(keywords, req.geo, req.concurrency)
 
 @router.post("/scrape")
-async def scrape_trends(geo:str, hours:str, sts:str):
-    scraper = TrendsScraper()
+async def scrape_trends(geo:str, hours:str, sts:str, response: Response, wait: bool = False):
     print("scrape", geo, hours, sts)
-    data = await scraper.fetch_trending_csv_bytes(geo, hours, sts)
-    # result = await save_csv_bytes_to_mongo_pandas(csv_bytes)
-    return data
\ No newline at end of file
+    if wait:
+        try:
+            return await get_scrape_jobs().run_now("scrape", {"geo": geo, "hours": hours, "sts": sts})
+        except SliceBusy as e:
+            raise HTTPException(status_code=409, detail=str(e))
+
+    response.status_code = 202
+    return await get_scrape_jobs().enqueue("scrape", {"geo": geo, "hours": hours, "sts": sts})
+
+@router.post("/scrape/matrix")
+async def scrape_trends_matrix(req: ScrapeMatrixRequest, response: Response, wait: bool = False):
+    if wait:
+        try:
+            return await get_scrape_jobs().run_now("matrix", req.model_dump())
+        except SliceBusy as e:
+            raise HTTPException(status_code=409, detail=str(e))
+
+    response.status_code = 202
+    return await get_scrape_jobs().enqueue("matrix", req.model_dump())
+
+@router.get("/scrape/jobs")
+async def list_scrape_jobs(status: Optional[str] = None, limit: int = Query(20, ge=1, le=100)):
+    return await get_scrape_jobs().list(status, limit)
+
+@router.get("/scrape/jobs/{job_id}")
+async def get_scrape_job(job_id: str):
+    job = await get_scrape_jobs().get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@router.get("", response_model=TrendListResponse)
+async def list_trends(
+    status: Optional[Literal["Open", "Processed", "Ignored"]] = None,
+    category: Optional[str] = None,
+    subcategory: Optional[str] = None,
+    geo: Optional[str] = None,
+    is_growing: Optional[bool] = None,
+    min_volume: Optional[int] = Query(None, ge=0),
+    max_volume: Optional[int] = Query(None, ge=0),
+    sort: Literal["volume", "momentum", "recency"] = "momentum",
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+):
+    try:
+        items, next_cursor = await TrendQuery().list(
+            status, category, subcategory, geo, is_growing, min_volume, max_volume, sort, limit, cursor
+        )
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"items": items, "next_cursor": next_cursor}
+
+@router.get("/rising")
+async def get_rising_trends(limit: int = Query(50, ge=1, le=500)):
+    return await TrendsScraper().top_rising(limit)
+
+@router.get("/series", response_model=TrendSeriesResponse)
+async def get_trend_series_range(
+    trend: str,
+    geo: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    resolution: Literal["auto", "raw", "hour", "day"] = "auto",
+    max_points: int = Query(500, ge=1, le=TREND_SERIES_MAX_POINTS),
+):
+    start, end = as_naive_utc(start), as_naive_utc(end)
+    if start and end and start >= end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+    return await get_trend_series().query(trend, geo, start, end, resolution, max_points)
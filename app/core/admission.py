@@ -0,0 +1,275 @@
+"""
+Admission control for the expensive endpoints.
+
+Each AdmissionRule bounds one group of routes two ways:
+
+- concurrency: at most `max_concurrent` requests run at once; up to `max_queue` more wait
+  up to `queue_timeout` seconds for a slot. Beyond that the request is shed with 503.
+- rate: token buckets keyed by the caller ("user" = token subject, "email" = the JSON
+  body's email field, "ip"), refused with 429 when empty.
+
+Both answers carry Retry-After and are returned before the route, its dependencies or
+its DB session run, so cheap routes keep their latency while expensive ones saturate.
+Routes that match no rule pass straight through.
+"""
+import asyncio
+import json
+import math
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+
+from app.core.auth import get_token_verifier, token_from_request
+from app.core.metrics import metrics
+from app.utils.rate_limit import TokenBucket
+
+ADMISSION_CONTROL = os.getenv("ADMISSION_CONTROL", "on").lower() not in ("0", "off", "false", "no")
+# Only enable behind a proxy that sets X-Forwarded-For; otherwise clients could pick their own key
+ADMISSION_TRUST_FORWARDED_FOR = os.getenv("ADMISSION_TRUST_FORWARDED_FOR", "").lower() in ("1", "true", "yes")
+ADMISSION_MAX_KEYS = int(os.getenv("ADMISSION_MAX_KEYS", "10000"))
+# Bodies read here for the "email" key are small JSON objects; anything larger is refused
+ADMISSION_MAX_BODY_BYTES = int(os.getenv("ADMISSION_MAX_BODY_BYTES", "4096"))
+
+ADMISSION_SCRAPE_CONCURRENCY = int(os.getenv("ADMISSION_SCRAPE_CONCURRENCY", "2"))
+ADMISSION_KEYWORDS_CONCURRENCY = int(os.getenv("ADMISSION_KEYWORDS_CONCURRENCY", "8"))
+ADMISSION_OTP_PER_EMAIL_PER_HOUR = float(os.getenv("ADMISSION_OTP_PER_EMAIL_PER_HOUR", "5"))
+ADMISSION_OTP_PER_IP_PER_HOUR = float(os.getenv("ADMISSION_OTP_PER_IP_PER_HOUR", "30"))
+
+
+@dataclass
+class RateLimit:
+    key: str            # "user" (falls back to ip), "email" (falls back to ip) or "ip"
+    rate: float         # tokens per second
+    burst: float
+
+
+@dataclass
+class AdmissionRule:
+    name: str
+    method: str
+    path: str                   # prefix, relative to the API prefix
+    max_concurrent: int = 0     # 0 = unlimited
+    max_queue: int = 0
+    queue_timeout: float = 0.0
+    rate_limits: List[RateLimit] = field(default_factory=list)
+
+    def matches(self, method: str, path: str) -> bool:
+        return method == self.method and (path == self.path or path.startswith(self.path + "/"))
+
+
+DEFAULT_RULES = [
+    # Launches Chromium with wait=true; otherwise enqueues a job that a worker scrapes later
+    AdmissionRule(
+        "scrape", "POST", "/admin/trends/scrape",
+        max_concurrent=ADMISSION_SCRAPE_CONCURRENCY, max_queue=2 * ADMISSION_SCRAPE_CONCURRENCY, queue_timeout=2.0,
+        rate_limits=[RateLimit("user", 6 / 60, 3)],
+    ),
+    # Up to five paid SerpAPI calls per keyword on a cache miss (covers /stream and /batch)
+    AdmissionRule(
+        "keywords", "POST", "/admin/trends/keywords",
+        max_concurrent=ADMISSION_KEYWORDS_CONCURRENCY, max_queue=2 * ADMISSION_KEYWORDS_CONCURRENCY, queue_timeout=5.0,
+        rate_limits=[RateLimit("user", 1.0, 10)],
+    ),
+    # Sends an email per call; per-email stops mailbox flooding, per-IP stops enumeration
+    AdmissionRule(
+        "send_otp", "POST", "/auth/send-otp",
+        max_concurrent=20, max_queue=40, queue_timeout=2.0,
+        rate_limits=[
+            RateLimit("email", ADMISSION_OTP_PER_EMAIL_PER_HOUR / 3600, ADMISSION_OTP_PER_EMAIL_PER_HOUR),
+            RateLimit("ip", ADMISSION_OTP_PER_IP_PER_HOUR / 3600, ADMISSION_OTP_PER_IP_PER_HOUR),
+        ],
+    ),
+    AdmissionRule(
+        "verify_otp", "POST", "/auth/verify-otp",
+        rate_limits=[RateLimit("ip", 30 / 3600, 30)],
+    ),
+]
+
+
+class Rejected(Exception):
+    def __init__(self, status_code: int, detail: str, retry_after: Optional[float] = None):
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+class RouteGate:
+    """Concurrency limit + bounded wait queue + keyed token buckets for one rule."""
+
+    def __init__(self, rule: AdmissionRule, max_keys: int = ADMISSION_MAX_KEYS):
+        self.rule = rule
+        self.max_keys = max_keys
+        self.active = 0
+        self.queued = 0
+        self._slots = asyncio.Semaphore(rule.max_concurrent) if rule.max_concurrent else None
+        self._buckets: "OrderedDict[Tuple[str, str], TokenBucket]" = OrderedDict()
+
+    def _bucket(self, limit: RateLimit, key: str) -> TokenBucket:
+        bucket_key = (limit.key, key)
+        bucket = self._buckets.get(bucket_key)
+        if bucket is None:
+            bucket = self._buckets[bucket_key] = TokenBucket(limit.rate, limit.burst)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)  # least recently used caller starts fresh
+        else:
+            self._buckets.move_to_end(bucket_key)
+        return bucket
+
+    def check_rate(self, keys: Dict[str, str]):
+        buckets = [self._bucket(limit, keys[limit.key]) for limit in self.rule.rate_limits]
+        # Check all before taking any, so a refusal by one limit does not drain the others
+        waits = [bucket.retry_after() for bucket in buckets]
+        if any(waits):
+            raise Rejected(429, "Too many requests", max(waits))
+        for bucket in buckets:
+            bucket.try_acquire()
+
+    async def acquire(self):
+        if self._slots is None:
+            self.active += 1
+            return
+        if self._slots.locked():
+            if self.queued >= self.rule.max_queue:
+                raise Rejected(503, "Server busy, try again shortly", self.rule.queue_timeout or 1)
+            self.queued += 1
+            started = time.perf_counter()
+            try:
+                await asyncio.wait_for(self._slots.acquire(), timeout=self.rule.queue_timeout)
+            except asyncio.TimeoutError:
+                raise Rejected(503, "Server busy, try again shortly", self.rule.queue_timeout or 1)
+            finally:
+                self.queued -= 1
+                metrics.observe("admission.queue_wait_seconds", time.perf_counter() - started, rule=self.rule.name)
+        else:
+            await self._slots.acquire()
+        self.active += 1
+
+    def release(self):
+        self.active -= 1
+        if self._slots is not None:
+            self._slots.release()
+
+
+def client_ip(scope) -> str:
+    if ADMISSION_TRUST_FORWARDED_FOR:
+        for name, value in scope.get("headers", []):
+            if name == b"x-forwarded-for":
+                return value.decode("latin-1").split(",")[0].strip()
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+
+def _user(scope) -> Optional[str]:
+    token = token_from_request(Request(scope))
+    if token is None:
+        return None
+    try:
+        return get_token_verifier().verify(token)["sub"]
+    except HTTPException:
+        return None
+
+
+class AdmissionMiddleware:
+    """Pure ASGI middleware, so streamed responses hold their slot until fully sent."""
+
+    def __init__(self, app, prefix: str = "", rules: Optional[List[AdmissionRule]] = None, enabled: bool = ADMISSION_CONTROL):
+        self.app = app
+        self.prefix = prefix
+        self.enabled = enabled
+        self.gates = [RouteGate(rule) for rule in (DEFAULT_RULES if rules is None else rules)]
+        metrics.register_gauges("admission", lambda: {
+            f"{gate.rule.name}.{name}": value
+            for gate in self.gates
+            for name, value in (("active", gate.active), ("queued", gate.queued))
+        })
+
+    def _gate(self, scope) -> Optional[RouteGate]:
+        path = scope["path"]
+        if not path.startswith(self.prefix):
+            return None
+        path = path[len(self.prefix):]
+        for gate in self.gates:
+            if gate.rule.matches(scope["method"], path):
+                return gate
+        return None
+
+    async def __call__(self, scope, receive, send):
+        gate = self._gate(scope) if self.enabled and scope["type"] == "http" else None
+        if gate is None:
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            if gate.rule.rate_limits:
+                keys, receive = await self._keys(scope, receive, gate.rule)
+                gate.check_rate(keys)
+            await gate.acquire()
+        except Rejected as r:
+            metrics.incr("admission.rejected", rule=gate.rule.name, status=r.status_code)
+            headers = {} if r.retry_after is None else {"Retry-After": str(max(1, math.ceil(r.retry_after)))}
+            response = JSONResponse({"detail": r.detail}, status_code=r.status_code, headers=headers)
+            await response(scope, receive, send)
+            return
+
+        metrics.incr("admission.admitted", rule=gate.rule.name)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            gate.release()
+
+    async def _keys(self, scope, receive, rule: AdmissionRule):
+        ip = client_ip(scope)
+        keys = {"ip": ip}
+        kinds = {limit.key for limit in rule.rate_limits}
+        if "user" in kinds:
+            keys["user"] = _user(scope) or f"ip:{ip}"
+        if "email" in kinds:
+            body, receive = await _buffer_body(scope, receive)
+            email = None
+            try:
+                email = json.loads(body).get("email")
+            except (ValueError, AttributeError):
+                pass
+            keys["email"] = email.strip().lower() if isinstance(email, str) else f"ip:{ip}"
+        return keys, receive
+
+
+async def _buffer_body(scope, receive, limit: int = ADMISSION_MAX_BODY_BYTES):
+    """
+    Read the whole request body and return it with a receive() that replays it to the app.
+    Raises Rejected(413) past `limit` bytes, so it never holds more than that in memory.
+    """
+    too_large = Rejected(413, "Request body too large")
+    for name, value in scope.get("headers", []):
+        if name == b"content-length" and value.isdigit() and int(value) > limit:
+            raise too_large
+    chunks = []
+    size = 0
+    while True:
+        message = await receive()
+        if message["type"] != "http.request":
+            break
+        chunk = message.get("body", b"")
+        size += len(chunk)
+        if size > limit:
+            raise too_large
+        chunks.append(chunk)
+        if not message.get("more_body", False):
+            break
+    body = b"".join(chunks)
+    replayed = False
+
+    async def replay():
+        nonlocal replayed
+        if not replayed:
+            replayed = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        return await receive()
+
+    return body, replay
@@ -0,0 +1,157 @@
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Optional
+
+from fastapi import HTTPException, Request
+from jose import JWTError
+from sqlalchemy import select
+
+from app.core.metrics import metrics
+from app.core.security import decode_access_token
+from app.db.models.token import Token
+from app.db.session import SessionLocal
+from app.utils.cookies import ACCESS_TOKEN_NAME
+
+AUTH_TOKEN_CACHE_SIZE = int(os.getenv("AUTH_TOKEN_CACHE_SIZE", "1024"))
+# How often other workers' logouts are picked up from the tokens table
+AUTH_REVOCATION_SYNC_SECONDS = float(os.getenv("AUTH_REVOCATION_SYNC_SECONDS", "30"))
+REVOKED = "revoked"  # tokens.token_type of revocation rows; tokens.access_token holds the jti
+
+
+class TokenVerifier:
+    """
+    Verifies access tokens without touching the database.
+
+    A token seen before is a dict lookup: the full token string maps to its claims until
+    the token's own `exp`, in a size-bounded LRU. New tokens pay one HMAC check. Logout
+    writes the token's jti to the `tokens` table and to the local revocation set; a
+    background task pulls new revocation rows every AUTH_REVOCATION_SYNC_SECONDS so a
+    logout on one worker reaches the others.
+    """
+
+    def __init__(self, max_size: int = AUTH_TOKEN_CACHE_SIZE, session_factory=SessionLocal):
+        self.max_size = max_size
+        self.session_factory = session_factory
+        self._verified: "OrderedDict[str, tuple]" = OrderedDict()  # token -> (claims, exp)
+        self.revoked: Dict[str, float] = {}  # jti -> exp
+        self._last_id = 0
+        self._task: Optional[asyncio.Task] = None
+        metrics.register_gauges("auth", lambda: {"verified_cached": len(self._verified), "revoked": len(self.revoked)})
+
+    async def start(self):
+        await self.sync()
+        if self._task is None:
+            self._task = asyncio.create_task(self._sync_loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def verify(self, token: str) -> dict:
+        """Claims of a valid, unexpired, unrevoked token; raises HTTPException(401) otherwise."""
+        now = time.time()
+        item = self._verified.get(token)
+        if item is not None and item[1] > now:
+            self._verified.move_to_end(token)
+            claims = item[0]
+        else:
+            if item is not None:
+                del self._verified[token]
+            try:
+                claims = decode_access_token(token)
+            except JWTError:
+                metrics.incr("auth.rejected", reason="invalid")
+                raise HTTPException(status_code=401, detail="Invalid or expired token", headers={"WWW-Authenticate": "Bearer"})
+            self._verified[token] = (claims, float(claims["exp"]))
+            if len(self._verified) > self.max_size:
+                self._verified.popitem(last=False)
+        jti = claims.get("jti")
+        if jti is not None and jti in self.revoked:
+            metrics.incr("auth.rejected", reason="revoked")
+            raise HTTPException(status_code=401, detail="Token has been revoked", headers={"WWW-Authenticate": "Bearer"})
+        return claims
+
+    async def revoke(self, claims: dict, db) -> None:
+        """Record a logout. Tokens without a jti (issued before jti existed) just expire."""
+        jti = claims.get("jti")
+        if jti is None:
+            return
+        exp = float(claims["exp"])
+        self.revoked[jti] = exp
+        db.add(Token(access_token=jti, token_type=REVOKED, expires_at=datetime.utcfromtimestamp(exp)))
+        await db.commit()
+
+    async def sync(self):
+        """Pull revocations recorded since the last sync and forget expired ones."""
+        async with self.session_factory() as session:
+            result = await session.execute(
+                select(Token.id, Token.access_token, Token.expires_at)
+                .where(Token.token_type == REVOKED, Token.id > self._last_id, Token.expires_at > datetime.utcnow())
+                .order_by(Token.id)
+            )
+            for row_id, jti, expires_at in result.all():
+                self.revoked[jti] = (expires_at - datetime(1970, 1, 1)).total_seconds()
+                self._last_id = row_id
+        now = time.time()
+        for jti in [j for j, exp in self.revoked.items() if exp <= now]:
+            del self.revoked[jti]
+
+    async def _sync_loop(self):
+        while True:
+            await asyncio.sleep(AUTH_REVOCATION_SYNC_SECONDS)
+            try:
+                await self.sync()
+            except Exception as e:
+                print(f"Token revocation sync failed: {e!r}")
+
+
+def token_from_request(request: Request) -> Optional[str]:
+    """The access_token cookie, else an `Authorization: Bearer` header."""
+    token = request.cookies.get(ACCESS_TOKEN_NAME)
+    if token:
+        return token
+    scheme, _, credentials = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() == "bearer" and credentials:
+        return credentials
+    return None
+
+
+token_verifier: Optional[TokenVerifier] = None
+
+
+def get_token_verifier() -> TokenVerifier:
+    global token_verifier
+    if token_verifier is None:
+        token_verifier = TokenVerifier()
+    return token_verifier
+
+
+async def close_token_verifier():
+    global token_verifier
+    if token_verifier is not None:
+        await token_verifier.stop()
+        token_verifier = None
+
+
+async def require_admin(request: Request) -> dict:
+    """FastAPI dependency: the verified token claims (`sub` is the admin email), or 401."""
+    token = token_from_request(request)
+    if token is None:
+        metrics.incr("auth.rejected", reason="missing")
+        raise HTTPException(status_code=401, detail="Not authenticated", headers={"WWW-Authenticate": "Bearer"})
+    claims = get_token_verifier().verify(token)
+    request.state.user = claims["sub"]
+    return claims
+
+
+async def optional_admin(request: Request) -> Optional[dict]:
+    """Like require_admin, but None instead of 401 when there is no valid token."""
+    try:
+        return await require_admin(request)
+    except HTTPException:
+        return None
@@ -0,0 +1,62 @@
+from collections import defaultdict
+from typing import Callable, Dict
+import threading
+
+
+def _key(name: str, labels: dict) -> str:
+    if not labels:
+        return name
+    inner = ",".join(f"{k}={v}" for k, v in sorted(labels.items()))
+    return f"{name}{{{inner}}}"
+
+
+class Metrics:
+    """Tiny in-process metrics registry: counters, gauges and timing summaries."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, float] = defaultdict(float)
+        self._gauges: Dict[str, float] = {}
+        self._gauge_callbacks: Dict[str, Callable[[], dict]] = {}
+        self._timings: Dict[str, dict] = {}
+
+    def incr(self, name: str, value: float = 1, /, **labels):
+        with self._lock:
+            self._counters[_key(name, labels)] += value
+
+    def gauge(self, name: str, value: float, /, **labels):
+        with self._lock:
+            self._gauges[_key(name, labels)] = value
+
+    def register_gauges(self, name: str, callback: Callable[[], dict]):
+        """Register a callback returning {gauge_name: value}, evaluated on every snapshot."""
+        self._gauge_callbacks[name] = callback
+
+    def observe(self, name: str, seconds: float, /, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            t = self._timings.get(key)
+            if t is None:
+                t = self._timings[key] = {"count": 0, "sum": 0.0, "max": 0.0}
+            t["count"] += 1
+            t["sum"] += seconds
+            t["max"] = max(t["max"], seconds)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+            timings = {
+                k: {**v, "avg": v["sum"] / v["count"] if v["count"] else 0.0}
+                for k, v in self._timings.items()
+            }
+        for name, callback in self._gauge_callbacks.items():
+            try:
+                for k, v in callback().items():
+                    gauges[f"{name}.{k}"] = v
+            except Exception as e:
+                gauges[f"{name}.error"] = str(e)
+        return {"counters": counters, "gauges": gauges, "timings": timings}
+
+
+metrics = Metrics()
@@ -0,0 +1,144 @@
+"""
+Fast JSON responses.
+
+Every route renders through orjson (FastJSONResponse is the app's default response
+class). Routes on FastJSONRoute routers also skip FastAPI's Python-level encoding:
+
+- no response_model: the returned dict/list goes straight to orjson instead of being
+  walked by jsonable_encoder first; datetimes, ObjectIds, numpy values and pydantic
+  models inside it are handled natively or by `_default`.
+- response_model, and the endpoint returns exactly that model: pydantic-core writes the
+  JSON bytes directly (no dump -> validate -> serialize round trip).
+- an async iterable (e.g. a Motor cursor) is streamed as a JSON array, item by item.
+
+Anything else (a dict for a response_model route, List[...] models, response_model_*
+options) takes FastAPI's normal path.
+Status codes and headers set on an injected `Response` are kept in every case.
+"""
+import functools
+import inspect
+from collections.abc import Mapping
+from decimal import Decimal
+from typing import Any, AsyncIterable, AsyncIterator, Callable
+
+import orjson
+from bson import ObjectId
+from fastapi import Response
+from fastapi.datastructures import DefaultPlaceholder
+from fastapi.routing import APIRoute
+from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse, StreamingResponse
+
+_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+_RESPONSE_PARAM = "_fastjson_response"
+# response_model_* options that change the output; routes using them keep FastAPI's path
+_MODEL_OPTIONS = (
+    "response_model_include",
+    "response_model_exclude",
+    "response_model_exclude_unset",
+    "response_model_exclude_defaults",
+    "response_model_exclude_none",
+)
+
+
+def _default(obj: Any):
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    if isinstance(obj, BaseModel):
+        return obj.model_dump(mode="json")
+    if isinstance(obj, Decimal):
+        return str(obj)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    if isinstance(obj, Mapping):
+        return dict(obj)  # e.g. RawBSONDocument
+    if hasattr(obj, "isoformat"):
+        return obj.isoformat()  # e.g. pandas Timestamp
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def dumps(obj: Any) -> bytes:
+    return orjson.dumps(obj, default=_default, option=_OPTIONS)
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+class RawJSONResponse(Response):
+    """Body that is already JSON bytes."""
+
+    media_type = "application/json"
+
+
+async def json_array_stream(items: AsyncIterable[Any]) -> AsyncIterator[bytes]:
+    """A JSON array written one element at a time, so large lists are never held as one buffer."""
+    yield b"["
+    first = True
+    async for item in items:
+        yield dumps(item) if first else b"," + dumps(item)
+        first = False
+    yield b"]"
+
+
+def _finish(response: Response, sub_response: Response, default_status: int) -> Response:
+    """Apply what the endpoint set on its injected Response, as FastAPI would."""
+    response.status_code = sub_response.status_code or default_status
+    response.headers.raw.extend(sub_response.headers.raw)
+    return response
+
+
+def _fast_endpoint(endpoint: Callable, model: Any, status_code: int) -> Callable:
+    signature = inspect.signature(endpoint)
+    is_coroutine = inspect.iscoroutinefunction(endpoint)
+    # FastAPI injects one per-request Response; reuse the endpoint's own parameter if it has one
+    own = next((
+        name for name, param in signature.parameters.items()
+        if inspect.isclass(param.annotation) and issubclass(param.annotation, Response)
+    ), None)
+
+    @functools.wraps(endpoint)
+    async def wrapper(*args, **kwargs):
+        sub_response = kwargs[own] if own else kwargs.pop(_RESPONSE_PARAM)
+        if is_coroutine:
+            result = await endpoint(*args, **kwargs)
+        else:
+            result = await run_in_threadpool(endpoint, *args, **kwargs)
+
+        if isinstance(result, Response):
+            return result
+        if model is not None:
+            if type(result) is not model:
+                return result  # FastAPI validates and filters it into the model
+            body = model.__pydantic_serializer__.to_json(result, by_alias=True)
+            return _finish(RawJSONResponse(body), sub_response, status_code)
+        if hasattr(result, "__aiter__"):
+            streamed = StreamingResponse(json_array_stream(result), media_type="application/json")
+            return _finish(streamed, sub_response, status_code)
+        return _finish(RawJSONResponse(dumps(result)), sub_response, status_code)
+
+    if own is None:
+        extra = inspect.Parameter(_RESPONSE_PARAM, inspect.Parameter.KEYWORD_ONLY, annotation=Response)
+        wrapper.__signature__ = signature.replace(parameters=[*signature.parameters.values(), extra])
+    wrapper.fast_json = True  # include_router re-creates routes from the wrapped endpoint
+    return wrapper
+
+
+class FastJSONRoute(APIRoute):
+    """APIRoute whose endpoint results are serialized as described in the module docstring."""
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+        response_model = kwargs.get("response_model")
+        if isinstance(response_model, DefaultPlaceholder):
+            # FastAPI infers the model from the return annotation in that case
+            annotation = inspect.signature(endpoint).return_annotation
+            response_model = None if annotation is inspect.Signature.empty else annotation
+        if inspect.isclass(response_model) and issubclass(response_model, Response):
+            response_model = None
+        plain = response_model is None or (inspect.isclass(response_model) and issubclass(response_model, BaseModel))
+        wrapped = getattr(endpoint, "fast_json", False)
+        if plain and not wrapped and not any(kwargs.get(option) for option in _MODEL_OPTIONS):
+            endpoint = _fast_endpoint(endpoint, response_model, kwargs.get("status_code") or 200)
+        super().__init__(path, endpoint, **kwargs)
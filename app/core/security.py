@@ -1,13 +1,26 @@
 from passlib.context import CryptContext
-from jose import jwt
+from jose import JWTError, jwt
 from datetime import datetime, timedelta
+import os
+import uuid
 
-SECRET_KEY = "your-secret"
+DEFAULT_SECRET_KEY = "your-secret"  # placeholder only; tokens signed with it are forgeable
+SECRET_KEY = os.getenv("JWT_SECRET_KEY", DEFAULT_SECRET_KEY)
 ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = 60
+ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "60"))
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+
+class InsecureSecretKey(RuntimeError):
+    pass
+
+
+def check_secret_key():
+    """Raises InsecureSecretKey unless JWT_SECRET_KEY is set to a real secret."""
+    if not SECRET_KEY or SECRET_KEY == DEFAULT_SECRET_KEY:
+        raise InsecureSecretKey("JWT_SECRET_KEY is not set (or is the placeholder default)")
+
 def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
 
@@ -17,5 +30,15 @@ def get_password_hash(password):
 def create_access_token(data: dict, expires_delta: timedelta = None):
     to_encode = data.copy()
     expire = datetime.utcnow() + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
-    to_encode.update({"exp": expire})
-    return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
\ No newline at end of file
+    # jti identifies the token for revocation (logout) without storing the token itself
+    to_encode.update({"exp": expire, "jti": uuid.uuid4().hex})
+    check_secret_key()
+    return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+
+def decode_access_token(token: str) -> dict:
+    """Verify signature and expiry; raises jose.JWTError (ExpiredSignatureError included)."""
+    try:
+        check_secret_key()
+    except InsecureSecretKey as e:
+        raise JWTError(str(e)) from e  # anyone could have signed it
+    return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
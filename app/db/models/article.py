@@ -1,11 +1,13 @@
 
-from sqlalchemy import Column, Integer, String, Text, DateTime, ARRAY
+from sqlalchemy import Column, Integer, String, Text, DateTime, ARRAY, Index
 from sqlalchemy.sql import func
 from sqlalchemy.dialects.postgresql import ARRAY
 from app.db.session import Base
 
 class Article(Base):
     __tablename__ = "articles"
+    # Public listing: WHERE status = 'published' ORDER BY published_at DESC
+    __table_args__ = (Index("ix_articles_status_published_at", "status", "published_at"),)
 
     id = Column(Integer, primary_key=True, index=True)
     
@@ -0,0 +1,10 @@
+from sqlalchemy import BigInteger, Column, String
+from app.db.session import Base
+
+class CacheVersion(Base):
+    """One counter per cached data set, bumped in the same transaction as every write to it,
+    so workers can tell their in-memory copies are stale without a message bus."""
+    __tablename__ = "cache_versions"
+
+    name = Column(String, primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0, server_default="0")
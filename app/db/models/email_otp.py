@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime, func
+from sqlalchemy import Column, String, DateTime, Integer, func
 from app.db.session import Base
 from datetime import datetime, timedelta
 
@@ -8,4 +8,5 @@ class EmailOTP(Base):
     email = Column(String, primary_key=True, index=True)
     otp = Column(String, nullable=False)
     expires_at = Column(DateTime, default=lambda: datetime.utcnow() + timedelta(minutes=5))
-    created_at = Column(DateTime, server_default=func.now())
\ No newline at end of file
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    created_at = Column(DateTime, server_default=func.now())
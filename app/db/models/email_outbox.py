@@ -0,0 +1,20 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, Index, text
+from app.db.session import Base
+
+class EmailOutbox(Base):
+    __tablename__ = "email_outbox"
+    __table_args__ = (Index("ix_email_outbox_due", "status", "next_attempt_at"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    to_email = Column(String, nullable=False)
+    subject = Column(String, nullable=False)
+    html_content = Column(Text, nullable=False)
+    status = Column(String, nullable=False, default="pending", server_default="pending")
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    # Due time while pending; a claimed row is pushed forward by the lease so crashed sends retry
+    # Naive UTC like the datetime.utcnow() the sender compares against, whatever the server's time zone
+    next_attempt_at = Column(DateTime, nullable=False, server_default=text("timezone('utc', now())"))
+    last_error = Column(Text)
+    # Not delivered after this (e.g. an OTP email once the code has expired); null = no limit
+    expires_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, server_default=text("timezone('utc', now())"))
@@ -6,7 +6,7 @@ class Token(Base):
     __tablename__ = "tokens"
 
     id = Column(Integer, primary_key=True, index=True)
-    access_token = Column(String, nullable=False)
+    access_token = Column(String, nullable=False)  # the jti for token_type="revoked" rows
     token_type = Column(String, default="bearer")
     expires_at = Column(DateTime, default=None)
     created_at = Column(DateTime, default=datetime.utcnow)
\ No newline at end of file
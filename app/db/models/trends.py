@@ -1,29 +1,62 @@
-from pydantic import BaseModel, Field
-from typing import Optional, List, Literal
+from pydantic import BaseModel, Field, field_validator
+from typing import Dict, Optional, List, Literal
 from datetime import datetime
 
 
 class VolumePoint(BaseModel):
     ts: datetime = Field(default_factory=datetime.utcnow)
     value: int
+    slice: Optional[str] = None   # "<geo>:<hours>" the value was read from
+
+
+class TrendMomentum(BaseModel):
+    ewma: float = 0.0
+    slope: float = 0.0            # volume per hour
+    acceleration: float = 0.0     # volume per hour^2
+    age_hours: Optional[float] = None
+    updated_at: Optional[datetime] = None
+    volume: int = 0
+    is_growing: bool = False
+    score: float = 0.0
 
 
 class TrendItem(BaseModel):
     trend: str = Field(..., description="The trending keyword/topic")
     search_volume: int = Field(default=0)
+    # the `hours` window search_volume was read from (the shortest one the trend was scraped in)
+    window_hours: Optional[int] = None
+    # last few points only; the full series lives in trend_volume_points and its rollups
     volume_history: List[VolumePoint] = Field(default_factory=list)
+    history_points: int = 0
+    first_seen: Optional[datetime] = None
+    peak_volume: int = 0
+    peak_at: Optional[datetime] = None
 
     started: Optional[datetime] = None
     ended: Optional[datetime] = None
 
+    geos: List[str] = Field(default_factory=list)
+
     trend_breakdown: Optional[str] = None
     explore_link: Optional[str] = None
 
+    # momentum_score and is_growing are those of momentum[momentum_slice]
     is_growing: bool = False
+    momentum: Dict[str, TrendMomentum] = Field(default_factory=dict)   # per "<geo>:<hours>" slice
+    momentum_slice: Optional[str] = None
+    momentum_score: float = 0.0
     category: Optional[str] = None
     subcategory: Optional[str] = None
 
     status: Literal["Open", "Processed", "Ignored"] = "Open"
     draft_id: Optional[str] = None
 
-    last_updated: datetime = Field(default_factory=datetime.utcnow)
\ No newline at end of file
+    last_updated: datetime = Field(default_factory=datetime.utcnow)
+
+    @field_validator("momentum", mode="before")
+    @classmethod
+    def _drop_flat_momentum(cls, value):
+        # documents not re-ingested since momentum was split per slice hold one flat state
+        if value is None or (isinstance(value, dict) and "updated_at" in value):
+            return {}
+        return value
@@ -0,0 +1,261 @@
+"""
+Every Mongo collection option and index the app relies on, declared in one place and
+applied once at startup by IndexManager. Request paths never create indexes.
+
+To change an index: edit its declaration here, and add the old name to RETIRED_INDEXES
+so it is dropped. Anything else that differs from these declarations is drift, which is
+logged (MONGO_INDEX_DRIFT=warn, the default) or stops startup (=fail). Indexes added by
+hand or by the Atlas advisor are drift too, hence the lenient default.
+"""
+import asyncio
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import CollectionInvalid, OperationFailure
+
+from app.core.metrics import metrics
+from app.db.mongodb import get_mongo_db
+from app.services.trend_series import TREND_HOURLY_TTL_DAYS, TREND_POINTS_TTL_DAYS
+
+MONGO_INDEX_DRIFT = os.getenv("MONGO_INDEX_DRIFT", "warn").lower()
+INDEX_PROGRESS_INTERVAL = 10
+INDEX_NOT_FOUND = 27  # server error code for dropping an index that no longer exists
+
+# Options passed to create_collection for collections that must not be auto-created
+COLLECTIONS: Dict[str, dict] = {
+    "trend_volume_points": {
+        "timeseries": {"timeField": "ts", "metaField": "meta", "granularity": "minutes"},
+        "expireAfterSeconds": TREND_POINTS_TTL_DAYS * 86400,
+    },
+}
+
+INDEXES: Dict[str, List[IndexModel]] = {
+    "trending_searches": [
+        IndexModel("trend", unique=True),
+        # Listing (TrendQuery), newest-first keyset pages on (<sort>, _id):
+        #   status + geo, any sort, any other filters -> (status, geos, <sort>, _id); the sort
+        #     comes off the index, the remaining filters are checked on the fetched documents
+        #   momentum / volume sort without both -> (<sort>, _id), walked in order and filtered;
+        #     also "top rising" and min/max_volume ranges
+        #   recency without status + geo sorts the matches in memory: last_updated changes on
+        #     every ingest write, so it is not worth more than one index
+        *[
+            IndexModel([("status", ASCENDING), ("geos", ASCENDING), (sort_field, DESCENDING), ("_id", DESCENDING)])
+            for sort_field in ("search_volume", "momentum_score", "last_updated")
+        ],
+        IndexModel([("momentum_score", DESCENDING), ("_id", DESCENDING)]),
+        IndexModel([("search_volume", DESCENDING), ("_id", DESCENDING)]),
+    ],
+    "keyword_cache": [
+        IndexModel("expires_at", expireAfterSeconds=0),
+    ],
+    "scrape_jobs": [
+        IndexModel([("status", ASCENDING), ("created_at", ASCENDING)]),
+        # finished jobs are kept for a week
+        IndexModel("finished_at", expireAfterSeconds=7 * 24 * 3600),
+    ],
+    "trend_volume_points": [
+        IndexModel([("meta", ASCENDING), ("ts", ASCENDING)]),
+        IndexModel([("meta.trend", ASCENDING), ("meta.geo", ASCENDING), ("ts", ASCENDING)]),
+    ],
+    "trend_volume_hourly": [
+        IndexModel([("trend", ASCENDING), ("geo", ASCENDING), ("ts", ASCENDING)]),
+        IndexModel("ts", expireAfterSeconds=TREND_HOURLY_TTL_DAYS * 86400),
+    ],
+    "trend_volume_daily": [
+        IndexModel([("trend", ASCENDING), ("geo", ASCENDING), ("ts", ASCENDING)]),
+    ],
+}
+
+# Indexes that older code created and that are now redundant; dropped when found
+RETIRED_INDEXES: Dict[str, List[str]] = {
+    "trending_searches": [
+        "status_1",          # prefix of (status, geos, <sort>, _id)
+        "category_1",
+        "subcategory_1",
+        "is_growing_1",      # from the old create_index("is_growing", 1),("category",1) typo
+        "is_growing_1_category_1",
+        "momentum_score_-1",  # replaced by (momentum_score, _id)
+        # one listing index per sort x filter; each was rewritten on every ingest
+        *[
+            f"{prefix}{sort_field}_-1__id_-1"
+            for sort_field in ("search_volume", "momentum_score", "last_updated")
+            for prefix in ("status_1_", "category_1_", "category_1_subcategory_1_", "geos_1_", "is_growing_1_")
+        ],
+        "last_updated_-1__id_-1",
+    ],
+}
+
+# Options that change index behaviour; anything else (v, ns, background) is ignored
+_COMPARED_OPTIONS = ("unique", "sparse", "expireAfterSeconds", "partialFilterExpression")
+
+
+class IndexDriftError(RuntimeError):
+    pass
+
+
+def _normalize_key(key) -> List[Tuple[str, object]]:
+    return [(field, int(direction) if isinstance(direction, float) else direction) for field, direction in key]
+
+
+def _options(spec: dict) -> dict:
+    return {k: spec[k] for k in _COMPARED_OPTIONS if k in spec}
+
+
+class IndexManager:
+    """Checks declared vs. existing indexes, then builds missing ones in the background."""
+
+    def __init__(
+        self,
+        db=None,
+        indexes: Optional[Dict[str, List[IndexModel]]] = None,
+        collections: Optional[Dict[str, dict]] = None,
+        retired: Optional[Dict[str, List[str]]] = None,
+        drift_mode: str = MONGO_INDEX_DRIFT,
+    ):
+        self.db = db if db is not None else get_mongo_db()
+        self.indexes = INDEXES if indexes is None else indexes
+        self.collections = COLLECTIONS if collections is None else collections
+        self.retired = RETIRED_INDEXES if retired is None else retired
+        self.drift_mode = drift_mode
+        # "collection.index" -> {"state": present|pending|building|built|failed, ...}
+        self.status: Dict[str, dict] = {}
+        self.drift: List[str] = []
+        self._task: Optional[asyncio.Task] = None
+        metrics.register_gauges("mongo_indexes", lambda: {
+            state: sum(1 for s in self.status.values() if s["state"] == state)
+            for state in ("present", "pending", "building", "built", "failed")
+        })
+
+    async def start(self):
+        missing = await self.check()
+        if missing and self._task is None:
+            self._task = asyncio.create_task(self._build(missing))
+
+    async def stop(self):
+        # A build already sent to the server keeps running there; we only stop watching it
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _ensure_collections(self):
+        existing = set(await self.db.list_collection_names())
+        for name, options in self.collections.items():
+            if name in existing:
+                continue
+            try:
+                await self.db.create_collection(name, **options)
+                print(f"Created collection {name}")
+            except CollectionInvalid:
+                pass  # created concurrently by another worker
+
+    async def check(self) -> List[Tuple[str, IndexModel]]:
+        """Drop retired indexes, record drift, and return declared indexes that are missing."""
+        await self._ensure_collections()
+        missing: List[Tuple[str, IndexModel]] = []
+        self.drift = []
+
+        for collection_name, models in self.indexes.items():
+            collection = self.db[collection_name]
+            existing = await collection.index_information()
+
+            for name in self.retired.get(collection_name, []):
+                if name in existing:
+                    try:
+                        await collection.drop_index(name)
+                        print(f"Dropped retired index {collection_name}.{name}")
+                    except OperationFailure as e:
+                        if e.code != INDEX_NOT_FOUND:
+                            raise
+                        # dropped concurrently by another worker
+                    existing.pop(name)
+
+            declared = {model.document["name"]: model for model in models}
+            for name, model in declared.items():
+                key = f"{collection_name}.{name}"
+                spec = existing.get(name)
+                if spec is None:
+                    missing.append((collection_name, model))
+                    self.status[key] = {"state": "pending"}
+                    continue
+                want = model.document
+                if _normalize_key(spec["key"]) != _normalize_key(want["key"].items()) or _options(spec) != _options(want):
+                    self.drift.append(
+                        f"{key}: exists as {_normalize_key(spec['key'])} {_options(spec)}, "
+                        f"declared as {_normalize_key(want['key'].items())} {_options(want)}"
+                    )
+                self.status[key] = {"state": "present"}
+
+            for name in existing:
+                if name != "_id_" and name not in declared:
+                    self.drift.append(f"{collection_name}.{name}: exists but is not declared in mongo_indexes")
+
+        if self.drift:
+            metrics.gauge("mongo_indexes.drift", len(self.drift))
+            message = "\n".join(self.drift)
+            if self.drift_mode == "fail":
+                raise IndexDriftError(message)
+            print(f"MongoDB index drift (MONGO_INDEX_DRIFT={self.drift_mode}):\n{message}")
+        return missing
+
+    async def _build(self, missing: List[Tuple[str, IndexModel]]):
+        for n, (collection_name, model) in enumerate(missing, start=1):
+            name = model.document["name"]
+            key = f"{collection_name}.{name}"
+            started = time.perf_counter()
+            self.status[key] = {"state": "building"}
+            print(f"Building index {key} ({n}/{len(missing)})")
+
+            build = asyncio.create_task(self.db[collection_name].create_indexes([model]))
+            while True:
+                done, _ = await asyncio.wait({build}, timeout=INDEX_PROGRESS_INTERVAL)
+                if done:
+                    break
+                progress = await self._progress(collection_name, name)
+                self.status[key]["progress"] = progress
+                print(f"Building index {key}: {progress or 'in progress'}")
+
+            seconds = round(time.perf_counter() - started, 3)
+            try:
+                build.result()
+                self.status[key] = {"state": "built", "seconds": seconds}
+                metrics.observe("mongo_indexes.build_seconds", seconds, collection=collection_name)
+                print(f"Built index {key} in {seconds}s")
+            except Exception as e:
+                self.status[key] = {"state": "failed", "seconds": seconds, "error": repr(e)}
+                metrics.incr("mongo_indexes.build_failed", collection=collection_name)
+                print(f"Building index {key} failed: {e!r}")
+
+    async def _progress(self, collection_name: str, index_name: str) -> Optional[str]:
+        """The server's own progress message for a running build, e.g. 'scanning collection: 1200/5000 24%'."""
+        try:
+            ops = await self.db.client.admin.aggregate([
+                {"$currentOp": {}},
+                {"$match": {"command.createIndexes": collection_name, "command.indexes.name": index_name}},
+            ]).to_list(length=1)
+        except Exception:
+            return None  # $currentOp needs extra privileges; progress is best-effort
+        return ops[0].get("msg") if ops else None
+
+    def report(self) -> dict:
+        return {"drift": self.drift, "indexes": self.status}
+
+
+index_manager: Optional[IndexManager] = None
+
+
+def get_index_manager() -> IndexManager:
+    global index_manager
+    if index_manager is None:
+        index_manager = IndexManager()
+    return index_manager
+
+
+async def close_index_manager():
+    global index_manager
+    if index_manager is not None:
+        await index_manager.stop()
+        index_manager = None
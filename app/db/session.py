@@ -1,26 +1,93 @@
 # app/db/session.py
 
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
-from sqlalchemy.pool import NullPool
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool
 from sqlalchemy.orm import DeclarativeBase
 from typing import AsyncGenerator
 import os
+import time
 from dotenv import load_dotenv
 
+from app.core.metrics import metrics
+
 # Load environment variables
 load_dotenv()
 
 # Convert DATABASE_URL for async usage with asyncpg
 DATABASE_URL = os.getenv("DATABASE_URL", "").replace("postgresql://", "postgresql+asyncpg://")
 
+# "pgbouncer": no app-side pool and no prepared statements, safe behind PgBouncer in
+#              transaction mode (every checkout is a new connection to the bouncer)
+# "queue":     a real pool of long-lived connections with asyncpg's statement cache on,
+#              for talking to Postgres directly (or PgBouncer in session mode)
+DB_POOL_MODE = os.getenv("DB_POOL_MODE", "pgbouncer").lower()
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "100"))
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool that records how long each checkout waited for a free connection."""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            metrics.incr("db_pool.checkout_timeouts")
+            raise
+        finally:
+            metrics.observe("db_pool.checkout_wait_seconds", time.perf_counter() - started)
+
+
+def _engine_options(mode: str) -> dict:
+    if mode == "queue":
+        return {
+            "poolclass": InstrumentedQueuePool,
+            "pool_size": DB_POOL_SIZE,
+            "max_overflow": DB_MAX_OVERFLOW,
+            "pool_timeout": DB_POOL_TIMEOUT,
+            "pool_recycle": DB_POOL_RECYCLE,
+            "pool_pre_ping": DB_POOL_PRE_PING,
+            "connect_args": {"prepared_statement_cache_size": DB_STATEMENT_CACHE_SIZE},
+        }
+    return {
+        "poolclass": NullPool,  # <-- Disable pooling (let PgBouncer handle it)
+        "pool_pre_ping": True,
+        "connect_args": {"prepared_statement_cache_size": 0},  # <-- Disable statement caching
+    }
+
+
 # Create the async engine
-engine = create_async_engine(
-    DATABASE_URL,
-    echo=False,
-    pool_pre_ping=True,
-    connect_args={"prepared_statement_cache_size": 0},  # <-- Disable statement caching
-    poolclass=NullPool,  # <-- Disable pooling (let PgBouncer handle it)
-)
+engine = create_async_engine(DATABASE_URL, echo=False, **_engine_options(DB_POOL_MODE))
+
+
+@event.listens_for(engine.sync_engine, "connect")
+def _count_connect(dbapi_connection, connection_record):
+    metrics.incr("db_pool.connects", mode=DB_POOL_MODE)
+
+
+def _pool_gauges() -> dict:
+    pool = engine.pool
+    if not isinstance(pool, AsyncAdaptedQueuePool):
+        return {}
+    capacity = pool.size() + DB_MAX_OVERFLOW
+    checked_out = pool.checkedout()
+    return {
+        "size": pool.size(),
+        "checked_out": checked_out,
+        "checked_in": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+        "saturation": round(checked_out / capacity, 3) if capacity else 0.0,
+    }
+
+
+metrics.register_gauges("db_pool", _pool_gauges)
 
 # Create the session factory
 SessionLocal = async_sessionmaker(bind=engine, autoflush = False, expire_on_commit=False, class_=AsyncSession)
@@ -2,11 +2,33 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.api.router import router as api_router
 from app.db.session import engine
+from app.core.admission import AdmissionMiddleware
+from app.core.responses import FastJSONResponse
+from app.core.auth import close_token_verifier, get_token_verifier
+from app.core.security import InsecureSecretKey, check_secret_key
 import asyncio
 import os
 from app.db.mongodb import get_mongo_db
+from app.db.mongo_indexes import IndexDriftError, close_index_manager, get_index_manager
+from app.services.serpapi_client import close_serpapi_client
+from app.services.serpapi_budget import close_serpapi_budget, get_serpapi_budget
+from app.services.browser_pool import BROWSER_POOL_PREWARM, close_browser_pool, get_browser_pool
+from app.services.scrape_jobs import close_scrape_jobs, get_scrape_jobs
+from app.services.ingest_pool import close_ingest_pool, get_ingest_pool
+from app.services.trend_series import close_trend_series, get_trend_series
+from app.services.trend_categorizer import close_trend_categorizer
+from app.services.email_outbox import close_email_outbox, get_email_outbox
+from app.services.article_service import close_article_cache, get_article_cache
+from app.utils.email import close_email_client
+from app.utils.loop_lag import monitor_loop_lag
 
-app = FastAPI()
+app = FastAPI(default_response_class=FastJSONResponse)
+
+API_PREFIX = "/v1/api"
+
+# Concurrency and rate limits for /scrape, /keywords and the OTP routes (app/core/admission.py).
+# Added before CORS so CORS stays outermost and 429/503 responses still carry its headers.
+app.add_middleware(AdmissionMiddleware, prefix=API_PREFIX)
 
 # ✅ Add CORS Middleware here
 origins = os.getenv("CORS_ORIGINS", "")
@@ -20,10 +42,19 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-app.include_router(api_router, prefix="/v1/api")
+app.include_router(api_router, prefix=API_PREFIX)
+
+background_tasks = []
 
 @app.on_event("startup")
 async def on_startup():
+    # Admin tokens signed with the placeholder secret could be forged by anyone
+    try:
+        check_secret_key()
+    except InsecureSecretKey as e:
+        print(f"❌ {e}, refusing to start.")
+        raise
+
     try:
         #test DB connection
         async with engine.connect() as conn:
@@ -33,6 +64,20 @@ async def on_startup():
     except Exception as e:
         print(f"❌ Database connection failed: {e}")
 
+    # Revoked access tokens (logouts), kept in memory and re-synced periodically
+    try:
+        await get_token_verifier().start()
+        print("✅ Token revocation list loaded.")
+    except Exception as e:
+        print(f"❌ Token revocation list failed to load: {e}")
+
+    # Rendered articles; other workers' writes are noticed through cache_versions
+    try:
+        await get_article_cache().start()
+        print("✅ Article cache sync started.")
+    except Exception as e:
+        print(f"❌ Article cache sync failed to start: {e}")
+
     # MongoDB check
     try:
         mongo_db = get_mongo_db()
@@ -42,6 +87,78 @@ async def on_startup():
     except Exception as e:
         print(f"❌ MongoDB connection failed: {e}")
 
+    # MongoDB indexes: compare with app/db/mongo_indexes.py, build missing ones in the background
+    try:
+        await get_index_manager().start()
+        print("✅ MongoDB indexes checked.")
+    except IndexDriftError as e:
+        print(f"❌ MongoDB index drift, refusing to start:\n{e}")
+        raise
+    except Exception as e:
+        print(f"❌ MongoDB index check failed: {e}")
+
+    # SerpAPI spend so far today / this month, shared by all workers through Mongo
+    try:
+        await get_serpapi_budget().start()
+        print("✅ SerpAPI budget loaded.")
+    except Exception as e:
+        print(f"❌ SerpAPI budget failed to load: {e}")
+
+    # Playwright browser pool for trend scraping
+    if BROWSER_POOL_PREWARM:
+        try:
+            await get_browser_pool().start()
+            print("✅ Browser pool started.")
+        except Exception as e:
+            print(f"❌ Browser pool failed to start: {e}")
+
+    # Process pool for CPU-bound CSV ingest, spawned up front
+    try:
+        await get_ingest_pool().start()
+        print("✅ Ingest process pool started.")
+    except Exception as e:
+        print(f"❌ Ingest process pool failed to start: {e}")
+
+    background_tasks.append(asyncio.create_task(monitor_loop_lag()))
+
+    # Trend volume time-series collections + hourly/daily rollups
+    try:
+        await get_trend_series().start()
+        print("✅ Trend series rollups started.")
+    except Exception as e:
+        print(f"❌ Trend series failed to start: {e}")
+
+    # OTP emails are queued in email_outbox by the request and delivered from here
+    try:
+        await get_email_outbox().start()
+        print("✅ Email outbox sender started.")
+    except Exception as e:
+        print(f"❌ Email outbox sender failed to start: {e}")
+
+    # Background scrape job workers + periodic scheduler
+    try:
+        await get_scrape_jobs().start()
+        print("✅ Scrape job workers started.")
+    except Exception as e:
+        print(f"❌ Scrape job workers failed to start: {e}")
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    for task in background_tasks:
+        task.cancel()
+    await close_scrape_jobs()
+    await close_ingest_pool()
+    await close_trend_series()
+    await close_trend_categorizer()
+    await close_index_manager()
+    await close_email_outbox()
+    await close_token_verifier()
+    await close_article_cache()
+    await close_email_client()
+    await close_serpapi_client()
+    await close_serpapi_budget()
+    await close_browser_pool()
+
 @app.get("/")
 async def root():
     return { "message": "ExplainIt.Tech up and Running" }
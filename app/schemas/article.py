@@ -1,6 +1,6 @@
 from typing import List, Optional
 from datetime import datetime
-from pydantic import BaseModel, ConfigDict
+from pydantic import AliasChoices, BaseModel, ConfigDict, Field
 
 
 # Shared properties
@@ -15,8 +15,9 @@ class ArticleBase(BaseModel):
     content: Optional[str] = None
     excerpt: Optional[str] = None
     reading_time: Optional[int] = None
-    featured_image: Optional[str] = None
-    image_alt: Optional[str] = None
+    # The columns are featured_image_url / image_alt_text; accept both when reading
+    featured_image: Optional[str] = Field(None, validation_alias=AliasChoices("featured_image", "featured_image_url"))
+    image_alt: Optional[str] = Field(None, validation_alias=AliasChoices("image_alt", "image_alt_text"))
     language: Optional[str] = None
     open_graph_title: Optional[str] = None
     open_graph_description: Optional[str] = None
@@ -57,4 +58,30 @@ class ArticleResponse(ArticleBase):
     updated_at: Optional[datetime] = None
     published_at: Optional[datetime] = None
 
-    model_config = ConfigDict(from_attributes=True)
\ No newline at end of file
+    model_config = ConfigDict(from_attributes=True)
+
+
+# Listing entry: everything needed for a card, without the body
+class ArticleSummary(BaseModel):
+    id: int
+    title: str
+    slug: str
+    category: Optional[str] = None
+    subcategory: Optional[str] = None
+    tags: Optional[List[str]] = []
+    excerpt: Optional[str] = None
+    reading_time: Optional[int] = None
+    featured_image: Optional[str] = Field(None, validation_alias=AliasChoices("featured_image", "featured_image_url"))
+    image_alt: Optional[str] = Field(None, validation_alias=AliasChoices("image_alt", "image_alt_text"))
+    language: Optional[str] = None
+    published_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class ArticleListResponse(BaseModel):
+    items: List[ArticleSummary]
+    page: int
+    limit: int
+    has_more: bool
@@ -1,13 +1,16 @@
 from pydantic import BaseModel, Field, ConfigDict
-from typing import List, Optional, Dict
+from typing import List, Optional, Dict, Literal
 from datetime import datetime
 
+DEFAULT_GEO = "IN"
+
 class KeywordSuggestion(BaseModel):
     suggestion: str
     source: str
 
 class KeywordRequest(BaseModel):
     keyword: str
+    geo: str = DEFAULT_GEO
 
 # General DB create/read models (keep for CRUD endpoints if you use them)
 class KeywordBase(BaseModel):
@@ -40,4 +43,24 @@ class KeywordResponse(BaseModel):
     cpc: Optional[float] = None
     seo_difficulty: Optional[float] = None
 
-    model_config = ConfigDict(from_attributes=True)
\ No newline at end of file
+    model_config = ConfigDict(from_attributes=True)
+
+
+# Batch research: /keywords/batch
+class KeywordBatchRequest(BaseModel):
+    keywords: List[str] = Field(..., min_length=1, max_length=500)
+    geo: str = DEFAULT_GEO
+    # optional override, capped by KEYWORD_BATCH_CONCURRENCY
+    concurrency: Optional[int] = Field(default=None, ge=1)
+
+
+class KeywordBatchItem(BaseModel):
+    keyword: str
+    status: Literal["cached", "existing", "created", "empty", "skipped", "failed"]
+    data: Optional[KeywordResponse] = None
+    error: Optional[str] = None
+
+
+class KeywordBatchResponse(BaseModel):
+    results: List[KeywordBatchItem] = Field(default_factory=list)
+    counts: Dict[str, int] = Field(default_factory=dict)
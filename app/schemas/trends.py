@@ -0,0 +1,42 @@
+from datetime import datetime
+from pydantic import BaseModel, Field
+from typing import List, Literal, Optional
+
+from app.db.models.trends import TrendItem
+
+
+class ScrapeMatrixRequest(BaseModel):
+    geos: List[str] = Field(..., min_length=1, examples=[["IN", "US", "GB"]])
+    windows: List[str] = Field(default_factory=lambda: ["24"], min_length=1, examples=[["4", "24", "168"]])
+    sts: str = "active"
+    # optional override of TREND_SCRAPE_PARALLELISM
+    parallelism: Optional[int] = Field(default=None, ge=1, le=16)
+
+
+class TrendSeriesPoint(BaseModel):
+    ts: datetime
+    value: float          # mean volume in the bucket
+    min: int
+    max: int
+    last: int
+    count: int
+
+
+class TrendSeriesResponse(BaseModel):
+    trend: str
+    geo: Optional[str] = None
+    resolution: Literal["raw", "hour", "day"]
+    bucket_seconds: int
+    start: datetime
+    end: datetime
+    points: List[TrendSeriesPoint]
+
+
+class TrendListItem(TrendItem):
+    id: str
+
+
+class TrendListResponse(BaseModel):
+    items: List[TrendListItem]
+    # pass back as ?cursor= for the next page; null on the last page
+    next_cursor: Optional[str] = None
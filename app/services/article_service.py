@@ -0,0 +1,281 @@
+import asyncio
+import os
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Optional
+
+from fastapi import HTTPException
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.core.metrics import metrics
+from app.db.models.article import Article
+from app.db.models.cache_version import CacheVersion
+from app.db.session import SessionLocal
+from app.schemas.article import ArticleCreate, ArticleListResponse, ArticleResponse, ArticleSummary, ArticleUpdate
+from app.services.keyword_cache import LRUCache
+from app.utils.http_cache import make_etag
+from app.utils.singleflight import SingleFlight
+
+# Rendered responses are served from memory for this long. Writes in this worker drop them
+# at once; other workers notice the write within ARTICLE_CACHE_SYNC_SECONDS.
+ARTICLE_CACHE_TTL = int(os.getenv("ARTICLE_CACHE_TTL", "60"))
+ARTICLE_CACHE_SYNC_SECONDS = float(os.getenv("ARTICLE_CACHE_SYNC_SECONDS", "5"))
+ARTICLE_NEGATIVE_TTL = int(os.getenv("ARTICLE_NEGATIVE_TTL", "15"))
+ARTICLE_CACHE_MAX_SIZE = int(os.getenv("ARTICLE_CACHE_MAX_SIZE", "1024"))
+# Browsers keep a copy for a minute, the CDN for five, then both revalidate with the ETag
+ARTICLE_CACHE_CONTROL = os.getenv(
+    "ARTICLE_CACHE_CONTROL",
+    "public, max-age=60, s-maxage=300, stale-while-revalidate=600, stale-if-error=86400",
+)
+ARTICLE_LIST_MAX_LIMIT = int(os.getenv("ARTICLE_LIST_MAX_LIMIT", "50"))
+
+# Schema field -> column where the names differ
+_COLUMNS = {"featured_image": "featured_image_url", "image_alt": "image_alt_text"}
+_CACHE_VERSION = "articles"  # cache_versions.name bumped by every article write
+_SUMMARY_COLUMNS = [
+    Article.id, Article.title, Article.slug, Article.category, Article.subcategory, Article.tags,
+    Article.excerpt, Article.reading_time, Article.featured_image_url, Article.image_alt_text,
+    Article.language, Article.published_at, Article.updated_at,
+]
+
+
+@dataclass(frozen=True)
+class RenderedResponse:
+    body: Optional[bytes]               # JSON bytes, None when there is nothing to serve (404)
+    etag: Optional[str] = None
+    last_modified: Optional[datetime] = None
+
+    @property
+    def missing(self) -> bool:
+        return self.body is None
+
+
+NOT_FOUND = RenderedResponse(body=None)
+
+
+def _modified(row) -> Optional[datetime]:
+    return row.updated_at or row.published_at or getattr(row, "created_at", None)
+
+
+class ArticleCache:
+    """
+    Published articles and listing pages, rendered once to JSON bytes with their ETag, so
+    a hit (and every 304) costs no query and no serialization.
+
+    Concurrent misses for the same key share one query. invalidate() is called after every
+    write; it bumps a generation so a load that was already running cannot store what it
+    read before the write. Writes also bump the `articles` row of cache_versions in their
+    transaction; a background task reads it every ARTICLE_CACHE_SYNC_SECONDS and drops
+    everything when another worker has written, so a stale copy lives at most that long.
+    """
+
+    def __init__(self, session_factory=SessionLocal, max_size: int = ARTICLE_CACHE_MAX_SIZE):
+        self.session_factory = session_factory
+        self.articles = LRUCache(max_size, name="article_cache.articles")
+        self.lists = LRUCache(max_size, name="article_cache.lists")
+        self.generation = 0
+        self.version: Optional[int] = None  # cache_versions value the cached entries reflect
+        self._task: Optional[asyncio.Task] = None
+        self._flight = SingleFlight("article")
+        metrics.register_gauges("article_cache", lambda: {
+            "articles": len(self.articles),
+            "lists": len(self.lists),
+            "generation": self.generation,
+        })
+
+    async def start(self):
+        if self._task is None:
+            # started first, so a database that is down at boot does not disable the sync
+            self._task = asyncio.create_task(self._sync_loop())
+        await self.sync()
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def sync(self):
+        """Drop every cached entry if any worker has written an article since the last sync."""
+        async with self.session_factory() as session:
+            result = await session.execute(select(CacheVersion.version).where(CacheVersion.name == _CACHE_VERSION))
+            version = result.scalar_one_or_none() or 0
+        if version != self.version:
+            self.clear()
+            self.version = version
+
+    async def _sync_loop(self):
+        while True:
+            await asyncio.sleep(ARTICLE_CACHE_SYNC_SECONDS)
+            try:
+                await self.sync()
+            except Exception as e:
+                print(f"Article cache sync failed: {e!r}")
+
+    async def article(self, slug: str) -> RenderedResponse:
+        return await self._cached("article", self.articles, slug, lambda: self._load_article(slug))
+
+    async def listing(self, page: int, limit: int, category: Optional[str] = None, tag: Optional[str] = None) -> RenderedResponse:
+        key = f"{page}:{limit}:{category or ''}:{tag or ''}"
+        return await self._cached("list", self.lists, key, lambda: self._load_listing(page, limit, category, tag))
+
+    def invalidate(self, *slugs: Optional[str], version: Optional[int] = None):
+        """After a write in this worker; `version` is what the write bumped cache_versions to."""
+        self.generation += 1
+        for slug in slugs:
+            if slug:
+                self.articles.delete(slug)
+        self.lists.clear()  # any page may contain the article, or shift because of it
+        if version is not None and self.version is not None and version == self.version + 1:
+            self.version = version  # no other worker wrote in between, so nothing else is stale
+        metrics.incr("article_cache.invalidations")
+
+    def clear(self):
+        self.generation += 1
+        self.articles.clear()
+        self.lists.clear()
+        metrics.incr("article_cache.cleared")
+
+    async def _cached(
+        self, kind: str, cache: LRUCache, key: str, load: Callable[[], Awaitable[RenderedResponse]],
+    ) -> RenderedResponse:
+        entry = cache.get(key)
+        if entry is not None:
+            metrics.incr("article_cache.hit", kind=kind, missing=entry.missing)
+            return entry
+        metrics.incr("article_cache.miss", kind=kind)
+        generation = self.generation
+
+        async def fill() -> RenderedResponse:
+            entry = await load()
+            if generation == self.generation:
+                cache.set(key, entry, ARTICLE_NEGATIVE_TTL if entry.missing else ARTICLE_CACHE_TTL)
+            return entry
+
+        return await self._flight.do(f"{kind}:{generation}:{key}", fill)
+
+    async def _load_article(self, slug: str) -> RenderedResponse:
+        async with self.session_factory() as db:
+            result = await db.execute(
+                select(Article).where(Article.slug == slug, Article.status == "published")
+            )
+            article = result.scalar_one_or_none()
+        if article is None:
+            return NOT_FOUND
+        body = ArticleResponse.__pydantic_serializer__.to_json(ArticleResponse.model_validate(article), by_alias=True)
+        modified = _modified(article)
+        return RenderedResponse(body, make_etag(modified, body), modified)
+
+    async def _load_listing(self, page: int, limit: int, category: Optional[str], tag: Optional[str]) -> RenderedResponse:
+        query = select(*_SUMMARY_COLUMNS).where(Article.status == "published")
+        if category:
+            query = query.where(Article.category == category)
+        if tag:
+            query = query.where(Article.tags.any(tag))
+        query = (
+            query.order_by(Article.published_at.desc(), Article.id.desc())
+            .offset((page - 1) * limit)
+            .limit(limit + 1)  # one extra row tells us whether there is a next page
+        )
+        async with self.session_factory() as db:
+            rows = (await db.execute(query)).all()
+
+        listing = ArticleListResponse(
+            items=[ArticleSummary.model_validate(row) for row in rows[:limit]],
+            page=page,
+            limit=limit,
+            has_more=len(rows) > limit,
+        )
+        body = ArticleListResponse.__pydantic_serializer__.to_json(listing, by_alias=True)
+        newest = max((_modified(row) for row in rows[:limit] if _modified(row)), default=None)
+        # No Last-Modified: an article leaving the page does not advance it, so only the ETag is reliable
+        return RenderedResponse(body, make_etag(newest, body))
+
+
+article_cache: Optional[ArticleCache] = None
+
+
+def get_article_cache() -> ArticleCache:
+    global article_cache
+    if article_cache is None:
+        article_cache = ArticleCache()
+    return article_cache
+
+
+async def close_article_cache():
+    global article_cache
+    if article_cache is not None:
+        await article_cache.stop()
+        article_cache = None
+
+
+async def _bump_cache_version(db: AsyncSession) -> int:
+    """Tell other workers' caches about this write; commits with the caller's transaction."""
+    result = await db.execute(
+        insert(CacheVersion)
+        .values(name=_CACHE_VERSION, version=1)
+        .on_conflict_do_update(index_elements=[CacheVersion.name], set_={"version": CacheVersion.version + 1})
+        .returning(CacheVersion.version)
+    )
+    return result.scalar_one()
+
+
+def _apply(article: Article, data: dict):
+    for field, value in data.items():
+        setattr(article, _COLUMNS.get(field, field), value)
+    if article.status == "published" and article.published_at is None:
+        article.published_at = datetime.now(timezone.utc)
+
+
+async def _ensure_slug_free(slug: str, db: AsyncSession):
+    result = await db.execute(select(Article.id).where(Article.slug == slug))
+    if result.scalar_one_or_none() is not None:
+        raise HTTPException(status_code=400, detail="An article with this slug already exists")
+
+
+async def _get_article(article_id: int, db: AsyncSession) -> Article:
+    article = await db.get(Article, article_id)
+    if article is None:
+        raise HTTPException(status_code=404, detail="Article not found")
+    return article
+
+
+async def create_article_service(payload: ArticleCreate, db: AsyncSession) -> ArticleResponse:
+    await _ensure_slug_free(payload.slug, db)
+    article = Article()
+    _apply(article, payload.model_dump())
+    db.add(article)
+    version = await _bump_cache_version(db)
+    await db.commit()
+    await db.refresh(article)
+    get_article_cache().invalidate(article.slug, version=version)  # drops a cached 404 for the new slug
+    return ArticleResponse.model_validate(article)
+
+
+async def update_article_service(article_id: int, payload: ArticleUpdate, db: AsyncSession) -> ArticleResponse:
+    article = await _get_article(article_id, db)
+    old_slug = article.slug
+    # title and slug are NOT NULL; an explicit null for them means "leave as is"
+    data = {
+        field: value for field, value in payload.model_dump(exclude_unset=True).items()
+        if value is not None or field not in ("title", "slug")
+    }
+    if data.get("slug") and data["slug"] != old_slug:
+        await _ensure_slug_free(data["slug"], db)
+    _apply(article, data)
+    version = await _bump_cache_version(db)
+    await db.commit()
+    await db.refresh(article)
+    get_article_cache().invalidate(old_slug, article.slug, version=version)
+    return ArticleResponse.model_validate(article)
+
+
+async def delete_article_service(article_id: int, db: AsyncSession):
+    article = await _get_article(article_id, db)
+    await db.delete(article)
+    version = await _bump_cache_version(db)
+    await db.commit()
+    get_article_cache().invalidate(article.slug, version=version)
+    return {"status": True, "message": "Article deleted"}
@@ -1,61 +1,97 @@
+import os
 from datetime import datetime, timedelta
+from sqlalchemy import delete, exists, literal, update
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.future import select
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.exc import NoResultFound
 from app.db.models.admin_user import AdminUser
 from app.db.models.email_otp import EmailOTP
 from app.core.security import create_access_token
-from app.utils.email import send_email_otp
+from app.services.email_outbox import enqueue_from, get_email_outbox
+from app.utils.email import render_otp_email
 from fastapi import HTTPException
 import random
 
+OTP_TTL_MINUTES = int(os.getenv("OTP_TTL_MINUTES", "10"))
+OTP_MAX_ATTEMPTS = int(os.getenv("OTP_MAX_ATTEMPTS", "5"))
+
 def generate_otp() -> str:
     return str(random.randint(100000, 999999))
 
-async def send_otp_service(email: str, db: AsyncSession):
-    result = await db.execute(select(AdminUser).where(AdminUser.email == email))
-    user = result.scalars().first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
+def issue_otp_statement(email: str, otp: str, expires_at: datetime):
+    """
+    INSERT ... SELECT ... WHERE EXISTS (admin) ON CONFLICT (email) DO UPDATE RETURNING email.
+    Returns no row when `email` is not an admin, so the lookup and the upsert are one statement.
+    """
+    admin_exists = exists().where(AdminUser.email == email)
+    rows = select(
+        literal(email), literal(otp), literal(expires_at), literal(0)
+    ).where(admin_exists)
+    stmt = insert(EmailOTP).from_select(["email", "otp", "expires_at", "attempts"], rows)
+    return stmt.on_conflict_do_update(
+        index_elements=[EmailOTP.email],
+        set_={
+            "otp": stmt.excluded.otp,
+            "expires_at": stmt.excluded.expires_at,
+            "attempts": 0,
+            "created_at": datetime.utcnow(),
+        },
+    ).returning(EmailOTP.email)
 
+async def send_otp_service(email: str, db: AsyncSession):
     otp = generate_otp()
-    expires_at = datetime.utcnow() + timedelta(minutes=10)
-
-    # Check if OTP already exists
-    result = await db.execute(select(EmailOTP).where(EmailOTP.email == email))
-    existing = result.scalars().first()
-
-    if existing:
-        existing.otp = otp
-        existing.expires_at = expires_at
-    else:
-        new_otp = EmailOTP(email=email, otp=otp, expires_at=expires_at)
-        db.add(new_otp)
-        
-    try:
-        await send_email_otp(email, otp)
-    except Exception as e:
-        await db.rollback() # rollback DB changes if sending fails
-        print(f"Error sending email: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+    expires_at = datetime.utcnow() + timedelta(minutes=OTP_TTL_MINUTES)
+    subject, html = render_otp_email(otp)
+
+    # One statement: upsert the OTP and, only if that produced a row, queue its email.
+    # Delivery happens in the outbox sender, outside this request and transaction.
+    issued = issue_otp_statement(email, otp, expires_at).cte("issued")
+    # The email is useless (and should not sit in the table) once the code has expired
+    result = await db.execute(enqueue_from(issued, issued.c.email, subject, html, expires_at))
+    if result.scalar_one_or_none() is None:
+        await db.rollback()
+        raise HTTPException(status_code=404, detail="User not found")
 
     await db.commit()
-    #await send_email_otp(email, otp)
+    get_email_outbox().notify()
     return {"status":True, "message": f"OTP sent to {email}"}
 
 async def verify_otp_service(email: str, otp: str, db: AsyncSession):
-    result = await db.execute(select(EmailOTP).where(EmailOTP.email == email))
-    otp_record = result.scalars().first()
+    now = datetime.utcnow()
+    # Consumes the OTP in the same statement that checks it, so a replay finds nothing
+    result = await db.execute(
+        delete(EmailOTP)
+        .where(
+            EmailOTP.email == email,
+            EmailOTP.otp == otp,
+            EmailOTP.expires_at > now,
+            EmailOTP.attempts < OTP_MAX_ATTEMPTS,
+        )
+        .returning(EmailOTP.email)
+    )
+    if result.scalar_one_or_none() is None:
+        await _reject_otp(email, now, db)
 
-    if not otp_record or otp_record.otp != otp:
-        raise HTTPException(status_code=401, detail="Invalid OTP")
-    
-    if otp_record.expires_at < datetime.utcnow():
-        raise HTTPException(status_code=401, detail="OTP expired")
+    await db.commit()
+    token = create_access_token(data={"sub": email})
+    return {"status": True, "access_token": token, "token_type": "bearer"}
 
-    # OTP is valid – optionally delete or expire it
-    # await db.delete(otp_record)
+async def _reject_otp(email: str, now: datetime, db: AsyncSession):
+    """Failure path only: count the attempt and report why the OTP was refused."""
+    result = await db.execute(
+        update(EmailOTP)
+        .where(EmailOTP.email == email)
+        .values(attempts=EmailOTP.attempts + 1)
+        .returning(EmailOTP.attempts, EmailOTP.expires_at)
+    )
+    row = result.first()
     await db.commit()
 
-    token = create_access_token(data={"sub": email})
-    return {"status": True, "access_token": token, "token_type": "bearer"}
\ No newline at end of file
+    if row is None:
+        raise HTTPException(status_code=401, detail="Invalid OTP")
+    attempts, expires_at = row
+    if attempts > OTP_MAX_ATTEMPTS:
+        raise HTTPException(status_code=429, detail="Too many attempts, request a new OTP")
+    if expires_at is not None and expires_at <= now:
+        raise HTTPException(status_code=401, detail="OTP expired")
+    raise HTTPException(status_code=401, detail="Invalid OTP")
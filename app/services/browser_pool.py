@@ -0,0 +1,185 @@
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional, Tuple
+
+from playwright.async_api import Browser, BrowserContext, Page, Playwright, async_playwright
+
+from app.core.metrics import metrics
+
+BROWSER_POOL_MAX_CONTEXTS = int(os.getenv("BROWSER_POOL_MAX_CONTEXTS", "2"))
+# Relaunch Chromium after this many contexts to keep its memory from creeping up
+BROWSER_RECYCLE_AFTER = int(os.getenv("BROWSER_RECYCLE_AFTER", "50"))
+# Launch the browser and a warm page at startup instead of on the first scrape. Off by default:
+# every gunicorn worker would start its own Chromium, even workers that never scrape
+BROWSER_POOL_PREWARM = os.getenv("BROWSER_POOL_PREWARM", "false").lower() in ("1", "true", "yes")
+
+LAUNCH_ARGS = ["--no-sandbox"]
+VIEWPORT = {"width": 1280, "height": 720}
+
+
+class BrowserPool:
+    """
+    One long-lived headless Chromium per worker, handing out isolated browser contexts.
+
+    - at most `max_contexts` contexts are open at once
+    - the browser is replaced after `recycle_after` contexts or when it disconnects;
+      the old one is closed once its last context is released
+    - one context + page is kept open and ready for the next caller
+    """
+
+    def __init__(
+        self,
+        max_contexts: int = BROWSER_POOL_MAX_CONTEXTS,
+        recycle_after: int = BROWSER_RECYCLE_AFTER,
+        headless: bool = True,
+    ):
+        self.max_contexts = max_contexts
+        self.recycle_after = recycle_after
+        self.headless = headless
+        self._semaphore = asyncio.Semaphore(max_contexts)
+        self._lock = asyncio.Lock()
+        self._playwright: Optional[Playwright] = None
+        self._browser: Optional[Browser] = None
+        self._uses = 0
+        self._active: Dict[Browser, int] = {}
+        self._warm: Optional[Tuple[Browser, BrowserContext, Page]] = None
+        self._warming: Optional[asyncio.Task] = None
+        metrics.register_gauges("browser_pool", lambda: {
+            "active_contexts": sum(self._active.values()),
+            "browsers": len(self._active),
+            "uses": self._uses,
+            "warm": int(self._warm is not None),
+        })
+
+    async def start(self):
+        async with self._lock:
+            await self._current_browser()
+        await self._refill_warm()
+
+    async def stop(self):
+        async with self._lock:
+            if self._warming is not None:
+                self._warming.cancel()
+            await self._drop_warm()
+            for browser in list(self._active):
+                await self._close_browser(browser)
+            self._browser = None
+            if self._playwright is not None:
+                await self._playwright.stop()
+                self._playwright = None
+
+    # --- browser lifecycle (call with self._lock held) ---
+    async def _launch(self) -> Browser:
+        if self._playwright is None:
+            self._playwright = await async_playwright().start()
+        browser = await self._playwright.chromium.launch(headless=self.headless, args=LAUNCH_ARGS)
+        self._active[browser] = 0
+        self._uses = 0
+        metrics.incr("browser_pool.launches")
+        return browser
+
+    async def _current_browser(self) -> Browser:
+        browser = self._browser
+        if browser is not None and not browser.is_connected():
+            metrics.incr("browser_pool.crashes")
+            await self._retire(browser)
+            browser = None
+        elif browser is not None and self._uses >= self.recycle_after:
+            metrics.incr("browser_pool.recycles")
+            await self._retire(browser)
+            browser = None
+        if browser is None:
+            browser = self._browser = await self._launch()
+        return browser
+
+    async def _retire(self, browser: Browser):
+        self._browser = None
+        if self._warm is not None and self._warm[0] is browser:
+            await self._drop_warm()
+        if self._active.get(browser, 0) == 0:
+            await self._close_browser(browser)
+
+    async def _close_browser(self, browser: Browser):
+        self._active.pop(browser, None)
+        try:
+            await browser.close()
+        except Exception as e:
+            print(f"Browser close failed: {e!r}")
+
+    # --- warm page ---
+    async def _new_page(self, browser: Browser) -> Tuple[BrowserContext, Page]:
+        context = await browser.new_context(viewport=VIEWPORT, accept_downloads=True)
+        page = await context.new_page()
+        return context, page
+
+    async def _drop_warm(self):
+        warm, self._warm = self._warm, None
+        if warm is not None:
+            try:
+                await warm[1].close()
+            except Exception:
+                pass
+
+    async def _refill_warm(self):
+        try:
+            async with self._lock:
+                if self._warm is not None:
+                    return
+                browser = await self._current_browser()
+                context, page = await self._new_page(browser)
+                self._warm = (browser, context, page)
+        except Exception as e:
+            print(f"Browser pool warm-up failed: {e!r}")
+
+    def _schedule_refill(self):
+        if self._warming is None or self._warming.done():
+            self._warming = asyncio.create_task(self._refill_warm())
+
+    # --- public API ---
+    @asynccontextmanager
+    async def page(self) -> AsyncIterator[Page]:
+        """Borrow a page in its own browser context; the context is closed on exit."""
+        async with self._semaphore:
+            async with self._lock:
+                browser = await self._current_browser()
+                if self._warm is not None and self._warm[0] is browser and not self._warm[2].is_closed():
+                    _, context, page = self._warm
+                    self._warm = None
+                    metrics.incr("browser_pool.warm_hits")
+                else:
+                    await self._drop_warm()
+                    context, page = await self._new_page(browser)
+                self._active[browser] = self._active.get(browser, 0) + 1
+                self._uses += 1
+
+            try:
+                yield page
+            finally:
+                try:
+                    await context.close()
+                except Exception as e:
+                    print(f"Browser context close failed: {e!r}")
+                async with self._lock:
+                    self._active[browser] = self._active.get(browser, 1) - 1
+                    retired = browser is not self._browser or not browser.is_connected()
+                    if retired and self._active[browser] <= 0:
+                        await self._close_browser(browser)
+                self._schedule_refill()
+
+
+browser_pool: Optional[BrowserPool] = None
+
+
+def get_browser_pool() -> BrowserPool:
+    global browser_pool
+    if browser_pool is None:
+        browser_pool = BrowserPool()
+    return browser_pool
+
+
+async def close_browser_pool():
+    global browser_pool
+    if browser_pool is not None:
+        await browser_pool.stop()
+        browser_pool = None
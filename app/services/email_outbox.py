@@ -0,0 +1,187 @@
+import asyncio
+import os
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import delete, literal, or_, select, update
+from sqlalchemy.dialects.postgresql import insert
+
+from app.core.metrics import metrics
+from app.db.models.email_outbox import EmailOutbox
+from app.db.session import SessionLocal
+from app.utils.email import get_email_client
+
+EMAIL_OUTBOX_BATCH_SIZE = int(os.getenv("EMAIL_OUTBOX_BATCH_SIZE", "20"))
+EMAIL_OUTBOX_POLL_SECONDS = float(os.getenv("EMAIL_OUTBOX_POLL_SECONDS", "5"))
+# A claimed message not settled within this many seconds (worker died mid-send) is retried
+EMAIL_OUTBOX_LEASE_SECONDS = int(os.getenv("EMAIL_OUTBOX_LEASE_SECONDS", "60"))
+EMAIL_OUTBOX_MAX_ATTEMPTS = int(os.getenv("EMAIL_OUTBOX_MAX_ATTEMPTS", "6"))
+EMAIL_OUTBOX_BACKOFF_SECONDS = float(os.getenv("EMAIL_OUTBOX_BACKOFF_SECONDS", "2"))
+EMAIL_OUTBOX_MAX_BACKOFF_SECONDS = float(os.getenv("EMAIL_OUTBOX_MAX_BACKOFF_SECONDS", "300"))
+
+
+def backoff_seconds(attempts: int) -> float:
+    """Exponential backoff with jitter after the `attempts`-th failed send."""
+    ceiling = min(EMAIL_OUTBOX_MAX_BACKOFF_SECONDS, EMAIL_OUTBOX_BACKOFF_SECONDS * 2 ** (attempts - 1))
+    return random.uniform(ceiling / 2, ceiling)
+
+
+def enqueue_from(rows, to_column, subject: str, html: str, expires_at: Optional[datetime] = None):
+    """INSERT INTO email_outbox SELECT <to_column>, subject, html FROM rows, e.g. from a CTE.
+    A message still undelivered at `expires_at` is dropped instead of sent."""
+    return insert(EmailOutbox).from_select(
+        ["to_email", "subject", "html_content", "expires_at"],
+        select(to_column, literal(subject), literal(html), literal(expires_at, EmailOutbox.expires_at.type)).select_from(rows),
+    ).returning(EmailOutbox.id)
+
+
+class EmailOutboxSender:
+    """
+    Delivers rows of the `email_outbox` table in the background.
+
+    Request handlers only insert a row, in the same transaction as the data the email is
+    about, and call notify(). Workers claim due rows with FOR UPDATE SKIP LOCKED (so
+    several app instances can run senders), push `next_attempt_at` forward by a lease,
+    and send them over the pooled email client. Delivered rows are deleted; failures
+    are retried with exponential backoff until EMAIL_OUTBOX_MAX_ATTEMPTS, then deleted
+    too, as are rows past their `expires_at`: rows may hold OTP codes, so nothing is kept
+    once it can no longer be delivered usefully.
+    """
+
+    def __init__(self, session_factory=SessionLocal, client=None):
+        self.session_factory = session_factory
+        self.client = client
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self.in_flight = 0
+        metrics.register_gauges("email_outbox", lambda: {"in_flight": self.in_flight})
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def notify(self):
+        """Wake the sender now instead of at its next poll."""
+        self._wakeup.set()
+
+    async def _run(self):
+        while True:
+            try:
+                claimed = await self.deliver_due()
+            except Exception as e:
+                print(f"Email outbox delivery failed: {e!r}")
+                claimed = 0
+            if claimed:
+                continue  # more may be due; the next claim returns nothing once drained
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=EMAIL_OUTBOX_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _claim(self, limit: int) -> list:
+        now = datetime.utcnow()
+        due = (
+            select(EmailOutbox.id)
+            .where(
+                EmailOutbox.status == "pending",
+                EmailOutbox.next_attempt_at <= now,
+                or_(EmailOutbox.expires_at.is_(None), EmailOutbox.expires_at > now),
+            )
+            .order_by(EmailOutbox.next_attempt_at)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+        async with self.session_factory() as session:
+            expired = await session.execute(
+                delete(EmailOutbox).where(EmailOutbox.expires_at <= now).returning(EmailOutbox.id)
+            )
+            if dropped := len(expired.all()):
+                metrics.incr("email_outbox.expired", dropped)
+            result = await session.execute(
+                update(EmailOutbox)
+                .where(EmailOutbox.id.in_(due))
+                .values(
+                    attempts=EmailOutbox.attempts + 1,
+                    next_attempt_at=now + timedelta(seconds=EMAIL_OUTBOX_LEASE_SECONDS),
+                )
+                .returning(EmailOutbox.id, EmailOutbox.to_email, EmailOutbox.subject, EmailOutbox.html_content, EmailOutbox.attempts)
+            )
+            rows = result.all()
+            await session.commit()
+        return rows
+
+    async def deliver_due(self, limit: int = EMAIL_OUTBOX_BATCH_SIZE) -> int:
+        """Claim and send one batch of due messages. Returns how many were claimed."""
+        rows = await self._claim(limit)
+        if not rows:
+            return 0
+        client = self.client or get_email_client()
+        self.in_flight += len(rows)
+        try:
+            results = await asyncio.gather(
+                *[self._send(client, row) for row in rows], return_exceptions=True
+            )
+        finally:
+            self.in_flight -= len(rows)
+
+        delivered = [row.id for row, error in zip(rows, results) if error is None]
+        given_up = []
+        now = datetime.utcnow()
+        async with self.session_factory() as session:
+            for row, error in zip(rows, results):
+                if error is None:
+                    continue
+                if row.attempts >= EMAIL_OUTBOX_MAX_ATTEMPTS:
+                    given_up.append(row.id)
+                    metrics.incr("email_outbox.failed")
+                    print(f"Email to {row.to_email} failed permanently after {row.attempts} attempts: {error!r}")
+                    continue
+                metrics.incr("email_outbox.retries")
+                await session.execute(
+                    update(EmailOutbox)
+                    .where(EmailOutbox.id == row.id)
+                    .values(
+                        last_error=repr(error),
+                        next_attempt_at=now + timedelta(seconds=backoff_seconds(row.attempts)),
+                    )
+                )
+            if delivered or given_up:
+                await session.execute(delete(EmailOutbox).where(EmailOutbox.id.in_(delivered + given_up)))
+            await session.commit()
+        metrics.incr("email_outbox.delivered", len(delivered))
+        return len(rows)
+
+    @staticmethod
+    async def _send(client, row) -> None:
+        started = time.perf_counter()
+        try:
+            await client.send(row.to_email, row.subject, row.html_content)
+        finally:
+            metrics.observe("email_outbox.send_seconds", time.perf_counter() - started)
+
+
+email_outbox: Optional[EmailOutboxSender] = None
+
+
+def get_email_outbox() -> EmailOutboxSender:
+    global email_outbox
+    if email_outbox is None:
+        email_outbox = EmailOutboxSender()
+    return email_outbox
+
+
+async def close_email_outbox():
+    global email_outbox
+    if email_outbox is not None:
+        await email_outbox.stop()
+        email_outbox = None
@@ -0,0 +1,103 @@
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Optional, TypeVar
+
+from app.core.metrics import metrics
+
+# Worker processes for CPU-bound ingest (CSV parsing, bulk op building); 0 runs inline
+INGEST_PROCESS_WORKERS = int(os.getenv("INGEST_PROCESS_WORKERS", "2"))
+# Jobs submitted to the pool at once; further callers wait on the loop without blocking it
+INGEST_MAX_PENDING = int(os.getenv("INGEST_MAX_PENDING", str(max(INGEST_PROCESS_WORKERS, 1) * 2)))
+
+T = TypeVar("T")
+
+
+def _ping() -> int:
+    return os.getpid()
+
+
+class IngestPool:
+    """
+    Bounded process pool for the CPU-heavy part of trend ingest, so a large export does
+    not stall every other request on the worker's event loop. Workers are spawned (not
+    forked) so they never inherit the loop, Mongo/Postgres clients or Playwright.
+    """
+
+    def __init__(self, workers: int = INGEST_PROCESS_WORKERS, max_pending: int = INGEST_MAX_PENDING):
+        self.workers = workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._pending = asyncio.Semaphore(max(max_pending, 1))
+        self._waiting = 0
+        self._running = 0
+        metrics.register_gauges("ingest_pool", lambda: {
+            "workers": self.workers,
+            "waiting": self._waiting,
+            "running": self._running,
+        })
+
+    def _ensure_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._executor
+
+    async def start(self):
+        """Spawn the worker processes now rather than on the first ingest."""
+        if self.workers > 0:
+            await asyncio.gather(*(self.run(_ping) for _ in range(self.workers)))
+
+    async def stop(self):
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            await asyncio.to_thread(executor.shutdown, wait=True, cancel_futures=True)
+
+    async def run(self, fn: Callable[..., T], *args) -> T:
+        """Run a picklable, module-level `fn(*args)` in a worker process and await its result."""
+        if self.workers <= 0:
+            return fn(*args)
+
+        self._waiting += 1
+        try:
+            await self._pending.acquire()
+        finally:
+            self._waiting -= 1
+
+        started = time.perf_counter()
+        self._running += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._ensure_executor(), fn, *args)
+        except BrokenProcessPool:
+            # A worker died (e.g. OOM-killed); start a fresh pool for the next caller
+            metrics.incr("ingest_pool.broken")
+            executor, self._executor = self._executor, None
+            if executor is not None:
+                executor.shutdown(wait=False, cancel_futures=True)
+            raise
+        finally:
+            self._running -= 1
+            self._pending.release()
+            metrics.observe("ingest_pool.run_seconds", time.perf_counter() - started, fn=fn.__name__)
+
+
+ingest_pool: Optional[IngestPool] = None
+
+
+def get_ingest_pool() -> IngestPool:
+    global ingest_pool
+    if ingest_pool is None:
+        ingest_pool = IngestPool()
+    return ingest_pool
+
+
+async def close_ingest_pool():
+    global ingest_pool
+    if ingest_pool is not None:
+        await ingest_pool.stop()
+        ingest_pool = None
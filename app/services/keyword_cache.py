@@ -0,0 +1,198 @@
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, Optional
+
+from app.core.metrics import metrics
+
+KEYWORD_CACHE_TTL = int(os.getenv("KEYWORD_CACHE_TTL", "3600"))
+KEYWORD_CACHE_MAX_SIZE = int(os.getenv("KEYWORD_CACHE_MAX_SIZE", "2048"))
+KEYWORD_NEGATIVE_TTL = int(os.getenv("KEYWORD_NEGATIVE_TTL", "600"))
+# Rows older than this are served immediately but refreshed in the background
+KEYWORD_STALE_AFTER = int(os.getenv("KEYWORD_STALE_AFTER", str(7 * 24 * 3600)))
+# "mongo" enables the shared tier so all gunicorn workers see each other's results
+KEYWORD_CACHE_SHARED = os.getenv("KEYWORD_CACHE_SHARED", "").lower()
+
+
+def _as_utc(dt: Optional[datetime]) -> Optional[datetime]:
+    if dt is None:
+        return None
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+
+def is_stale(updated_at: Optional[datetime], stale_after: int = KEYWORD_STALE_AFTER) -> bool:
+    if updated_at is None:
+        return False
+    return datetime.now(timezone.utc) - _as_utc(updated_at) > timedelta(seconds=stale_after)
+
+
+@dataclass
+class CacheEntry:
+    value: Optional[dict]           # KeywordResponse as a dict, None for a negative entry
+    updated_at: Optional[datetime]  # freshness of the underlying row
+
+    @property
+    def negative(self) -> bool:
+        return self.value is None
+
+    def is_stale(self, stale_after: int = KEYWORD_STALE_AFTER) -> bool:
+        return not self.negative and is_stale(self.updated_at, stale_after)
+
+
+class LRUCache:
+    """Size-bounded LRU with a per-entry TTL. Not thread-safe; only used from the event loop."""
+
+    def __init__(self, max_size: int = KEYWORD_CACHE_MAX_SIZE, name: str = "keyword_cache"):
+        self.max_size = max_size
+        self.name = name
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def get(self, key: str):
+        item = self._data.get(key)
+        if item is None:
+            return None
+        value, expires = item
+        if expires < time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: str, value, ttl: float):
+        self._data[key] = (value, time.monotonic() + ttl)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+            metrics.incr(f"{self.name}.evictions")
+
+    def delete(self, key: str):
+        self._data.pop(key, None)
+
+    def clear(self):
+        self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class MongoCacheTier:
+    """Shared cache tier stored in a Mongo collection with a TTL index on expires_at."""
+
+    def __init__(self, collection_name: str = "keyword_cache"):
+        from app.db.mongodb import get_mongo_db
+
+        self.collection = get_mongo_db()[collection_name]
+
+    async def get(self, key: str) -> Optional[CacheEntry]:
+        doc = await self.collection.find_one({"_id": key, "expires_at": {"$gt": datetime.now(timezone.utc)}})
+        if not doc:
+            return None
+        return CacheEntry(value=doc.get("value"), updated_at=_as_utc(doc.get("updated_at")))
+
+    async def set(self, key: str, entry: CacheEntry, ttl: float):
+        expires_at = datetime.now(timezone.utc) + timedelta(seconds=ttl)
+        await self.collection.replace_one(
+            {"_id": key},
+            {"value": entry.value, "updated_at": entry.updated_at, "expires_at": expires_at},
+            upsert=True,
+        )
+
+    async def delete(self, key: str):
+        await self.collection.delete_one({"_id": key})
+
+
+class KeywordCache:
+    """
+    Two-tier keyword result cache: in-process LRU first, then an optional shared tier.
+    Also tracks background refreshes so a stale keyword is only refreshed once at a time.
+    """
+
+    def __init__(self, local: Optional[LRUCache] = None, shared: Optional[MongoCacheTier] = None):
+        self.local = local or LRUCache()
+        self.shared = shared
+        self._refreshing: Dict[str, asyncio.Task] = {}
+        metrics.register_gauges("keyword_cache", lambda: {
+            "size": len(self.local),
+            "refreshing": len(self._refreshing),
+        })
+
+    @staticmethod
+    def _key(keyword: str) -> str:
+        return keyword.strip().lower()
+
+    async def get(self, keyword: str) -> Optional[CacheEntry]:
+        key = self._key(keyword)
+        entry = self.local.get(key)
+        if entry is not None:
+            metrics.incr("keyword_cache.hit", tier="memory", negative=entry.negative)
+            return entry
+
+        if self.shared is not None:
+            try:
+                entry = await self.shared.get(key)
+            except Exception as e:
+                print(f"Keyword cache shared tier error: {e!r}")
+                entry = None
+            if entry is not None:
+                metrics.incr("keyword_cache.hit", tier="shared", negative=entry.negative)
+                self.local.set(key, entry, KEYWORD_NEGATIVE_TTL if entry.negative else KEYWORD_CACHE_TTL)
+                return entry
+
+        metrics.incr("keyword_cache.miss")
+        return None
+
+    async def set(self, keyword: str, value: Optional[dict], updated_at: Optional[datetime] = None):
+        """Store a result; value=None records a negative (no results) entry with a shorter TTL."""
+        key = self._key(keyword)
+        entry = CacheEntry(value=value, updated_at=_as_utc(updated_at))
+        ttl = KEYWORD_NEGATIVE_TTL if entry.negative else KEYWORD_CACHE_TTL
+        self.local.set(key, entry, ttl)
+        if self.shared is not None:
+            try:
+                await self.shared.set(key, entry, ttl)
+            except Exception as e:
+                print(f"Keyword cache shared tier error: {e!r}")
+
+    async def invalidate(self, keyword: str):
+        key = self._key(keyword)
+        self.local.delete(key)
+        if self.shared is not None:
+            try:
+                await self.shared.delete(key)
+            except Exception as e:
+                print(f"Keyword cache shared tier error: {e!r}")
+
+    def schedule_refresh(self, keyword: str, refresh: Callable[[], Awaitable[None]]) -> bool:
+        """Start a background refresh unless one is already running. Returns True if scheduled."""
+        key = self._key(keyword)
+        if key in self._refreshing:
+            return False
+
+        async def runner():
+            started = time.perf_counter()
+            try:
+                await refresh()
+                metrics.incr("keyword_cache.refresh", result="ok")
+            except Exception as e:
+                metrics.incr("keyword_cache.refresh", result="failed")
+                print(f"Keyword refresh failed for {keyword!r}: {e!r}")
+            finally:
+                metrics.observe("keyword_cache.refresh_seconds", time.perf_counter() - started)
+                self._refreshing.pop(key, None)
+
+        self._refreshing[key] = asyncio.create_task(runner())
+        return True
+
+
+keyword_cache: Optional[KeywordCache] = None
+
+
+def get_keyword_cache() -> KeywordCache:
+    global keyword_cache
+    if keyword_cache is None:
+        shared = MongoCacheTier() if KEYWORD_CACHE_SHARED == "mongo" else None
+        keyword_cache = KeywordCache(shared=shared)
+    return keyword_cache
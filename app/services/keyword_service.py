@@ -1,38 +1,78 @@
-import os
-from typing import List, Dict, Optional
-from datetime import datetime
-import asyncio
-
+from typing import Any, AsyncIterator, Callable, List, Dict, Optional
+from collections import Counter
 import asyncio
+import os
+import time
 
-from serpapi import GoogleSearch
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, func, text
+from sqlalchemy.dialects.postgresql import insert
 
+from app.core.metrics import metrics
 from app.db.models.keyword import Keyword
-from app.schemas.keyword import KeywordSuggestion, KeywordResponse
+from app.db.session import SessionLocal
+from app.schemas.keyword import (
+    KeywordSuggestion,
+    KeywordResponse,
+    KeywordBatchItem,
+    KeywordBatchResponse,
+    DEFAULT_GEO,
+)
+from app.services.keyword_cache import KeywordCache, get_keyword_cache, is_stale
+from app.services.serpapi_budget import BATCH, serpapi_priority, serpapi_priority_scope
+from app.services.serpapi_client import SerpApiClient, get_serpapi_client
+from app.utils.singleflight import SingleFlight
+
+# (Keyword column, suggestion source label) in merge priority order
+SUGGESTION_SOURCES = [
+    ("google_autocomplete", "google_autocomplete"),
+    ("google_search", "google_related"),
+    ("youtube", "youtube"),
+    ("google_news", "news"),
+]
+SOURCE_COLUMNS = [column for column, _ in SUGGESTION_SOURCES] + ["google_trend"]
+# _gather_sources source name -> SerpAPI engine it spends credits on
+SOURCE_ENGINES = {
+    "google_autocomplete": "google_autocomplete",
+    "google_trends": "google_trends",
+    "google_related": "google",
+    "youtube": "youtube",
+    "news": "google_news",
+}
+UPSTREAM_CALLS_PER_KEYWORD = 5
+KEYWORD_BATCH_CONCURRENCY = int(os.getenv("KEYWORD_BATCH_CONCURRENCY", "8"))
+# Also serialise upstream fetches of the same keyword across gunicorn workers via pg_advisory_xact_lock
+KEYWORD_ADVISORY_LOCK = os.getenv("KEYWORD_ADVISORY_LOCK", "false").lower() in ("1", "true", "yes")
+
+keyword_flight = SingleFlight("keyword")
+
 
-SERP_API_KEY = os.getenv("SERP_API_KEY")
+def flight_key(keyword: str) -> str:
+    """Same normalisation as the cache key, so "Python" and "python" share one upstream fetch."""
+    return KeywordCache._key(keyword)
+
+SourceCallback = Callable[[str, Any], None]
 
 
 class KeywordService:
-    def __init__(self, db: AsyncSession):
+    def __init__(
+        self,
+        db: AsyncSession,
+        client: Optional[SerpApiClient] = None,
+        cache: Optional[KeywordCache] = None,
+    ):
         self.db = db
+        self.client = client or get_serpapi_client()
+        self.cache = cache or get_keyword_cache()
 
     # --- Generic SerpAPI fetch wrapper ---
-    def _search(self, params: dict) -> dict:
-        try:
-            params["api_key"] = SERP_API_KEY
-            search = GoogleSearch(params)
-            return search.get_dict() or {}
-        except Exception as e:
-            print(f"SerpAPI error: {e}")
-            return {}
+    async def _search(self, params: dict) -> dict:
+        return await self.client.search(params)
 
     # --- Fetch methods ---
     async def fetch_google_autocomplete(self, keyword: str) -> List[str]:
-        params = {"engine": "google_autocomplete", "q": keyword, "api_key": SERP_API_KEY}
-        data = self._search(params)
+        params = {"engine": "google_autocomplete", "q": keyword}
+        data = await self._search(params)
         suggestions = []
 
         print("google_auto_complete-data", data)
@@ -47,7 +87,7 @@ class KeywordService:
         return suggestions
 
     async def fetch_google_trends(self, keyword: str) -> float:
-        params = {"engine": "google_trends", "q": keyword, "api_key": SERP_API_KEY}
+        params = {"engine": "google_trends", "q": keyword}
         data = await self._search(params)
 
         print("google_trends-data", data)
@@ -57,8 +97,8 @@ class KeywordService:
         return float(arr[-1].get("value", 0) or 0)
 
     async def fetch_google_search_related(self, keyword: str) -> List[str]:
-        params = {"engine": "google", "q": keyword, "api_key": SERP_API_KEY}
-        data = self._search(params)
+        params = {"engine": "google", "q": keyword}
+        data = await self._search(params)
         print("google_search-data", data)
 
         related = data.get("related_searches") or []
@@ -74,21 +114,21 @@ class KeywordService:
         return result
 
     async def fetch_youtube(self, keyword: str) -> List[str]:
-        params = {"engine": "youtube", "search_query": keyword, "api_key": SERP_API_KEY}
-        data = self._search(params)
+        params = {"engine": "youtube", "search_query": keyword}
+        data = await self._search(params)
 
         print("youtube-data", data)
         titles = []
         for item in data.get("video_results", []):
             if isinstance(item, dict) and "title" in item:
-                title.append(item["title"])
+                titles.append(item["title"])
             elif isinstance(item, str):
-                title.append(item)
+                titles.append(item)
         return titles
 
     async def fetch_news(self, keyword: str) -> List[str]:
-        params = {"engine": "google_news", "q": keyword, "api_key": SERP_API_KEY}
-        data = self._search(params)
+        params = {"engine": "google_news", "q": keyword}
+        data = await self._search(params)
 
         print("google_new-data", data)
         headlines= []
@@ -102,89 +142,388 @@ class KeywordService:
     # --- DB functions ---
     async def _db_get_keyword(self, keyword: str) -> Optional[Keyword]:
         stmt = select(Keyword).where(Keyword.keyword == keyword)
-        result = self.db.execute(stmt)
+        result = await self.db.execute(stmt)
         return result.scalars().first()
 
-    async def _db_create_keyword(self, keyword: str, source: str, suggestions: List[Dict[str, str]]) -> Keyword:
-        obj = Keyword(
+    async def _db_upsert_keyword(self, keyword: str, geo: str, sources: Dict[str, list]) -> Keyword:
+        """
+        Insert the keyword or overwrite its per-source suggestions if the row already exists.
+        Sources skipped for budget (None) keep their stored value.
+        """
+        fetched = {col: value for col, value in sources.items() if value is not None}
+        stmt = insert(Keyword).values(
             keyword=keyword,
-            source=source,
-            monthly_searches=None,
-            cpc=None,
-            seo_difficulty=None,
-            suggestions=suggestions,
+            source="mixed",
+            geo=geo,
             processed=False,
-            created_at=datetime.utcnow(),
-            updated_at=datetime.utcnow(),
+            updated_at=func.now(),
+            **fetched,
         )
-        self.db.add(obj)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Keyword.keyword],
+            set_={col: stmt.excluded[col] for col in [*fetched, "updated_at"]},
+        ).returning(Keyword)
+        result = await self.db.scalars(stmt, execution_options={"populate_existing": True})
+        row = result.one()
         await self.db.commit()
-        await self.db.refresh(obj)
-        return obj
+        return row
 
-    # --- Main function ---
-    async def get_keyword_data(self, keyword: str) -> KeywordResponse:
-        # 1) Check DB
-        db_keyword = await self._db_get_keyword(keyword)
-        if db_keyword:
-            saved = db_keyword.suggestions or []
-            suggestions = [
-                KeywordSuggestion(suggestion=item.get("suggestion"), source=item.get("source", ""))
-                for item in saved
-            ]
-            return KeywordResponse(
-                status="success",
-                keyword=db_keyword.keyword,
-                suggestions=suggestions,
-                monthly_searches=db_keyword.monthly_searches,
-                cpc=db_keyword.cpc,
-                seo_difficulty=db_keyword.seo_difficulty,
-            )
+    async def _db_get_keywords(self, keywords: List[str]) -> List[Keyword]:
+        stmt = select(Keyword).where(Keyword.keyword.in_(keywords))
+        result = await self.db.execute(stmt)
+        return result.scalars().all()
 
-        # 2) Fetch from all sources concurrently
-        auto, trend_score, related, youtube, news = await self._gather_sources(keyword)
+    async def _db_bulk_upsert_keywords(self, rows: List[dict]) -> list:
+        """
+        Persist many keywords with a single INSERT ... ON CONFLICT statement (one per set of
+        fetched sources, when the SerpAPI budget skipped some sources for some keywords).
+        """
+        table = Keyword.__table__
+        groups: Dict[tuple, List[dict]] = {}
+        for row in rows:
+            row = {col: value for col, value in row.items() if value is not None}
+            groups.setdefault(tuple(sorted(row)), []).append(row)
+
+        saved = []
+        for columns, group in groups.items():
+            stmt = insert(table).values(group)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[table.c.keyword],
+                set_={col: stmt.excluded[col] for col in [*SOURCE_COLUMNS, "updated_at"] if col in columns},
+            ).returning(*table.c)
+            result = await self.db.execute(stmt)
+            saved.extend(result.all())
+        await self.db.commit()
+        return saved
 
-        # Build unique list
+    # --- Helpers ---
+    @staticmethod
+    def _merge_suggestions(sources: Dict[str, list]) -> List[Dict[str, str]]:
+        """Build the de-duplicated suggestion list, earlier sources win."""
         seen = set()
         suggestions_list: List[Dict[str, str]] = []
-
-        def add_suggestions(items: List[str], src: str):
-            for s in (items or []):
+        for column, src in SUGGESTION_SOURCES:
+            for s in (sources.get(column) or []):
                 key = (s or "").strip().lower()
                 if key and key not in seen:
                     seen.add(key)
                     suggestions_list.append({"suggestion": s, "source": src})
+        return suggestions_list
 
-        add_suggestions(auto, "google_autocomplete")
-        add_suggestions(related, "google_related")
-        add_suggestions(youtube, "youtube")
-        add_suggestions(news, "news")
-
-        # 3) Persist new keyword
-        created = await self._db_create_keyword(keyword, "mixed", suggestions_list)
-
-        # 4) Build response
-        resp_suggestions = [item["suggestion"] for item in suggestions_list]
+    @classmethod
+    def _row_to_response(cls, row: Keyword) -> KeywordResponse:
+        sources = {column: getattr(row, column) for column, _ in SUGGESTION_SOURCES}
+        return KeywordResponse(
+            keyword=row.keyword,
+            suggestions=[KeywordSuggestion(**item) for item in cls._merge_suggestions(sources)],
+            monthly_searches=row.monthly_searches,
+            cpc=row.cpc,
+            seo_difficulty=row.seo_difficulty,
+        )
 
+    async def _fetch_sources(self, keyword: str, on_source: Optional[SourceCallback] = None) -> Dict[str, list]:
+        """Per-column results; None for a source the SerpAPI budget skipped."""
+        auto, trend_score, related, youtube, news = await self._gather_sources(keyword, on_source)
         return {
-        "status": "success",
-        "keyword": keyword,
-        "suggestions": resp_suggestions,
-        "monthly_searches": created.monthly_searches,
-        "cpc": created.cpc,
-        "seo_difficulty": created.seo_difficulty,
+            "google_autocomplete": auto,
+            "google_search": related,
+            "youtube": youtube,
+            "google_news": news,
+            "google_trend": None if trend_score is None else ([{"value": trend_score}] if trend_score else []),
         }
 
-    async def _gather_sources(self, keyword: str):
-        """Run all source fetches concurrently."""
+    async def fetch_and_store(
+        self,
+        keyword: str,
+        geo: str = DEFAULT_GEO,
+        on_source: Optional[SourceCallback] = None,
+    ) -> KeywordResponse:
+        """Hit every upstream source, persist the result and refresh the cache."""
+        sources = await self._fetch_sources(keyword, on_source)
+        metrics.incr("keyword.upstream_fetches")
+
+        if any(value is None for value in sources.values()) and not any(sources.values()):
+            # Budget skipped sources and the rest found nothing: no evidence the keyword is empty
+            return KeywordResponse(keyword=keyword)
+        if not any(sources[column] for column, _ in SUGGESTION_SOURCES):
+            # Nothing found anywhere: remember that briefly instead of storing an empty row
+            await self.cache.set(keyword, None)
+            return KeywordResponse(keyword=keyword)
+
+        row = await self._db_upsert_keyword(keyword, geo, sources)
+        response = self._row_to_response(row)
+        await self.cache.set(keyword, response.model_dump(), row.updated_at)
+        return response
+
+    def _schedule_refresh(self, keyword: str, geo: str):
+        self.cache.schedule_refresh(keyword, lambda: refresh_keyword(keyword, geo))
+
+    # --- Main function ---
+    async def lookup_keyword(self, keyword: str, geo: str = DEFAULT_GEO) -> Optional[KeywordResponse]:
+        """Answer from the cache or the DB without touching SerpAPI; None on a full miss."""
+        started = time.perf_counter()
+
+        # 1) In-process / shared cache
+        entry = await self.cache.get(keyword)
+        if entry is not None:
+            if entry.is_stale():
+                self._schedule_refresh(keyword, geo)
+            metrics.incr("keyword.serpapi_calls_saved", UPSTREAM_CALLS_PER_KEYWORD)
+            metrics.observe("keyword.lookup_seconds", time.perf_counter() - started, path="cache")
+            if entry.negative:
+                return KeywordResponse(keyword=keyword)
+            return KeywordResponse.model_validate(entry.value)
+
+        # 2) Check DB
+        db_keyword = await self._db_get_keyword(keyword)
+        if db_keyword:
+            response = self._row_to_response(db_keyword)
+            updated_at = db_keyword.updated_at or db_keyword.created_at
+            await self.cache.set(keyword, response.model_dump(), updated_at)
+            if is_stale(updated_at):
+                self._schedule_refresh(keyword, geo)
+            metrics.incr("keyword_cache.hit", tier="db")
+            metrics.incr("keyword.serpapi_calls_saved", UPSTREAM_CALLS_PER_KEYWORD)
+            metrics.observe("keyword.lookup_seconds", time.perf_counter() - started, path="db")
+            return response
+        return None
+
+    async def get_keyword_data(self, keyword: str, geo: str = DEFAULT_GEO) -> KeywordResponse:
+        response = await self.lookup_keyword(keyword, geo)
+        if response is not None:
+            return response
+
+        # 3) Fetch from all sources concurrently and persist, once per keyword however many callers
+        started = time.perf_counter()
+        response = await keyword_flight.do(flight_key(keyword), lambda: fetch_keyword_exclusive(keyword, geo))
+        metrics.observe("keyword.lookup_seconds", time.perf_counter() - started, path="upstream")
+        return response
+
+    # --- Batch research ---
+    async def get_keywords_batch(
+        self,
+        keywords: List[str],
+        geo: str = DEFAULT_GEO,
+        concurrency: Optional[int] = None,
+    ) -> KeywordBatchResponse:
+        """
+        Resolve many keywords at once: cache, then one IN query for the rest, then a
+        bounded fan-out to SerpAPI for the misses, persisted with a single bulk upsert.
+        """
+        started = time.perf_counter()
+        ordered = list(dict.fromkeys(k.strip() for k in keywords if k and k.strip()))
+        results: Dict[str, KeywordBatchItem] = {}
+
+        # 1) Cache
+        pending = []
+        for kw in ordered:
+            entry = await self.cache.get(kw)
+            if entry is None:
+                pending.append(kw)
+                continue
+            if entry.is_stale():
+                self._schedule_refresh(kw, geo)
+            if entry.negative:
+                results[kw] = KeywordBatchItem(keyword=kw, status="empty", data=KeywordResponse(keyword=kw))
+            else:
+                results[kw] = KeywordBatchItem(
+                    keyword=kw, status="cached", data=KeywordResponse.model_validate(entry.value)
+                )
+
+        # 2) Existing rows in one round trip
+        if pending:
+            for row in await self._db_get_keywords(pending):
+                response = self._row_to_response(row)
+                updated_at = row.updated_at or row.created_at
+                await self.cache.set(row.keyword, response.model_dump(), updated_at)
+                if is_stale(updated_at):
+                    self._schedule_refresh(row.keyword, geo)
+                results[row.keyword] = KeywordBatchItem(keyword=row.keyword, status="existing", data=response)
+        misses = [kw for kw in pending if kw not in results]
+
+        # 3) Fan out the misses, bounded; keywords already being fetched elsewhere are joined.
+        #    Batch lookups yield SerpAPI capacity and budget to interactive ones.
+        limit = min(concurrency or KEYWORD_BATCH_CONCURRENCY, KEYWORD_BATCH_CONCURRENCY)
+        semaphore = asyncio.Semaphore(limit)
+
+        async def fetch_one(kw: str):
+            async with semaphore:
+                try:
+                    if flight_key(kw) in keyword_flight:
+                        joined = await keyword_flight.do(flight_key(kw), lambda: fetch_keyword_exclusive(kw, geo))
+                        return kw, None, joined, None
+                    return kw, await self._fetch_sources(kw), None, None
+                except Exception as e:
+                    return kw, None, None, repr(e)
+
+        with serpapi_priority_scope(BATCH):
+            fetched = await asyncio.gather(*(fetch_one(kw) for kw in misses))
+
+        to_store = []
+        for kw, sources, joined, error in fetched:
+            if error is not None:
+                results[kw] = KeywordBatchItem(keyword=kw, status="failed", error=error)
+            elif joined is not None:
+                results[kw] = KeywordBatchItem(
+                    keyword=kw, status="created" if joined.suggestions else "empty", data=joined
+                )
+            elif any(value is None for value in sources.values()) and not any(sources.values()):
+                metrics.incr("keyword.upstream_fetches")
+                results[kw] = KeywordBatchItem(keyword=kw, status="skipped", error="SerpAPI budget exhausted")
+            elif not any(sources[column] for column, _ in SUGGESTION_SOURCES):
+                metrics.incr("keyword.upstream_fetches")
+                await self.cache.set(kw, None)
+                results[kw] = KeywordBatchItem(keyword=kw, status="empty", data=KeywordResponse(keyword=kw))
+            else:
+                metrics.incr("keyword.upstream_fetches")
+                to_store.append(
+                    {"keyword": kw, "source": "mixed", "geo": geo, "processed": False,
+                     "updated_at": func.now(), **sources}
+                )
+
+        # 4) One bulk upsert for everything new
+        if to_store:
+            for row in await self._db_bulk_upsert_keywords(to_store):
+                response = self._row_to_response(row)
+                await self.cache.set(row.keyword, response.model_dump(), row.updated_at)
+                results[row.keyword] = KeywordBatchItem(keyword=row.keyword, status="created", data=response)
+
+        items = [results[kw] for kw in ordered]
+        metrics.observe("keyword.batch_seconds", time.perf_counter() - started)
+        metrics.incr("keyword.batch_keywords", len(items))
+        return KeywordBatchResponse(results=items, counts=dict(Counter(item.status for item in items)))
+
+    async def _gather_sources(self, keyword: str, on_source: Optional[SourceCallback] = None):
+        """
+        Run all source fetches concurrently on the shared SerpAPI connection pool.
+        on_source(source, result) is called as each one finishes, for streaming.
+        Sources whose engine the SerpAPI budget does not allow right now return None.
+        """
+        allowed = self.client.budget.plan(serpapi_priority.get())
+
+        async def run(source: str, coro):
+            if allowed is not None and SOURCE_ENGINES[source] not in allowed:
+                coro.close()
+                return None
+            result = await coro
+            if on_source is not None:
+                on_source(source, result)
+            return result
+
         tasks = [
-            self.fetch_google_autocomplete(keyword),
-            self.fetch_google_trends(keyword),
-            self.fetch_google_search_related(keyword),
-            self.fetch_youtube(keyword),
-            self.fetch_news(keyword),
+            run("google_autocomplete", self.fetch_google_autocomplete(keyword)),
+            run("google_trends", self.fetch_google_trends(keyword)),
+            run("google_related", self.fetch_google_search_related(keyword)),
+            run("youtube", self.fetch_youtube(keyword)),
+            run("news", self.fetch_news(keyword)),
         ]
         return await asyncio.gather(*tasks, return_exceptions=False)
 
-    
-    
\ No newline at end of file
+
+async def refresh_keyword(keyword: str, geo: str = DEFAULT_GEO):
+    """Background refresh of a stale keyword on its own session (the request's is already closed)."""
+    with serpapi_priority_scope(BATCH):
+        async with SessionLocal() as db:
+            await KeywordService(db).fetch_and_store(keyword, geo)
+
+
+async def fetch_keyword_exclusive(
+    keyword: str,
+    geo: str = DEFAULT_GEO,
+    on_source: Optional[SourceCallback] = None,
+) -> KeywordResponse:
+    """
+    Single-flight leader for a cache/DB miss. Runs on its own session so it outlives the
+    request that started it. With KEYWORD_ADVISORY_LOCK the fetch is also serialised
+    across workers; whoever waited on the lock re-reads the row the winner just stored.
+    """
+    async with SessionLocal() as db:
+        service = KeywordService(db)
+        if KEYWORD_ADVISORY_LOCK:
+            await db.execute(
+                text("SELECT pg_advisory_xact_lock(hashtext(:key))"),
+                {"key": f"keyword:{keyword}"},
+            )
+            row = await service._db_get_keyword(keyword)
+            if row:
+                metrics.incr("singleflight.shared", name="keyword_advisory_lock")
+                response = service._row_to_response(row)
+                await db.commit()  # releases the advisory lock
+                await service.cache.set(keyword, response.model_dump(), row.updated_at or row.created_at)
+                return response
+        # fetch_and_store commits (releasing the lock); a negative result releases it on close
+        return await service.fetch_and_store(keyword, geo, on_source)
+
+
+def _suggestion_events(response: KeywordResponse, emitted: set) -> List[dict]:
+    """Group a finished response by source, skipping suggestions already streamed."""
+    by_source: Dict[str, List[str]] = {}
+    for item in response.suggestions:
+        key = item.suggestion.strip().lower()
+        if key not in emitted:
+            emitted.add(key)
+            by_source.setdefault(item.source, []).append(item.suggestion)
+    return [
+        {"event": "suggestions", "source": source, "suggestions": items}
+        for source, items in by_source.items()
+    ]
+
+
+async def stream_keyword_events(keyword: str, geo: str = DEFAULT_GEO) -> AsyncIterator[dict]:
+    """
+    Yield de-duplicated suggestions as each upstream source completes, then a final
+    "done" event. The merged result is still persisted by the single-flight fetch,
+    which keeps running even if the client disconnects mid-stream.
+    """
+    started = time.perf_counter()
+    async with SessionLocal() as db:
+        response = await KeywordService(db).lookup_keyword(keyword, geo)
+
+    emitted: set = set()
+    if response is not None:
+        for event in _suggestion_events(response, emitted):
+            yield event
+        yield {"event": "done", "keyword": keyword, "cached": True, "total": len(emitted)}
+        return
+
+    queue: asyncio.Queue = asyncio.Queue()
+    fetch = asyncio.ensure_future(keyword_flight.do(
+        flight_key(keyword), lambda: fetch_keyword_exclusive(keyword, geo, lambda src, res: queue.put_nowait((src, res)))
+    ))
+    first = True
+    getter = None
+    try:
+        while True:
+            getter = asyncio.ensure_future(queue.get())
+            await asyncio.wait({getter, fetch}, return_when=asyncio.FIRST_COMPLETED)
+            if not getter.done():
+                getter.cancel()
+                if queue.empty():
+                    break
+                continue
+            source, result = getter.result()
+            if source == "google_trends":
+                event = {"event": "trend", "source": source, "score": result}
+            else:
+                fresh = []
+                for s in (result or []):
+                    key = (s or "").strip().lower()
+                    if key and key not in emitted:
+                        emitted.add(key)
+                        fresh.append(s)
+                if not fresh:
+                    continue
+                event = {"event": "suggestions", "source": source, "suggestions": fresh}
+            if first:
+                metrics.observe("keyword.stream_first_event_seconds", time.perf_counter() - started)
+                first = False
+            yield event
+    finally:
+        if getter is not None and not getter.done():
+            getter.cancel()
+
+    # Joined another caller's fetch (or lost the advisory lock): send whatever we have not streamed yet
+    response = await fetch
+    for event in _suggestion_events(response, emitted):
+        yield event
+    yield {"event": "done", "keyword": keyword, "cached": False, "total": len(emitted)}
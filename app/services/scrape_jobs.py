@@ -0,0 +1,307 @@
+import asyncio
+import os
+import socket
+import time
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Awaitable, Callable, List, Optional, Tuple
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from app.core.metrics import metrics
+from app.db.mongodb import get_mongo_db
+from app.services.trend_scrape import TrendsScraper
+
+SCRAPE_JOB_WORKERS = int(os.getenv("SCRAPE_JOB_WORKERS", "1"))
+# A running job (and its lock) is considered abandoned after this many seconds
+SCRAPE_JOB_LEASE_SECONDS = int(os.getenv("SCRAPE_JOB_LEASE_SECONDS", "900"))
+# The lease and slice locks of a job that is still running are extended this often
+SCRAPE_JOB_RENEW_SECONDS = float(os.getenv("SCRAPE_JOB_RENEW_SECONDS", str(SCRAPE_JOB_LEASE_SECONDS / 3)))
+# A job whose slice is being scraped by another run is queued again after this delay
+SCRAPE_JOB_RETRY_SECONDS = int(os.getenv("SCRAPE_JOB_RETRY_SECONDS", "60"))
+# A job whose lease ran out this many times (its worker died or hung each time) is failed
+SCRAPE_JOB_MAX_ATTEMPTS = int(os.getenv("SCRAPE_JOB_MAX_ATTEMPTS", "3"))
+SCRAPE_JOB_POLL_SECONDS = float(os.getenv("SCRAPE_JOB_POLL_SECONDS", "15"))
+# Periodic scrapes as "geo:hours:every_minutes", e.g. "IN:24:30,US:24:60,IN:168:360"
+TREND_SCRAPE_SCHEDULE = os.getenv("TREND_SCRAPE_SCHEDULE", "")
+
+
+def parse_schedule(value: Optional[str]) -> List[Tuple[str, str, int]]:
+    entries = []
+    for part in (value or "").split(","):
+        bits = [b.strip() for b in part.split(":")]
+        if len(bits) == 3 and all(bits):
+            entries.append((bits[0], bits[1], int(bits[2])))
+    return entries
+
+
+def slice_lock_keys(kind: str, params: dict) -> List[str]:
+    """One lock per (sts, geo, hours) slice, so a matrix job and a single scrape of one of
+    its slices exclude each other. Sorted, so two runs always lock in the same order."""
+    sts = params.get("sts", "active")
+    if kind == "matrix":
+        slices = {(g, h) for g in params["geos"] for h in params["windows"]}
+    else:
+        slices = {(params["geo"], params["hours"])}
+    return [f"scrape:{sts}:{geo}:{hours}" for geo, hours in sorted(slices)]
+
+
+class SliceBusy(Exception):
+    """Another run holds the lock on one of the requested slices."""
+
+
+def _public(doc: Optional[dict]) -> Optional[dict]:
+    if doc is None:
+        return None
+    doc = dict(doc)
+    doc["id"] = doc.pop("_id")
+    return doc
+
+
+class ScrapeJobs:
+    """
+    Mongo-backed job queue for trend scrapes.
+
+    Jobs are documents in `scrape_jobs` (queued -> running -> done | failed). Any worker
+    can claim any queued job, so jobs survive restarts; a job whose lease expired while
+    running is picked up again (up to SCRAPE_JOB_MAX_ATTEMPTS runs, then it is failed), so a
+    running job keeps extending its lease. A lock document
+    per geo/window in `scrape_locks` stops two runs (queued or wait=true) from scraping the
+    same slice at once; a job that finds its slice busy is queued again a little later.
+    The locks also elect one scheduler per entry.
+    """
+
+    def __init__(self, db=None):
+        db = db if db is not None else get_mongo_db()
+        self.jobs = db["scrape_jobs"]
+        self.locks = db["scrape_locks"]
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self._wakeup = asyncio.Event()
+        self._tasks: List[asyncio.Task] = []
+
+    async def start(self, workers: int = SCRAPE_JOB_WORKERS, schedule: Optional[str] = None):
+        for _ in range(workers):
+            self._tasks.append(asyncio.create_task(self._worker()))
+        for geo, hours, minutes in parse_schedule(TREND_SCRAPE_SCHEDULE if schedule is None else schedule):
+            self._tasks.append(asyncio.create_task(self._schedule_loop(geo, hours, minutes)))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    # --- queue API ---
+    async def enqueue(self, kind: str, params: dict, source: str = "api") -> dict:
+        doc = {
+            "_id": uuid.uuid4().hex,
+            "kind": kind,                # "scrape" | "matrix"
+            "params": params,
+            "source": source,            # "api" | "schedule"
+            "status": "queued",
+            "created_at": datetime.utcnow(),
+            "run_after": None,
+            "started_at": None,
+            "finished_at": None,
+            "timings": {},
+            "result": None,
+            "error": None,
+        }
+        await self.jobs.insert_one(doc)
+        metrics.incr("scrape_jobs.enqueued", kind=kind, source=source)
+        self._wakeup.set()
+        return _public(doc)
+
+    async def get(self, job_id: str) -> Optional[dict]:
+        return _public(await self.jobs.find_one({"_id": job_id}))
+
+    async def list(self, status: Optional[str] = None, limit: int = 20) -> List[dict]:
+        query = {"status": status} if status else {}
+        docs = await self.jobs.find(query).sort("created_at", -1).limit(limit).to_list(length=limit)
+        return [_public(d) for d in docs]
+
+    # --- locks ---
+    async def acquire_lock(self, key: str, owner: str, ttl: float = SCRAPE_JOB_LEASE_SECONDS) -> bool:
+        now = datetime.utcnow()
+        try:
+            await self.locks.update_one(
+                {"_id": key, "$or": [{"expires_at": {"$lte": now}}, {"owner": owner}]},
+                {"$set": {"owner": owner, "expires_at": now + timedelta(seconds=ttl), "acquired_at": now}},
+                upsert=True,
+            )
+            return True
+        except DuplicateKeyError:
+            # Held by someone else: the filter did not match and the upsert collided on _id
+            return False
+
+    async def release_lock(self, key: str, owner: str):
+        await self.locks.delete_one({"_id": key, "owner": owner})
+
+    @asynccontextmanager
+    async def slice_locks(self, kind: str, params: dict, owner: str) -> AsyncIterator[None]:
+        """Hold every slice lock of a scrape for the duration of the block. Raises SliceBusy."""
+        held: List[str] = []
+        renewal = None
+        try:
+            for key in slice_lock_keys(kind, params):
+                if not await self.acquire_lock(key, owner):
+                    raise SliceBusy(f"overlapping run in progress ({key})")
+                held.append(key)
+            renewal = asyncio.create_task(self._keep_alive(
+                "lock", lambda: asyncio.gather(*(self.acquire_lock(key, owner) for key in held)),
+            ))
+            yield
+        finally:
+            if renewal is not None:
+                renewal.cancel()
+                await asyncio.gather(renewal, return_exceptions=True)
+            for key in held:
+                try:
+                    await self.release_lock(key, owner)
+                except Exception as e:
+                    print(f"Scrape lock release failed for {key}: {e!r}")  # expires with its lease
+
+    @staticmethod
+    async def _keep_alive(what: str, renew: Callable[[], Awaitable]):
+        while True:
+            await asyncio.sleep(SCRAPE_JOB_RENEW_SECONDS)
+            try:
+                await renew()
+            except Exception as e:
+                print(f"Scrape {what} renewal failed: {e!r}")
+
+    # --- execution ---
+    async def _fail_exhausted(self, now: datetime):
+        """Fail abandoned jobs that have used up their attempts instead of running them again."""
+        result = await self.jobs.update_many(
+            {"status": "running", "lease_expires_at": {"$lt": now}, "attempts": {"$gte": SCRAPE_JOB_MAX_ATTEMPTS}},
+            {"$set": {
+                "status": "failed",
+                "error": f"lease expired {SCRAPE_JOB_MAX_ATTEMPTS} times",
+                "finished_at": now,
+            }, "$unset": {"lease_expires_at": ""}},
+        )
+        if result.modified_count:
+            metrics.incr("scrape_jobs.lease_exhausted", result.modified_count)
+
+    async def _claim(self) -> Optional[dict]:
+        now = datetime.utcnow()
+        await self._fail_exhausted(now)
+        return await self.jobs.find_one_and_update(
+            {"$or": [
+                {"status": "queued", "run_after": {"$not": {"$gt": now}}},
+                {"status": "running", "lease_expires_at": {"$lt": now}, "attempts": {"$lt": SCRAPE_JOB_MAX_ATTEMPTS}},
+            ]},
+            {"$set": {
+                "status": "running",
+                "started_at": now,
+                "worker": self.owner,
+                "lease_expires_at": now + timedelta(seconds=SCRAPE_JOB_LEASE_SECONDS),
+            }, "$inc": {"attempts": 1}},
+            sort=[("created_at", 1)],
+            return_document=ReturnDocument.AFTER,
+        )
+
+    async def _worker(self):
+        while True:
+            try:
+                job = await self._claim()
+            except Exception as e:
+                print(f"Scrape job claim failed: {e!r}")
+                job = None
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=SCRAPE_JOB_POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            try:
+                await self._execute(job)
+            except Exception as e:
+                # The job stays "running" and is claimed again once its lease runs out
+                print(f"Scrape job {job['_id']} could not be completed: {e!r}")
+
+    @staticmethod
+    async def _run(kind: str, p: dict) -> dict:
+        scraper = TrendsScraper()
+        if kind == "matrix":
+            return await scraper.scrape_matrix(p["geos"], p["windows"], p.get("sts", "active"), p.get("parallelism"))
+        return await scraper.fetch_trending_csv_bytes(p["geo"], p["hours"], p.get("sts", "active"))
+
+    async def run_now(self, kind: str, params: dict) -> dict:
+        """Run a scrape in the caller (wait=true) under the same slice locks as queued jobs."""
+        async with self.slice_locks(kind, params, f"{self.owner}:sync:{uuid.uuid4().hex}"):
+            return await self._run(kind, params)
+
+    async def _renew_lease(self, job_id: str):
+        await self.jobs.update_one(
+            {"_id": job_id, "status": "running", "worker": self.owner},
+            {"$set": {"lease_expires_at": datetime.utcnow() + timedelta(seconds=SCRAPE_JOB_LEASE_SECONDS)}},
+        )
+
+    async def _execute(self, job: dict):
+        started = time.perf_counter()
+        queued_seconds = (job["started_at"] - job["created_at"]).total_seconds()
+        lock_owner = f"{self.owner}:{job['_id']}"
+        update = {"timings.queued_seconds": round(queued_seconds, 3)}
+
+        lease = asyncio.create_task(self._keep_alive("lease", lambda: self._renew_lease(job["_id"])))
+        try:
+            async with self.slice_locks(job["kind"], job["params"], lock_owner):
+                result = await self._run(job["kind"], job["params"])
+                update.update(status="done", result=result)
+        except SliceBusy as e:
+            update.update(status="queued", error=str(e), run_after=datetime.utcnow() + timedelta(seconds=SCRAPE_JOB_RETRY_SECONDS))
+        except Exception as e:
+            print(f"Scrape job {job['_id']} failed: {e!r}")
+            update.update(status="failed", error=repr(e))
+        finally:
+            lease.cancel()
+            await asyncio.gather(lease, return_exceptions=True)
+
+        if update["status"] == "queued":
+            # The slice was busy, so the job never ran: that claim does not count as an attempt
+            await self.jobs.update_one(
+                {"_id": job["_id"]},
+                {"$set": update, "$unset": {"lease_expires_at": "", "worker": ""}, "$inc": {"attempts": -1}},
+            )
+            metrics.incr("scrape_jobs.deferred", kind=job["kind"])
+            return
+
+        run_seconds = time.perf_counter() - started
+        update.update({"finished_at": datetime.utcnow(), "timings.run_seconds": round(run_seconds, 3)})
+        await self.jobs.update_one({"_id": job["_id"]}, {"$set": update, "$unset": {"lease_expires_at": ""}})
+        metrics.incr("scrape_jobs.finished", kind=job["kind"], status=update["status"])
+        metrics.observe("scrape_jobs.run_seconds", run_seconds, kind=job["kind"])
+
+    async def _schedule_loop(self, geo: str, hours: str, minutes: int):
+        """Enqueue one scrape per interval; the schedule lock makes exactly one worker do it."""
+        interval = minutes * 60
+        while True:
+            try:
+                # Held for (almost) the whole interval so other workers skip this tick
+                if await self.acquire_lock(f"schedule:{geo}:{hours}", self.owner, ttl=interval - 1):
+                    await self.enqueue("scrape", {"geo": geo, "hours": hours, "sts": "active"}, source="schedule")
+            except Exception as e:
+                print(f"Scrape schedule {geo}/{hours} failed: {e!r}")
+            await asyncio.sleep(interval)
+
+
+scrape_jobs: Optional[ScrapeJobs] = None
+
+
+def get_scrape_jobs() -> ScrapeJobs:
+    global scrape_jobs
+    if scrape_jobs is None:
+        scrape_jobs = ScrapeJobs()
+    return scrape_jobs
+
+
+async def close_scrape_jobs():
+    global scrape_jobs
+    if scrape_jobs is not None:
+        await scrape_jobs.stop()
+        scrape_jobs = None
@@ -0,0 +1,277 @@
+import asyncio
+import os
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Dict, Iterable, Optional, Set
+
+from pymongo import ReturnDocument
+
+from app.core.metrics import metrics
+from app.db.mongodb import get_mongo_db
+from app.utils.rate_limit import TokenBucket, parse_rate_map
+
+# 0 disables a budget / limit
+SERP_API_DAILY_CREDITS = int(os.getenv("SERP_API_DAILY_CREDITS", "0"))
+SERP_API_MONTHLY_CREDITS = int(os.getenv("SERP_API_MONTHLY_CREDITS", "0"))
+SERP_API_GLOBAL_RPS = float(os.getenv("SERP_API_GLOBAL_RPS", "0"))
+# Per-engine request budget in requests/second, e.g. "google:2,youtube:1"; unset engines are unlimited
+SERP_API_RATE_LIMITS = parse_rate_map(os.getenv("SERP_API_RATE_LIMITS"))
+# Credits per search when an engine costs more than one, e.g. "google_trends:2"
+SERP_API_ENGINE_COSTS = parse_rate_map(os.getenv("SERP_API_ENGINE_COSTS"))
+# Below these fractions of the remaining daily/monthly budget, engines are dropped (see plan())
+SERP_API_LOW_BUDGET = float(os.getenv("SERP_API_LOW_BUDGET", "0.25"))
+SERP_API_CRITICAL_BUDGET = float(os.getenv("SERP_API_CRITICAL_BUDGET", "0.05"))
+# Engines kept when degraded: the two that feed most of the merged suggestions
+SERP_API_CORE_ENGINES = [
+    e.strip() for e in os.getenv("SERP_API_CORE_ENGINES", "google_autocomplete,google").split(",") if e.strip()
+]
+SERP_API_BUDGET_FLUSH_SECONDS = float(os.getenv("SERP_API_BUDGET_FLUSH_SECONDS", "10"))
+
+INTERACTIVE = "interactive"
+BATCH = "batch"
+PRIORITIES = (INTERACTIVE, BATCH)
+
+serpapi_priority: ContextVar[str] = ContextVar("serpapi_priority", default=INTERACTIVE)
+
+
+@contextmanager
+def serpapi_priority_scope(priority: str):
+    """Run SerpAPI calls made in this block (and tasks started from it) at `priority`."""
+    token = serpapi_priority.set(priority)
+    try:
+        yield
+    finally:
+        serpapi_priority.reset(token)
+
+
+class BudgetExceeded(Exception):
+    pass
+
+
+class PriorityBucket:
+    """Token bucket whose batch waiters only get a token while no interactive caller is waiting."""
+
+    def __init__(self, rate: float):
+        self.bucket = TokenBucket(rate)
+        self.waiting: Dict[str, int] = {p: 0 for p in PRIORITIES}
+
+    async def acquire(self, priority: str):
+        self.waiting[priority] += 1
+        try:
+            while True:
+                if (priority == INTERACTIVE or not self.waiting[INTERACTIVE]) and self.bucket.try_acquire():
+                    return
+                await asyncio.sleep(max(self.bucket.retry_after(), 0.005))
+        finally:
+            self.waiting[priority] -= 1
+
+
+class SerpApiBudget:
+    """
+    Rate limits, credit budgets and spend accounting for SerpAPI.
+
+    Every search is admitted here first: the global and per-engine request rates are
+    enforced with interactive callers ahead of batch ones, then the credits are charged.
+    As the daily/monthly budget runs down, plan() narrows which engines may be called:
+
+        level      remaining      interactive      batch
+        normal     > LOW          all engines      all engines
+        low        > CRITICAL     all engines      core engines
+        critical   > 0            core engines     none
+        exhausted  0              none             none
+
+    Spend is accumulated in memory and $inc'ed into `serpapi_usage` (one document per
+    day and per month) every SERP_API_BUDGET_FLUSH_SECONDS; each flush reads back the
+    totals, so every worker budgets against the spend of all of them.
+    """
+
+    def __init__(
+        self,
+        daily_credits: int = SERP_API_DAILY_CREDITS,
+        monthly_credits: int = SERP_API_MONTHLY_CREDITS,
+        global_rate: float = SERP_API_GLOBAL_RPS,
+        engine_rates: Optional[Dict[str, float]] = None,
+        engine_costs: Optional[Dict[str, float]] = None,
+        core_engines: Iterable[str] = SERP_API_CORE_ENGINES,
+        db=None,
+    ):
+        self.daily_credits = daily_credits
+        self.monthly_credits = monthly_credits
+        self.global_bucket = PriorityBucket(global_rate) if global_rate > 0 else None
+        rates = SERP_API_RATE_LIMITS if engine_rates is None else engine_rates
+        self.engine_buckets = {engine: PriorityBucket(rate) for engine, rate in rates.items() if rate > 0}
+        self.engine_costs = SERP_API_ENGINE_COSTS if engine_costs is None else engine_costs
+        self.core_engines: Set[str] = set(core_engines)
+        self.usage = (db if db is not None else get_mongo_db())["serpapi_usage"]
+        self._periods = self._period_keys()
+        self._persisted = {"day": 0.0, "month": 0.0}
+        # per period, not yet $inc'ed: "credits" / "engines.<e>" / "priorities.<p>" -> credits
+        self._pending: Dict[str, Counter] = {"day": Counter(), "month": Counter()}
+        self._task: Optional[asyncio.Task] = None
+        metrics.register_gauges("serpapi_budget", self._gauges)
+
+    @staticmethod
+    def _period_keys(now: Optional[datetime] = None) -> Dict[str, str]:
+        now = now or datetime.utcnow()
+        return {"day": f"day:{now:%Y-%m-%d}", "month": f"month:{now:%Y-%m}"}
+
+    def _roll_periods(self):
+        periods = self._period_keys()
+        for name, key in periods.items():
+            if key != self._periods[name]:
+                self._persisted[name] = 0.0
+        self._periods = periods
+
+    # --- budget state ---
+    def spent(self, period: str) -> float:
+        self._roll_periods()
+        return self._persisted[period] + self._pending[period]["credits"]
+
+    def remaining_fraction(self) -> float:
+        fractions = [
+            max(limit - self.spent(period), 0) / limit
+            for period, limit in (("day", self.daily_credits), ("month", self.monthly_credits))
+            if limit > 0
+        ]
+        return min(fractions) if fractions else 1.0
+
+    def level(self) -> str:
+        remaining = self.remaining_fraction()
+        if remaining > SERP_API_LOW_BUDGET:
+            return "normal"
+        if remaining > SERP_API_CRITICAL_BUDGET:
+            return "low"
+        if remaining > 0:
+            return "critical"
+        return "exhausted"
+
+    def plan(self, priority: str) -> Optional[Set[str]]:
+        """Engines `priority` may call right now; None means all of them."""
+        level = self.level()
+        if level == "normal" or (level == "low" and priority == INTERACTIVE):
+            return None
+        if level == "low" or (level == "critical" and priority == INTERACTIVE):
+            return set(self.core_engines)
+        return set()
+
+    def allows(self, engine: str, priority: str) -> bool:
+        engines = self.plan(priority)
+        return engines is None or engine in engines
+
+    # --- admission ---
+    async def acquire(self, engine: str, priority: str = INTERACTIVE):
+        """Wait for the rate limits, then charge the search. Raises BudgetExceeded if not allowed."""
+        if not self.allows(engine, priority):
+            metrics.incr("serpapi_budget.skipped", engine=engine, priority=priority, level=self.level())
+            raise BudgetExceeded(f"SerpAPI budget {self.level()}: {engine} not allowed for {priority}")
+        if self.global_bucket is not None:
+            await self.global_bucket.acquire(priority)
+        bucket = self.engine_buckets.get(engine)
+        if bucket is not None:
+            await bucket.acquire(priority)
+        cost = self.engine_costs.get(engine, 1)
+        self._charge(engine, priority, cost)
+        metrics.incr("serpapi_budget.credits", cost, engine=engine, priority=priority)
+
+    def refund(self, engine: str, priority: str = INTERACTIVE):
+        """Give back what acquire() charged for a search that failed (SerpAPI only bills successful ones)."""
+        cost = self.engine_costs.get(engine, 1)
+        self._charge(engine, priority, -cost)
+        metrics.incr("serpapi_budget.refunded", cost, engine=engine, priority=priority)
+
+    def _charge(self, engine: str, priority: str, cost: float):
+        for pending in self._pending.values():
+            pending["credits"] += cost
+            pending[f"engines.{engine}"] += cost
+            pending[f"priorities.{priority}"] += cost
+
+    # --- persistence ---
+    async def start(self):
+        await self.load()
+        if self._task is None:
+            self._task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        try:
+            await self.flush()
+        except Exception as e:
+            print(f"SerpAPI spend flush failed: {e!r}")
+
+    async def load(self):
+        self._roll_periods()
+        for name, key in self._periods.items():
+            doc = await self.usage.find_one({"_id": key}, {"credits": 1})
+            self._persisted[name] = float((doc or {}).get("credits", 0))
+
+    async def flush(self):
+        """
+        Add pending spend to today's and this month's documents and read back the totals.
+        Each period keeps its own pending counts, so when one update fails only that
+        period is retried on the next flush and the other is not counted twice.
+        """
+        self._roll_periods()
+        for name, key in self._periods.items():
+            pending, self._pending[name] = self._pending[name], Counter()
+            update = {"$setOnInsert": {"period": name}, "$set": {"updated_at": datetime.utcnow()}}
+            if pending:
+                update["$inc"] = dict(pending)
+            try:
+                doc = await self.usage.find_one_and_update(
+                    {"_id": key}, update, upsert=True, return_document=ReturnDocument.AFTER,
+                )
+            except Exception:
+                self._pending[name].update(pending)  # retried on the next flush
+                raise
+            self._persisted[name] = float(doc.get("credits", 0))
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(SERP_API_BUDGET_FLUSH_SECONDS)
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"SerpAPI spend flush failed: {e!r}")
+
+    def _gauges(self) -> dict:
+        gauges = {
+            "daily_spent": self.spent("day"),
+            "daily_limit": self.daily_credits,
+            "monthly_spent": self.spent("month"),
+            "monthly_limit": self.monthly_credits,
+            "remaining_fraction": round(self.remaining_fraction(), 4),
+        }
+        if self.global_bucket is not None:
+            for priority, waiting in self.global_bucket.waiting.items():
+                gauges[f"waiting.{priority}"] = waiting
+        return gauges
+
+    def report(self) -> dict:
+        return {
+            "level": self.level(),
+            "plan": {p: sorted(e) if (e := self.plan(p)) is not None else "all" for p in PRIORITIES},
+            **self._gauges(),
+            "pending": {name: dict(pending) for name, pending in self._pending.items()},
+        }
+
+
+serpapi_budget: Optional[SerpApiBudget] = None
+
+
+def get_serpapi_budget() -> SerpApiBudget:
+    global serpapi_budget
+    if serpapi_budget is None:
+        serpapi_budget = SerpApiBudget()
+    return serpapi_budget
+
+
+async def close_serpapi_budget():
+    global serpapi_budget
+    if serpapi_budget is not None:
+        await serpapi_budget.stop()
+        serpapi_budget = None
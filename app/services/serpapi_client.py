@@ -0,0 +1,100 @@
+import os
+from typing import Dict, Optional
+
+import httpx
+
+from app.core.metrics import metrics
+from app.services.serpapi_budget import BudgetExceeded, SerpApiBudget, get_serpapi_budget, serpapi_priority
+
+SERP_API_KEY = os.getenv("SERP_API_KEY")
+# Point this at a local fake server to exercise the keyword flow without spending credits
+SERP_API_URL = os.getenv("SERP_API_URL", "https://serpapi.com/search.json")
+SERP_API_MAX_CONNECTIONS = int(os.getenv("SERP_API_MAX_CONNECTIONS", "20"))
+
+# Per-engine read timeouts (seconds); trends/youtube/news are noticeably slower than autocomplete
+ENGINE_TIMEOUTS: Dict[str, float] = {
+    "google_autocomplete": 5.0,
+    "google": 10.0,
+    "google_trends": 15.0,
+    "youtube": 15.0,
+    "google_news": 15.0,
+}
+DEFAULT_TIMEOUT = 10.0
+
+
+class SerpApiClient:
+    """Async SerpAPI client backed by one pooled keep-alive httpx connection pool."""
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        base_url: Optional[str] = None,
+        timeouts: Optional[Dict[str, float]] = None,
+        max_connections: int = SERP_API_MAX_CONNECTIONS,
+        budget: Optional[SerpApiBudget] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,  # tests pass an httpx.MockTransport
+    ):
+        self.api_key = api_key if api_key is not None else SERP_API_KEY
+        self.base_url = base_url or SERP_API_URL
+        self.timeouts = {**ENGINE_TIMEOUTS, **(timeouts or {})}
+        # Rate limits, credit budgets and priorities (app/services/serpapi_budget.py)
+        self.budget = budget or get_serpapi_budget()
+        self._http = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+                keepalive_expiry=60,
+            ),
+            timeout=httpx.Timeout(DEFAULT_TIMEOUT, connect=5.0),
+            transport=transport,
+        )
+
+    def timeout_for(self, engine: str) -> httpx.Timeout:
+        return httpx.Timeout(self.timeouts.get(engine, DEFAULT_TIMEOUT), connect=5.0)
+
+    async def search(self, params: dict) -> dict:
+        """Run one SerpAPI query. Errors and timeouts are logged and returned as an empty dict."""
+        engine = params.get("engine", "google")
+        priority = serpapi_priority.get()
+        query = {**params, "api_key": self.api_key, "output": "json"}
+        try:
+            await self.budget.acquire(engine, priority)
+        except BudgetExceeded as e:
+            print(f"SerpAPI skipped ({engine}): {e}")
+            return {}
+        metrics.incr("serpapi.requests", engine=engine)
+        try:
+            response = await self._http.get(self.base_url, params=query, timeout=self.timeout_for(engine))
+            response.raise_for_status()
+        except BaseException as e:
+            # Credits are reserved up front so concurrent calls cannot overspend; no 2xx, no charge
+            self.budget.refund(engine, priority)
+            if not isinstance(e, Exception):
+                raise  # cancelled
+            print(f"SerpAPI error ({engine}): {e!r}")
+            return {}
+        try:
+            return response.json() or {}
+        except ValueError as e:
+            print(f"SerpAPI error ({engine}): {e!r}")
+            return {}
+
+    async def aclose(self):
+        await self._http.aclose()
+
+
+client: Optional[SerpApiClient] = None
+
+
+def get_serpapi_client() -> SerpApiClient:
+    global client
+    if client is None:
+        client = SerpApiClient()
+    return client
+
+
+async def close_serpapi_client():
+    global client
+    if client is not None:
+        await client.aclose()
+        client = None
@@ -0,0 +1,324 @@
+import asyncio
+import json
+import os
+import re
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Protocol, Set, Tuple
+
+import httpx
+from pymongo import UpdateOne
+
+from app.core.metrics import metrics
+from app.db.mongodb import get_mongo_db
+from app.services.keyword_cache import LRUCache
+
+# "rules" (local, free, default) or "gemini"
+TREND_CLASSIFIER = os.getenv("TREND_CLASSIFIER", "rules").lower()
+TREND_CATEGORIZE_BATCH_SIZE = int(os.getenv("TREND_CATEGORIZE_BATCH_SIZE", "50"))
+TREND_CATEGORIZE_CONCURRENCY = int(os.getenv("TREND_CATEGORIZE_CONCURRENCY", "2"))
+TREND_CATEGORY_MEMO_SIZE = int(os.getenv("TREND_CATEGORY_MEMO_SIZE", "20000"))
+
+GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.0-flash")
+# USD per million tokens, for cost accounting only
+GEMINI_INPUT_COST_PER_MTOK = float(os.getenv("GEMINI_INPUT_COST_PER_MTOK", "0.10"))
+GEMINI_OUTPUT_COST_PER_MTOK = float(os.getenv("GEMINI_OUTPUT_COST_PER_MTOK", "0.40"))
+
+# The closed vocabulary every classifier maps into
+CATEGORIES: Dict[str, List[str]] = {
+    "Sports": ["Cricket", "Football", "Tennis", "Other Sports"],
+    "Entertainment": ["Movies", "Music", "TV & Streaming", "Celebrities"],
+    "Politics": ["Elections", "Government", "International"],
+    "Tech": ["AI", "Gadgets", "Software", "Gaming"],
+    "Business": ["Markets", "Companies", "Economy"],
+    "Science & Health": ["Health", "Science", "Weather"],
+    "Other": ["Other"],
+}
+
+
+def normalize_trend(text: str) -> str:
+    """Memo key: case, punctuation and spacing differences map to the same trend."""
+    return " ".join(re.sub(r"[^\w\s]", " ", text.lower()).split())
+
+
+@dataclass
+class Category:
+    category: str
+    subcategory: Optional[str] = None
+
+
+@dataclass
+class ClassifyResult:
+    categories: List[Category]
+    cost_usd: float = 0.0
+
+
+class TrendClassifier(Protocol):
+    name: str
+
+    async def classify(self, texts: List[str]) -> ClassifyResult:
+        """Return one Category per input text, in order."""
+        ...
+
+
+class RulesClassifier:
+    """Keyword rules over normalized text. Free and deterministic: the default and the test stand-in."""
+
+    name = "rules"
+
+    RULES: List[Tuple[str, str, Tuple[str, ...]]] = [
+        ("Sports", "Cricket", ("cricket", "ipl", "t20", "odi", "bcci", "wicket", "test match")),
+        ("Sports", "Football", ("football", "fc", "premier league", "la liga", "uefa", "fifa", "isl")),
+        ("Sports", "Tennis", ("tennis", "wimbledon", "us open", "atp", "wta")),
+        ("Sports", "Other Sports", ("vs", "match", "olympics", "kabaddi", "f1", "grand prix", "nba")),
+        ("Entertainment", "Movies", ("movie", "film", "box office", "trailer", "release date", "ott")),
+        ("Entertainment", "Music", ("song", "album", "concert", "lyrics", "singer")),
+        ("Entertainment", "TV & Streaming", ("netflix", "prime video", "episode", "season", "bigg boss", "web series")),
+        ("Politics", "Elections", ("election", "poll", "vote", "voting", "exit poll")),
+        ("Politics", "Government", ("minister", "parliament", "bill", "government", "supreme court", "bjp", "congress")),
+        ("Tech", "AI", ("ai", "chatgpt", "openai", "gemini", "llm", "artificial intelligence")),
+        ("Tech", "Gadgets", ("iphone", "samsung", "pixel", "oneplus", "smartphone", "launch price")),
+        ("Tech", "Gaming", ("gta", "bgmi", "pubg", "playstation", "xbox", "game")),
+        ("Tech", "Software", ("app", "update", "windows", "android", "ios")),
+        ("Business", "Markets", ("stock", "share price", "sensex", "nifty", "ipo", "crypto", "bitcoin")),
+        ("Business", "Economy", ("gdp", "inflation", "rbi", "repo rate", "budget", "gold rate")),
+        ("Science & Health", "Weather", ("weather", "rain", "cyclone", "earthquake", "heatwave", "imd")),
+        ("Science & Health", "Health", ("virus", "covid", "vaccine", "disease", "outbreak")),
+        ("Science & Health", "Science", ("isro", "nasa", "eclipse", "moon", "satellite")),
+    ]
+
+    async def classify(self, texts: List[str]) -> ClassifyResult:
+        categories = []
+        for text in texts:
+            padded = f" {normalize_trend(text)} "
+            match = next(
+                (Category(cat, sub) for cat, sub, words in self.RULES if any(f" {w} " in padded for w in words)),
+                Category("Other", "Other"),
+            )
+            categories.append(match)
+        return ClassifyResult(categories)
+
+
+class GeminiClassifier:
+    """One Gemini generateContent call per batch, constrained to CATEGORIES via a JSON response."""
+
+    name = "gemini"
+
+    def __init__(self, api_key: Optional[str] = None, model: str = GEMINI_MODEL):
+        self.api_key = api_key or GEMINI_API_KEY
+        self.url = f"https://generativelanguage.googleapis.com/v1beta/models/{model}:generateContent"
+        self._http = httpx.AsyncClient(timeout=httpx.Timeout(60.0, connect=5.0))
+
+    def _prompt(self, texts: List[str]) -> str:
+        return (
+            "Categorize each Google Trends search term. Use only these categories and subcategories:\n"
+            f"{json.dumps(CATEGORIES)}\n"
+            "Reply with a JSON array, one object per term in the same order, "
+            'each {"category": ..., "subcategory": ...}.\n'
+            f"Terms: {json.dumps(texts, ensure_ascii=False)}"
+        )
+
+    async def classify(self, texts: List[str]) -> ClassifyResult:
+        response = await self._http.post(
+            self.url,
+            params={"key": self.api_key},
+            json={
+                "contents": [{"parts": [{"text": self._prompt(texts)}]}],
+                "generationConfig": {"responseMimeType": "application/json", "temperature": 0},
+            },
+        )
+        response.raise_for_status()
+        data = response.json()
+        items = json.loads(data["candidates"][0]["content"]["parts"][0]["text"])
+        if len(items) != len(texts):
+            raise ValueError(f"classifier returned {len(items)} results for {len(texts)} terms")
+
+        categories = []
+        for item in items:
+            category = item.get("category")
+            subcategory = item.get("subcategory")
+            if category not in CATEGORIES:
+                category, subcategory = "Other", "Other"
+            elif subcategory not in CATEGORIES[category]:
+                subcategory = None
+            categories.append(Category(category, subcategory))
+
+        usage = data.get("usageMetadata", {})
+        cost = (
+            usage.get("promptTokenCount", 0) * GEMINI_INPUT_COST_PER_MTOK
+            + usage.get("candidatesTokenCount", 0) * GEMINI_OUTPUT_COST_PER_MTOK
+        ) / 1_000_000
+        return ClassifyResult(categories, cost)
+
+    async def aclose(self):
+        await self._http.aclose()
+
+
+def make_classifier(name: str = TREND_CLASSIFIER) -> TrendClassifier:
+    if name == "gemini":
+        return GeminiClassifier()
+    return RulesClassifier()
+
+
+class TrendCategorizer:
+    """
+    Categorizes growing, uncategorized trends in the background after an ingest.
+
+    Trends are looked up by normalized text in a local LRU and the `trend_categories`
+    memo collection first; only misses are sent to the classifier, in fixed-size
+    batches with at most `concurrency` requests in flight. Every result is memoized,
+    so a trend text is classified once no matter how often it trends again.
+    """
+
+    def __init__(
+        self,
+        classifier: Optional[TrendClassifier] = None,
+        batch_size: int = TREND_CATEGORIZE_BATCH_SIZE,
+        concurrency: int = TREND_CATEGORIZE_CONCURRENCY,
+        db=None,
+    ):
+        db = db if db is not None else get_mongo_db()
+        self.trends = db["trending_searches"]
+        self.memo = db["trend_categories"]
+        self.classifier = classifier or make_classifier()
+        self.batch_size = batch_size
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._local = LRUCache(TREND_CATEGORY_MEMO_SIZE, name="trend_categorizer.memo")
+        self._tasks: Set[asyncio.Task] = set()
+        self._pending: Set[str] = set()
+        self.cost_usd = 0.0
+        metrics.register_gauges("trend_categorizer", lambda: {
+            "pending": len(self._pending),
+            "tasks": len(self._tasks),
+            "cost_usd": round(self.cost_usd, 6),
+        })
+
+    def submit(self, trends: Iterable[str]) -> int:
+        """Queue trends for categorization and return immediately; returns how many were queued."""
+        names = [t for t in dict.fromkeys(trends) if t not in self._pending]
+        if not names:
+            return 0
+        self._pending.update(names)
+        task = asyncio.create_task(self._run(names))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return len(names)
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+        self._pending.clear()
+        if hasattr(self.classifier, "aclose"):
+            await self.classifier.aclose()
+
+    async def _run(self, names: List[str]):
+        try:
+            await self.categorize(names)
+        except Exception as e:
+            metrics.incr("trend_categorizer.errors")
+            print(f"Trend categorization failed: {e!r}")
+        finally:
+            self._pending.difference_update(names)
+
+    async def categorize(self, names: List[str]) -> int:
+        """Categorize whichever of `names` are growing and still uncategorized; returns the update count."""
+        cursor = self.trends.find(
+            {"trend": {"$in": names}, "is_growing": True, "category": None},
+            {"_id": 0, "trend": 1},
+        )
+        todo = [doc["trend"] async for doc in cursor]
+        if not todo:
+            return 0
+
+        keys = {name: normalize_trend(name) for name in todo}
+        known = await self._memo_lookup(set(keys.values()))
+        misses = sorted({key for key in keys.values() if key not in known})
+        metrics.incr("trend_categorizer.memo_hits", len(known))
+        metrics.incr("trend_categorizer.memo_misses", len(misses))
+
+        batches = [misses[i:i + self.batch_size] for i in range(0, len(misses), self.batch_size)]
+        for result in await asyncio.gather(*(self._classify_batch(b) for b in batches), return_exceptions=True):
+            if isinstance(result, Exception):
+                metrics.incr("trend_categorizer.errors")
+                print(f"Trend classifier batch failed: {result!r}")
+            else:
+                known.update(result)
+
+        ops = [
+            # category: None guard keeps manual edits made meanwhile
+            UpdateOne(
+                {"trend": name, "category": None},
+                {"$set": {"category": known[key].category, "subcategory": known[key].subcategory}},
+            )
+            for name, key in keys.items()
+            if key in known
+        ]
+        if not ops:
+            return 0
+        result = await self.trends.bulk_write(ops, ordered=False)
+        metrics.incr("trend_categorizer.categorized", result.modified_count)
+        return result.modified_count
+
+    async def _memo_lookup(self, keys: Set[str]) -> Dict[str, Category]:
+        known: Dict[str, Category] = {}
+        for key in keys:
+            hit = self._local.get(key)
+            if hit is not None:
+                known[key] = hit
+        remaining = [key for key in keys if key not in known]
+        if remaining:
+            async for doc in self.memo.find({"_id": {"$in": remaining}}):
+                known[doc["_id"]] = self._remember(doc["_id"], Category(doc["category"], doc.get("subcategory")))
+        return known
+
+    def _remember(self, key: str, category: Category) -> Category:
+        self._local.set(key, category, ttl=float("inf"))
+        return category
+
+    async def _classify_batch(self, keys: List[str]) -> Dict[str, Category]:
+        async with self._semaphore:
+            started = time.perf_counter()
+            result = await self.classifier.classify(keys)
+            metrics.observe("trend_categorizer.batch_seconds", time.perf_counter() - started, classifier=self.classifier.name)
+
+        self.cost_usd += result.cost_usd
+        metrics.incr("trend_categorizer.batches", classifier=self.classifier.name)
+        metrics.incr("trend_categorizer.classified", len(keys), classifier=self.classifier.name)
+        metrics.incr("trend_categorizer.cost_usd", result.cost_usd, classifier=self.classifier.name)
+
+        now = datetime.utcnow()
+        await self.memo.bulk_write([
+            UpdateOne(
+                {"_id": key},
+                {"$setOnInsert": {
+                    "category": cat.category,
+                    "subcategory": cat.subcategory,
+                    "classifier": self.classifier.name,
+                    "created_at": now,
+                }},
+                upsert=True,
+            )
+            for key, cat in zip(keys, result.categories)
+        ], ordered=False)
+        return {key: self._remember(key, cat) for key, cat in zip(keys, result.categories)}
+
+
+trend_categorizer: Optional[TrendCategorizer] = None
+
+
+def get_trend_categorizer() -> TrendCategorizer:
+    global trend_categorizer
+    if trend_categorizer is None:
+        trend_categorizer = TrendCategorizer()
+    return trend_categorizer
+
+
+async def close_trend_categorizer():
+    global trend_categorizer
+    if trend_categorizer is not None:
+        await trend_categorizer.stop()
+        trend_categorizer = None
@@ -0,0 +1,341 @@
+"""
+Pure (no I/O) pieces of the trending CSV ingest: parsing the export into a frame and
+turning a frame into Mongo bulk operations. Kept free of Mongo/Playwright state so they
+can be benchmarked on their own and run outside the event loop.
+"""
+import hashlib
+import os
+import warnings
+from dataclasses import dataclass, field, replace
+from datetime import datetime, timedelta
+from io import BytesIO
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import bson
+import numpy as np
+import pandas as pd
+from bson.codec_options import CodecOptions
+from bson.raw_bson import RawBSONDocument
+from pymongo import UpdateOne
+
+from app.services.trend_momentum import MOMENTUM_STAGES, slice_key
+
+TREND_BULK_CHUNK_SIZE = int(os.getenv("TREND_BULK_CHUNK_SIZE", "1000"))
+# Unchanged trends still get a volume_history point (and a full re-check) this often
+TREND_HISTORY_INTERVAL_SECONDS = int(os.getenv("TREND_HISTORY_INTERVAL_SECONDS", "3600"))
+# Only a short recent window stays on the trend document; full history is in trend_series
+VOLUME_HISTORY_LENGTH = int(os.getenv("TREND_RECENT_POINTS", "6"))
+
+_VOLUME_MULTIPLIERS = {"": 1, "K": 1_000, "M": 1_000_000}
+_RAW_OPTIONS = CodecOptions(document_class=RawBSONDocument)
+# Google Trends export, e.g. "September 20, 2025 at 10:00:00 AM UTC+5:30"
+_STARTED_FORMAT = "%B %d, %Y at %I:%M:%S %p UTC%z"
+
+
+def _map_unique(values: pd.Series, parse) -> pd.Series:
+    """Run a vectorized parser over the distinct values only, then broadcast back.
+    Export columns are highly repetitive ("200+", "1K+", a handful of start times)."""
+    codes, uniques = pd.factorize(values, use_na_sentinel=False)
+    parsed = parse(pd.Series(uniques, dtype=object))
+    return pd.Series(parsed.to_numpy()[codes], index=values.index, dtype=parsed.dtype)
+
+
+def _parse_volumes(volumes: pd.Series) -> pd.Series:
+    cleaned = volumes.fillna("").astype(str).str.strip().str.replace(r"[+,]", "", regex=True)
+    parts = cleaned.str.extract(r"^(\d*\.?\d+)([KMkm]?)$")
+    numbers = pd.to_numeric(parts[0], errors="coerce")
+    multipliers = parts[1].str.upper().map(_VOLUME_MULTIPLIERS)
+    return (numbers * multipliers).fillna(0).astype("int64")
+
+
+def parse_search_volume_series(volumes: pd.Series) -> pd.Series:
+    """Vectorized '5M+', '20K+', '1.2M', '1,000' -> int64; unknown or empty -> 0."""
+    return _map_unique(volumes, _parse_volumes)
+
+
+def _parse_datetimes(values: pd.Series) -> pd.Series:
+    text = (
+        values.where(values.notna(), None)
+        .str.replace("\u202f", " ", regex=False)
+        .str.replace("\xa0", " ", regex=False)
+        .str.strip()
+        # "UTC+5:30" -> "UTC+05:30" so %z accepts it
+        .str.replace(r"UTC([+-])(\d):", r"UTC\g<1>0\g<2>:", regex=True)
+    )
+    parsed = pd.to_datetime(text, format=_STARTED_FORMAT, errors="coerce", utc=True)
+    retry = parsed.isna() & text.notna() & (text != "")
+    if retry.any():
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", UserWarning)  # "could not infer format" is expected here
+            parsed[retry] = pd.to_datetime(text[retry], errors="coerce", utc=True)
+    return parsed
+
+
+def parse_datetime_series(values: pd.Series) -> pd.Series:
+    """Parse export timestamps with one fixed format; only odd rows fall back to dateutil."""
+    return _map_unique(values, _parse_datetimes)
+
+
+def _datetimes_or_none(values: pd.Series) -> list:
+    """Series of tz-aware timestamps -> list of python datetimes, NaT -> None."""
+    py = values.array.to_pydatetime()
+    return np.where(values.notna().to_numpy(), py, None).tolist()
+
+
+def load_csv_frame(csv_bytes: bytes, geo: Optional[str] = None, hours: Optional[str] = None) -> pd.DataFrame:
+    """Parse one exported CSV (one geo, one `hours` window) into the normalized frame the writer expects."""
+    df = pd.read_csv(BytesIO(csv_bytes), dtype=str)
+    df.columns = [c.strip() for c in df.columns]
+
+    out = pd.DataFrame({
+        "trend": df["Trends"].str.strip(),
+        "search_volume": parse_search_volume_series(df["Search volume"]),
+        "started": parse_datetime_series(df["Started"]),
+        "ended": parse_datetime_series(df["Ended"]),
+        "trend_breakdown": df["Trend breakdown"].fillna("").str.strip(),
+        "explore_link": df["Explore link"],
+    })
+    out["geos"] = [[geo] if geo else []] * len(out)
+    out["window_hours"] = pd.array([int(hours) if hours else None] * len(out), dtype="Int64")
+    out["slice"] = slice_key(geo, hours)
+
+    # Filter out trends with zero search volume
+    return out[out["search_volume"] > 0]
+
+
+def merge_frames(frames: List[pd.DataFrame]) -> pd.DataFrame:
+    """
+    Combine slices into one row per trend, geos unioned across slices. Volumes are only
+    compared within one window: the row comes from the shortest window the trend appears
+    in (its most current reading), with the highest volume across geos in that window.
+    """
+    if not frames:
+        return pd.DataFrame()
+    df = pd.concat(frames, ignore_index=True)
+    geos = df.groupby("trend")["geos"].agg(lambda col: sorted({g for gs in col for g in gs}))
+    df = (
+        df.sort_values(["window_hours", "search_volume"], ascending=[True, False], kind="stable")
+        .drop_duplicates("trend")
+    )
+    df["geos"] = df["trend"].map(geos)
+    return df
+
+
+# A trend is rewritten only when one of these changes
+_HASHED_COLUMNS = ["search_volume", "started", "ended", "trend_breakdown", "window_hours", "slice"]
+
+
+def csv_fingerprint(slices: List[bytes]) -> str:
+    digest = hashlib.sha256()
+    for csv_bytes in slices:
+        digest.update(hashlib.sha256(csv_bytes).digest())
+    return digest.hexdigest()
+
+
+def row_hashes(df: pd.DataFrame) -> List[str]:
+    """Stable per-row content hash over volume, breakdown, the started/ended window and the volume's slice."""
+    hashes = pd.util.hash_pandas_object(df[_HASHED_COLUMNS], index=False)
+    return [format(h, "016x") for h in hashes.tolist()]
+
+
+def frame_columns(df: pd.DataFrame) -> Dict[str, list]:
+    """Materialize each column once as native python values (no per-row pandas access)."""
+    return {
+        "trend": df["trend"].tolist(),
+        "search_volume": df["search_volume"].astype("int64").tolist(),
+        "started": _datetimes_or_none(df["started"]),
+        "ended": _datetimes_or_none(df["ended"]),
+        "trend_breakdown": df["trend_breakdown"].tolist(),
+        "explore_link": df["explore_link"].where(df["explore_link"].notna(), None).tolist(),
+        "geos": df["geos"].tolist(),
+        "content_hash": row_hashes(df),
+        "window_hours": df["window_hours"].astype(object).where(df["window_hours"].notna(), None).tolist(),
+        "slice": df["slice"].tolist(),
+    }
+
+
+def _literal(value):
+    # Pipeline updates treat strings starting with "$" as field paths; trend text is user data
+    return {"$literal": value}
+
+
+# Stages after the per-trend one; they only reference fields, so every op shares them.
+# is_growing comes from the momentum state of the trend's slice (app/services/trend_momentum.py)
+SHARED_STAGES = MOMENTUM_STAGES
+
+
+def _trend_rows(df: pd.DataFrame):
+    cols = frame_columns(df)
+    return zip(
+        cols["trend"], cols["search_volume"], cols["started"], cols["ended"],
+        cols["trend_breakdown"], cols["explore_link"], cols["geos"], cols["content_hash"], cols["window_hours"],
+        cols["slice"],
+    )
+
+
+def _slices_hash(content_hash: str, readings: List[Tuple[str, int]]) -> str:
+    """Fold the other slices' volumes into the row hash, so their momentum is kept current too."""
+    return hashlib.sha256(f"{content_hash}|{readings}".encode()).hexdigest()[:16]
+
+
+def _trend_stage(
+    trend_name, volume, started, ended, breakdown, link, geos, content_hash, window_hours, slice_name,
+    ts_now: datetime, readings: Optional[List[Tuple[str, int]]] = None,
+) -> dict:
+    """`readings` are (slice, volume) for every slice the trend was in; by default just its own."""
+    readings = readings or [(slice_name, volume)]
+    return {"$set": {
+        "trend": _literal(trend_name),
+        "search_volume": volume,
+        "window_hours": window_hours,
+        "momentum_slice": _literal(slice_name),
+        "_slices": _literal([{"k": k, "v": v} for k, v in readings]),
+        "started": started,
+        "ended": ended,
+        "trend_breakdown": _literal(breakdown),
+        "explore_link": _literal(link),
+        "last_updated": ts_now,
+        "content_hash": content_hash,
+        "history_at": ts_now,
+        # $push + $each + $slice, done inside the pipeline
+        "volume_history": {"$slice": [
+            {"$concatArrays": [
+                {"$ifNull": ["$volume_history", []]},
+                [{"ts": ts_now, "value": volume, "slice": _literal(slice_name)}],
+            ]},
+            -VOLUME_HISTORY_LENGTH,
+        ]},
+        "geos": {"$setUnion": [{"$ifNull": ["$geos", []]}, _literal(geos)]},
+        # small running summary in place of an ever-growing history array
+        "first_seen": {"$ifNull": ["$first_seen", ts_now]},
+        "history_points": {"$add": [{"$ifNull": ["$history_points", 0]}, 1]},
+        "peak_volume": {"$max": [{"$ifNull": ["$peak_volume", 0]}, volume]},
+        "peak_at": {"$cond": [{"$gt": [volume, {"$ifNull": ["$peak_volume", 0]}]}, ts_now, "$peak_at"]},
+        # $setOnInsert equivalents: keep whatever an existing document already has
+        "status": {"$ifNull": ["$status", "Open"]},
+        "category": {"$ifNull": ["$category", None]},
+        "subcategory": {"$ifNull": ["$subcategory", None]},
+        "draft_id": {"$ifNull": ["$draft_id", None]},
+    }}
+
+
+def build_trend_ops(df: pd.DataFrame, ts_now: datetime) -> List[UpdateOne]:
+    """
+    Build one atomic upsert per trend. Each is an update pipeline so Mongo itself appends
+    the new volume point (keeping the last VOLUME_HISTORY_LENGTH), fills insert-only
+    defaults and updates momentum and is_growing; nothing has to be read back first, and two
+    overlapping ingests cannot overwrite each other's history.
+    """
+    return [
+        UpdateOne({"trend": row[0]}, [_trend_stage(*row, ts_now), *SHARED_STAGES], upsert=True)
+        for row in _trend_rows(df)
+    ]
+
+
+def chunked(items: list, size: int = TREND_BULK_CHUNK_SIZE):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+class TrendUpdate(NamedTuple):
+    trend: str
+    content_hash: str
+    geos: List[str]
+    stage: bytes    # BSON-encoded first pipeline stage
+    points: bytes   # concatenated BSON time-series points, one per slice the trend was in
+
+
+@dataclass
+class TrendBatch:
+    """
+    Everything the Mongo writer needs from one ingest, built off the event loop.
+
+    Documents travel BSON-encoded: unpickling 100k nested dicts back in the web process
+    is a single GIL-holding call that stalls the loop for seconds, while bytes come back
+    almost for free and pymongo sends RawBSONDocuments as-is.
+    """
+    ts_now: Optional[datetime] = None
+    updates: List[TrendUpdate] = field(default_factory=list)
+    trend_names: List[str] = field(default_factory=list)
+    processed_rows: int = 0
+    slice_rows: List[int] = field(default_factory=list)
+    slice_errors: List[Optional[str]] = field(default_factory=list)
+
+    def op_chunks(self, size: int = TREND_BULK_CHUNK_SIZE):
+        """Yield UpdateOne lists lazily, one bulk_write chunk at a time."""
+        for chunk in chunked(self.updates, size):
+            yield [
+                UpdateOne({"trend": u.trend}, [RawBSONDocument(u.stage), *SHARED_STAGES], upsert=True)
+                for u in chunk
+            ]
+
+    def point_docs(self) -> List[RawBSONDocument]:
+        return bson.decode_all(b"".join(u.points for u in self.updates), _RAW_OPTIONS)
+
+    def changed_since(self, existing: Dict[str, dict]) -> "TrendBatch":
+        """
+        Keep only trends that need a write given their stored {content_hash, history_at, geos}:
+        new, changed content, seen in a new geo, or due a volume_history point.
+        """
+        history_due = self.ts_now - timedelta(seconds=TREND_HISTORY_INTERVAL_SECONDS)
+        changed = []
+        for update in self.updates:
+            doc = existing.get(update.trend)
+            if (
+                doc is None
+                or doc.get("content_hash") != update.content_hash
+                or (doc.get("history_at") or datetime.min) <= history_due
+                or not set(update.geos) <= set(doc.get("geos") or [])
+            ):
+                changed.append(update)
+        return replace(self, updates=changed)
+
+
+def prepare_trend_batch(slices: List[Tuple[bytes, Optional[str], Optional[str]]], ts_now: datetime) -> TrendBatch:
+    """
+    Process-pool entry point: raw CSV bytes per (geo, hours) slice -> ready-to-write bulk ops.
+    A slice that fails to parse is reported in `slice_errors` instead of failing the rest.
+    """
+    batch = TrendBatch(ts_now=ts_now)
+    frames = []
+    for csv_bytes, geo, hours in slices:
+        try:
+            frame = load_csv_frame(csv_bytes, geo, hours)
+        except Exception as e:
+            batch.slice_rows.append(0)
+            batch.slice_errors.append(repr(e))
+            continue
+        frames.append((frame, geo))
+        batch.slice_rows.append(len(frame))
+        batch.slice_errors.append(None)
+
+    frames = [(f, geo) for f, geo in frames if not f.empty]
+    if not frames:
+        return batch
+    df = frames[0][0] if len(frames) == 1 else merge_frames([f for f, _ in frames])
+
+    # Every slice's reading feeds that slice's momentum; series points per geo are only
+    # taken from the window the stored volume was read from
+    window = dict(zip(df["trend"].tolist(), df["window_hours"].fillna(0).tolist()))
+    readings: Dict[str, Dict[str, int]] = {}
+    points: Dict[str, bytes] = {}
+    for frame, geo in frames:
+        rows = zip(
+            frame["trend"].tolist(), frame["search_volume"].tolist(),
+            frame["window_hours"].fillna(0).tolist(), frame["slice"].tolist(),
+        )
+        for name, volume, hours, slice_name in rows:
+            readings.setdefault(name, {})[slice_name] = volume
+            if hours == window[name]:
+                point = bson.encode({"ts": ts_now, "meta": {"trend": name, "geo": geo}, "value": volume})
+                points[name] = points.get(name, b"") + point
+
+    for row in _trend_rows(df):
+        trend_readings = sorted(readings[row[0]].items())
+        if len(trend_readings) > 1:
+            row = (*row[:7], _slices_hash(row[7], trend_readings), *row[8:])
+        stage = _trend_stage(*row, ts_now, trend_readings)
+        batch.updates.append(TrendUpdate(row[0], row[7], row[6], bson.encode(stage), points.get(row[0], b"")))
+    batch.trend_names = df["trend"].unique().tolist()
+    batch.processed_rows = len(df)
+    return batch
@@ -0,0 +1,144 @@
+"""
+Incremental momentum scoring for trends, evaluated by Mongo inside the ingest upsert.
+
+Volumes from different geos and `hours` windows are not comparable, so each trend keeps
+one tiny running state per slice in `momentum."<geo>:<hours>"`. A slice is updated from
+its new volume and the time since that slice's last update only; no history is read.
+With dt in hours:
+
+    alpha        = 1 - exp(-dt / tau)                  (time-aware EWMA weight)
+    ewma         = alpha * volume + (1 - alpha) * ewma
+    slope        = EWMA of d(ewma)/dt                  (volume per hour)
+    acceleration = EWMA of d(slope)/dt                 (volume per hour^2)
+    score        = (slope + acceleration / 2) / ewma   (relative growth per hour)
+                   * log10(1 + ewma)                   (bigger trends rank higher)
+                   / (1 + age_hours / 24)              (fresh trends rank higher)
+
+The score and is_growing of `momentum_slice` (the slice search_volume was read from) are
+copied to the top level, so "top rising" is a sorted index scan.
+"""
+import math
+import os
+
+MOMENTUM_HALF_LIFE_HOURS = float(os.getenv("MOMENTUM_HALF_LIFE_HOURS", "3"))
+# Two ingests closer than this are treated as this far apart, so slopes stay finite
+MOMENTUM_MIN_DT_HOURS = 1 / 60
+
+_TAU = MOMENTUM_HALF_LIFE_HOURS / math.log(2)
+_MS_PER_HOUR = 3_600_000
+
+
+def slice_key(geo, hours) -> str:
+    return f"{geo or ''}:{hours or ''}"
+
+
+def _let(vars: dict, expression) -> dict:
+    return {"$let": {"vars": vars, "in": expression}}
+
+
+def _ewma(alpha, value, previous):
+    return {"$add": [
+        {"$multiply": [alpha, value]},
+        {"$multiply": [{"$subtract": [1, alpha]}, previous]},
+    ]}
+
+
+def _rate(new, old):
+    """(new - old) per hour since the slice's last update; 0 on its first observation."""
+    return {"$cond": [{"$eq": ["$$dt", None]}, 0, {"$divide": [{"$subtract": [new, old]}, "$$dt"]}]}
+
+
+def _slice_state(momentum, key):
+    """momentum[key] for a key only known at run time ($getField needs a constant before 7.2)."""
+    return _let(
+        {"entry": {"$first": {"$filter": {
+            "input": {"$objectToArray": momentum},
+            "cond": {"$eq": ["$$this.k", key]},
+        }}}},
+        "$$entry.v",
+    )
+
+
+def _next_state(previous, volume) -> dict:
+    """New state of one slice from its previous state (or null) and the volume just read."""
+    return _let({"p": previous, "volume": volume}, _let(
+        {
+            "dt": {"$cond": [
+                {"$ifNull": ["$$p.updated_at", False]},
+                {"$max": [
+                    {"$divide": [{"$subtract": ["$last_updated", "$$p.updated_at"]}, _MS_PER_HOUR]},
+                    MOMENTUM_MIN_DT_HOURS,
+                ]},
+                None,
+            ]},
+            "ewma": {"$ifNull": ["$$p.ewma", "$$volume"]},
+            "slope": {"$ifNull": ["$$p.slope", 0]},
+            "acceleration": {"$ifNull": ["$$p.acceleration", 0]},
+        },
+        _let(
+            {"alpha": {"$cond": [
+                {"$eq": ["$$dt", None]},
+                1,
+                {"$subtract": [1, {"$exp": {"$divide": [{"$multiply": [-1, "$$dt"]}, _TAU]}}]},
+            ]}},
+            _let({"new_ewma": _ewma("$$alpha", "$$volume", "$$ewma")}, _let(
+                {"new_slope": _ewma("$$alpha", _rate("$$new_ewma", "$$ewma"), "$$slope")},
+                _let({
+                    "new_acceleration": _ewma("$$alpha", _rate("$$new_slope", "$$slope"), "$$acceleration"),
+                    "age_hours": {"$cond": [
+                        {"$ifNull": ["$started", False]},
+                        {"$max": [{"$divide": [{"$subtract": ["$last_updated", "$started"]}, _MS_PER_HOUR]}, 0]},
+                        None,
+                    ]},
+                }, {
+                    "ewma": "$$new_ewma",
+                    "slope": "$$new_slope",
+                    "acceleration": "$$new_acceleration",
+                    "age_hours": "$$age_hours",
+                    "updated_at": "$last_updated",
+                    "volume": "$$volume",
+                    "is_growing": {"$gt": ["$$volume", {"$ifNull": ["$$p.volume", "$$volume"]}]},
+                    "score": {"$round": [
+                        {"$divide": [
+                            {"$multiply": [
+                                {"$divide": [
+                                    {"$add": ["$$new_slope", {"$divide": ["$$new_acceleration", 2]}]},
+                                    {"$max": ["$$new_ewma", 1]},
+                                ]},
+                                {"$log10": {"$add": [1, {"$max": ["$$new_ewma", 0]}]}},
+                            ]},
+                            {"$add": [1, {"$divide": [{"$ifNull": ["$$age_hours", 0]}, 24]}]},
+                        ]},
+                        6,
+                    ]},
+                }),
+            )),
+        ),
+    ))
+
+
+# Runs after the per-trend $set stage, which leaves the new last_updated, `momentum_slice`
+# and this ingest's readings as `_slices` ([{k: slice key, v: volume}]) while `momentum`
+# still holds the previous states. Identical for every trend.
+MOMENTUM_STAGES = [
+    # documents written before states were kept per slice hold one flat state: start over
+    {"$set": {"_m": {"$cond": [
+        {"$eq": [{"$type": "$momentum.updated_at"}, "date"]},
+        {},
+        {"$ifNull": ["$momentum", {}]},
+    ]}}},
+    {"$set": {"momentum": {"$mergeObjects": [
+        "$_m",
+        {"$arrayToObject": {"$map": {
+            "input": "$_slices",
+            "as": "s",
+            "in": {"k": "$$s.k", "v": _next_state(_slice_state("$_m", "$$s.k"), "$$s.v")},
+        }}},
+    ]}}},
+    {"$set": {"_c": _slice_state("$momentum", "$momentum_slice")}},
+    {"$set": {
+        "momentum_score": {"$ifNull": ["$_c.score", 0]},
+        "is_growing": {"$ifNull": ["$_c.is_growing", False]},
+    }},
+    {"$unset": ["_m", "_c", "_slices"]},
+]
@@ -0,0 +1,122 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, List, Optional, Tuple
+
+from bson import ObjectId
+from bson.errors import InvalidId
+
+from app.db.mongodb import get_mongo_db
+
+# sort name -> document field; every sort is descending with _id as the tie-breaker
+SORT_FIELDS = {
+    "volume": "search_volume",
+    "momentum": "momentum_score",
+    "recency": "last_updated",
+}
+
+# Lists never need the per-trend history window or ingest bookkeeping
+LIST_PROJECTION = {"volume_history": 0, "content_hash": 0, "history_at": 0}
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(sort: str, value: Any, _id: ObjectId) -> str:
+    if isinstance(value, datetime):
+        value = {"$date": value.isoformat()}
+    raw = json.dumps({"s": sort, "v": value, "id": str(_id)}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str) -> Tuple[Any, ObjectId]:
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        value = data["v"]
+        if isinstance(value, dict):
+            value = datetime.fromisoformat(value["$date"])
+        _id = ObjectId(data["id"])
+    except (ValueError, KeyError, TypeError, InvalidId) as e:
+        raise InvalidCursor("Malformed cursor") from e
+    if data.get("s") != sort:
+        raise InvalidCursor("Cursor was issued for a different sort")
+    return value, _id
+
+
+def _after(field: str, value: Any, _id: ObjectId) -> dict:
+    """Documents strictly after (value, _id) in descending order; missing values sort last."""
+    if value is None:
+        return {field: None, "_id": {"$lt": _id}}
+    return {"$or": [
+        {field: {"$lt": value}},
+        {field: value, "_id": {"$lt": _id}},
+        {field: None},
+    ]}
+
+
+class TrendQuery:
+    """Keyset-paginated listing of `trending_searches` (no skip/offset scans)."""
+
+    def __init__(self, collection_name: str = "trending_searches"):
+        self.collection = get_mongo_db()[collection_name]
+
+    def find(
+        self,
+        status: Optional[str] = None,
+        category: Optional[str] = None,
+        subcategory: Optional[str] = None,
+        geo: Optional[str] = None,
+        is_growing: Optional[bool] = None,
+        min_volume: Optional[int] = None,
+        max_volume: Optional[int] = None,
+        sort: str = "momentum",
+        limit: int = 50,
+        cursor: Optional[str] = None,
+    ):
+        """The cursor for one page (plus one document to tell whether there is a next page)."""
+        field = SORT_FIELDS[sort]
+        query: dict = {}
+        for name, value in (
+            ("status", status),
+            ("category", category),
+            ("subcategory", subcategory),
+            ("geos", geo),
+            ("is_growing", is_growing),
+        ):
+            if value is not None:
+                query[name] = value
+        if min_volume is not None or max_volume is not None:
+            query["search_volume"] = {
+                k: v for k, v in (("$gte", min_volume), ("$lte", max_volume)) if v is not None
+            }
+        if cursor:
+            query = {"$and": [query, _after(field, *decode_cursor(cursor, sort))]}
+
+        return self.collection.find(query, LIST_PROJECTION).sort([(field, -1), ("_id", -1)]).limit(limit + 1)
+
+    async def list(
+        self,
+        status: Optional[str] = None,
+        category: Optional[str] = None,
+        subcategory: Optional[str] = None,
+        geo: Optional[str] = None,
+        is_growing: Optional[bool] = None,
+        min_volume: Optional[int] = None,
+        max_volume: Optional[int] = None,
+        sort: str = "momentum",
+        limit: int = 50,
+        cursor: Optional[str] = None,
+    ) -> Tuple[List[dict], Optional[str]]:
+        field = SORT_FIELDS[sort]
+        docs = await self.find(
+            status, category, subcategory, geo, is_growing, min_volume, max_volume, sort, limit, cursor
+        ).to_list(length=limit + 1)
+        next_cursor = None
+        if len(docs) > limit:
+            docs = docs[:limit]
+            last = docs[-1]
+            next_cursor = encode_cursor(sort, last.get(field), last["_id"])
+        for doc in docs:
+            doc["id"] = str(doc.pop("_id"))
+        return docs, next_cursor
@@ -1,49 +1,58 @@
 import asyncio
-import csv
-from datetime import datetime
-import tempfile
+from datetime import datetime, timedelta
 import os
-import io
-import re
-from dateutil import parser
-from motor.motor_asyncio import AsyncIOMotorClient
-from playwright.async_api import async_playwright
+import time
+from typing import List, Optional
 from app.db.mongodb import get_mongo_db
-from app.db.models.trends import TrendItem
-import pandas as pd
-from pymongo import UpdateOne
-from io import BytesIO
+from app.services.browser_pool import get_browser_pool
+from app.services.ingest_pool import get_ingest_pool
+from app.services.trend_categorizer import get_trend_categorizer
+from app.services.trend_series import get_trend_series
+from app.core.metrics import metrics
+from app.services.trend_ingest import (
+    TREND_HISTORY_INTERVAL_SECONDS,
+    TrendBatch,
+    chunked,
+    csv_fingerprint,
+    prepare_trend_batch,
+)
+
+TREND_SCRAPE_PARALLELISM = int(os.getenv("TREND_SCRAPE_PARALLELISM", "2"))
+
 
 class TrendsScraper:
     def __init__(self, collection_name: str = "trending_searches"):
         self.db = get_mongo_db()
         self.collection = self.db[collection_name]
-        asyncio.create_task(self._ensure_indexes()) # run async index creation
+        # Last ingested CSV fingerprint per scrape slice (geo/window), to skip identical re-scrapes
+        self.snapshots = self.db["trend_snapshots"]
 
-    async def _ensure_indexes(self):
-        await self.collection.create_index("trend", unique=True)
-        await self.collection.create_index("status")
-        await self.collection.create_index("category")
-        await self.collection.create_index("subcategory")
-        await self.collection.create_index("is_growing", 1),("category",1)
-        #await self.collection.create_index("last_updated", expireAfterSeconds=60 * 60 * 24)
+    async def top_rising(self, limit: int = 50) -> List[dict]:
+        """Highest momentum first, straight off the momentum_score index."""
+        cursor = self.collection.find({}, {"_id": 0}).sort([("momentum_score", -1), ("_id", -1)]).limit(limit)
+        return await cursor.to_list(length=limit)
 
     async def fetch_trending_csv_bytes(
         self,
         geo: str = "IN",
         hours: str = "168",
         sts: str = "active",
+    ) -> dict:
+        """Fetch trending CSV from Google Trends and ingest it into MongoDB."""
+        csv_bytes = await self.download_trending_csv(geo, hours, sts)
+        result = await self.save_csv_bytes_to_mongo_pandas(csv_bytes, geo, hours, snapshot_key=f"{geo}:{hours}:{sts}")
+        return {"result":result, "geo":geo, "hours":hours,"status":True}
+
+    async def download_trending_csv(
+        self,
+        geo: str = "IN",
+        hours: str = "168",
+        sts: str = "active",
     ) -> bytes:
-        """Fetch trending CSV from Google Trends and return CSV content as bytes."""
+        """Export the trending CSV from Google Trends and return its content as bytes."""
         url = f"https://trends.google.com/trending?geo={geo}&hours={hours}&status={sts}"
 
-        async with async_playwright() as p:
-            browser = await p.chromium.launch(
-                headless=True,  # change to False for debugging
-                args=["--no-sandbox"],
-            )
-            page = await browser.new_page(viewport={"width": 1280, "height": 720})
-
+        async with get_browser_pool().page() as page:
             # Step 1: Load page
             await page.goto(url, timeout=30000, wait_until="networkidle")
             await page.wait_for_timeout(2000)  # ensure JS renders
@@ -64,58 +73,71 @@ class TrendsScraper:
             ).first
             await download_button.wait_for(state="visible", timeout=10000)
 
-            # Step 5: Trigger download and save to temp file
+            # Step 5: Trigger download
             async with page.expect_download() as download_info:
                 await download_button.click(force=True)
 
             download = await download_info.value
 
-            # Step 6: Save to temporary file
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".csv") as tmp_file:
-                tmp_path = tmp_file.name
-            await download.save_as(tmp_path)
-
-            # Step 7: Read bytes from temp file
+            # Step 6: Read bytes straight from Playwright's download file (removed with the context)
+            tmp_path = await download.path()
             with open(tmp_path, "rb") as f:
-                csv_bytes = f.read()
-
-            # Step 8: Delete temp file
-            os.remove(tmp_path)
+                return f.read()
 
-            # Step 9: Close browser
-            await browser.close()
-
-            result = await self.save_csv_bytes_to_mongo_pandas(csv_bytes)
-
-        return {"result":result, "geo":geo, "hours":hours,"status":True}
-
-
-    @staticmethod
-    def parse_search_volume(volume_str: str) -> int:
+    async def scrape_matrix(
+        self,
+        geos: List[str],
+        windows: List[str],
+        sts: str = "active",
+        parallelism: Optional[int] = None,
+    ) -> dict:
         """
-        Convert '5M+', '20K+', '1.2M' to numeric integer.
-        Returns 0 if unknown or empty.
+        Scrape every geo x window slice concurrently (each in its own browser context of the
+        shared pool), then ingest all CSVs with one merged bulk write.
         """
-        if not volume_str:
-            return 0
-        
-        # Remove +, whitespace, commas
-        volume_str = volume_str.strip().replace("+", "").replace(",", "")
-        
-        # Regex to capture numbers with optional K/M suffix
-        match = re.match(r"^(\d*\.?\d+)([KMkm]?)$", volume_str)
-        if not match:
-            return 0
-        
-        number, suffix = match.groups()
-        number = float(number)
-        
-        if suffix.upper() == "K":
-            number *= 1_000
-        elif suffix.upper() == "M":
-            number *= 1_000_000
-        
-        return int(number)
+        started = time.perf_counter()
+        semaphore = asyncio.Semaphore(parallelism or TREND_SCRAPE_PARALLELISM)
+
+        async def run_slice(geo: str, hours: str):
+            slice_started = time.perf_counter()
+            async with semaphore:
+                try:
+                    csv_bytes = await self.download_trending_csv(geo, hours, sts)
+                    return csv_bytes, {"geo": geo, "hours": hours, "status": True, "rows": None,
+                                       "seconds": round(time.perf_counter() - slice_started, 3)}
+                except Exception as e:
+                    print(f"Scrape failed for geo={geo} hours={hours}: {e!r}")
+                    return None, {"geo": geo, "hours": hours, "status": False, "rows": 0, "error": repr(e),
+                                  "seconds": round(time.perf_counter() - slice_started, 3)}
+
+        outcomes = await asyncio.gather(*(run_slice(g, h) for g in geos for h in windows))
+        downloaded = [(csv_bytes, info) for csv_bytes, info in outcomes if csv_bytes is not None]
+
+        # Parse + merge every slice in one trip to the ingest process pool
+        ingest_started = time.perf_counter()
+        slices = [(csv_bytes, info["geo"], info["hours"]) for csv_bytes, info in downloaded]
+        snapshot_key = f"matrix:{sts}:" + "|".join(sorted(f"{info['geo']}:{info['hours']}" for _, info in downloaded))
+        fingerprint = csv_fingerprint([csv_bytes for csv_bytes, _, _ in slices])
+        ts_now = datetime.utcnow()
+
+        if await self._snapshot_unchanged(snapshot_key, fingerprint, ts_now):
+            result = self._empty_result()
+        else:
+            batch = await get_ingest_pool().run(prepare_trend_batch, slices, ts_now)
+            for (_, info), rows, error in zip(downloaded, batch.slice_rows, batch.slice_errors):
+                info["rows"] = rows
+                if error is not None:
+                    info.update(status=False, error=error)
+            result = await self._write_trend_batch(batch)
+            await self._record_snapshot(snapshot_key, fingerprint, ts_now)
+
+        return {
+            "result": result,
+            "slices": [info for _, info in outcomes],
+            "ingest_seconds": round(time.perf_counter() - ingest_started, 3),
+            "total_seconds": round(time.perf_counter() - started, 3),
+            "status": all(info["status"] for _, info in outcomes),
+        }
 
     # @staticmethod
     # def parse_datetime(dt_str: str):
@@ -133,107 +155,104 @@ class TrendsScraper:
     #         print("Failed to parse datetime:", dt_str, e)
     #         return None
 
-    async def save_csv_bytes_to_mongo_pandas(self, csv_bytes: bytes) -> dict:
-        """Parse CSV with Pandas, update MongoDB with volume history, growth, and Gemini categorization."""
+    async def save_csv_bytes_to_mongo_pandas(
+        self,
+        csv_bytes: bytes,
+        geo: Optional[str] = None,
+        hours: Optional[str] = None,
+        snapshot_key: Optional[str] = None,
+    ) -> dict:
+        """Parse CSV with Pandas, update MongoDB with volume history and growth, and queue categorization.
+        With a `snapshot_key`, a CSV identical to the last one ingested for that key is skipped."""
         ts_now = datetime.utcnow()
+        fingerprint = csv_fingerprint([csv_bytes])
+        if snapshot_key and await self._snapshot_unchanged(snapshot_key, fingerprint, ts_now):
+            return self._empty_result()
+
+        # Parsing and op building run in the ingest process pool; only Mongo I/O stays on the loop
+        batch = await get_ingest_pool().run(prepare_trend_batch, [(csv_bytes, geo, hours)], ts_now)
+        if batch.slice_errors[0] is not None:
+            raise ValueError(f"Could not parse trending CSV: {batch.slice_errors[0]}")
+        result = await self._write_trend_batch(batch)
+        if snapshot_key:
+            await self._record_snapshot(snapshot_key, fingerprint, ts_now)
+        return result
+
+    async def _snapshot_unchanged(self, key: str, fingerprint: str, ts_now: datetime) -> bool:
+        """Same CSV as last time, and no history point due yet -> nothing to write."""
+        doc = await self.snapshots.find_one({"_id": key})
+        if doc is None or doc.get("fingerprint") != fingerprint:
+            return False
+        if doc["written_at"] <= ts_now - timedelta(seconds=TREND_HISTORY_INTERVAL_SECONDS):
+            return False
+        metrics.incr("trend_ingest.unchanged_files")
+        return True
+
+    async def _record_snapshot(self, key: str, fingerprint: str, ts_now: datetime):
+        await self.snapshots.update_one(
+            {"_id": key},
+            {"$set": {"fingerprint": fingerprint, "written_at": ts_now}},
+            upsert=True,
+        )
 
-        # Load CSV into Pandas DataFrame
-        df = pd.read_csv(BytesIO(csv_bytes))
-        df.columns = [c.strip() for c in df.columns]
-
-        # Parse search volume & datetime
-        df["search_volume"] = df["Search volume"].fillna("0").apply(self.parse_search_volume)
-
-        # ✅ safer vectorized datetime parsing instead of row-wise .apply(self.parse_datetime)
-        df["started"] = pd.to_datetime(df["Started"], errors="coerce", utc=True)
-        df["ended"] = pd.to_datetime(df["Ended"], errors="coerce", utc=True)
-
-        df["trend_breakdown"] = df["Trend breakdown"].fillna("").str.strip()
-        df["explore_link"] = df["Explore link"]
-
-        # Filter out trends with zero search volume
-        df = df[df["search_volume"] > 0]
-
-        if df.empty:
-            return {
-                "processed_rows": 0,
-                "inserted_count": 0,
-                "matched_count": 0,
-                "modified_count": 0,
-                "categorized_count": 0,
-            }
-
-        trend_names = df["Trends"].str.strip().unique().tolist()
-
-        # Fetch existing trends from MongoDB
-        existing_docs = await self.collection.find({"trend": {"$in": trend_names}}).to_list(length=None)
-        existing_map = {doc["trend"]: doc for doc in existing_docs}
-
-        bulk_ops = []
-        uncategorized_trends = []
-
-        for _, row in df.iterrows():
-            trend_name = row["Trends"].strip()
-            existing_doc = existing_map.get(trend_name)
-
-            # Volume history
-            volume_history = existing_doc.get("volume_history", []) if existing_doc else []
-            volume_history.append({"ts": ts_now, "value": row["search_volume"]})
-            if len(volume_history) > 20:
-                volume_history = volume_history[-20:]
-
-            # Determine growth
-            is_growing = False
-            if len(volume_history) >= 2:
-                is_growing = volume_history[-1]["value"] > volume_history[-2]["value"]
-
-            trend_doc = {
-                "trend": trend_name,
-                "search_volume": row["search_volume"],
-                "started": row["started"].to_pydatetime() if pd.notna(row["started"]) else None,
-                "ended": row["ended"].to_pydatetime() if pd.notna(row["ended"]) else None,
-                "trend_breakdown": row["trend_breakdown"],
-                "explore_link": row["explore_link"],
-                "last_updated": ts_now,
-                "volume_history": volume_history,
-                "is_growing": is_growing,
-                "category": existing_doc.get("category") if existing_doc else None,
-                "subcategory": existing_doc.get("subcategory") if existing_doc else None,
-                "draft_id": existing_doc.get("draft_id") if existing_doc else None,
-                "status": existing_doc.get("status", "Open") if existing_doc else "Open",
-            }
-
-            if not trend_doc["category"] and is_growing:
-                uncategorized_trends.append(trend_name)
-
-            bulk_ops.append(UpdateOne({"trend": trend_name}, {"$set": trend_doc}, upsert=True))
-
-        # Bulk write all trends
-        bulk_result = None
-        if bulk_ops:
-            bulk_result = await self.collection.bulk_write(bulk_ops, ordered=False)
-
-        # Gemini categorization for new/uncategorized trends
-        categorized_count = 0
-        if uncategorized_trends:
-            # Mock Gemini call for now
-            gemini_results = {t: {"category": "Tech", "subcategory": "AI"} for t in uncategorized_trends}
-
-            gemini_bulk_ops = []
-            for t, cat in gemini_results.items():
-                gemini_bulk_ops.append(UpdateOne(
-                    {"trend": t},
-                    {"$set": {"category": cat["category"], "subcategory": cat["subcategory"]}}
-                ))
-
-            if gemini_bulk_ops:
-                gemini_result = await self.collection.bulk_write(gemini_bulk_ops, ordered=False)
-                categorized_count = gemini_result.modified_count
+    @staticmethod
+    def _empty_result(processed_rows: int = 0, unchanged_count: int = 0, skipped: bool = True) -> dict:
+        return {
+            "processed_rows": processed_rows,
+            "inserted_count": 0,
+            "matched_count": 0,
+            "modified_count": 0,
+            "unchanged_count": unchanged_count,
+            "categorization_queued": 0,
+            "skipped": skipped,
+        }
+
+    async def _stored_trend_state(self, names: List[str]) -> dict:
+        """Narrow read of what the diff needs: hash, last history point time and geos."""
+        existing = {}
+        for chunk in chunked(names):
+            cursor = self.collection.find(
+                {"trend": {"$in": chunk}},
+                {"_id": 0, "trend": 1, "content_hash": 1, "history_at": 1, "geos": 1},
+            )
+            async for doc in cursor:
+                existing[doc["trend"]] = doc
+        return existing
+
+    async def _write_trend_batch(self, batch: TrendBatch) -> dict:
+        if not batch.updates:
+            return self._empty_result(skipped=False)
+
+        # Only trends whose volume, breakdown or window changed (or whose history point is due)
+        total = len(batch.updates)
+        batch = batch.changed_since(await self._stored_trend_state(batch.trend_names))
+        unchanged_count = total - len(batch.updates)
+        metrics.incr("trend_ingest.rows_written", len(batch.updates))
+        metrics.incr("trend_ingest.rows_unchanged", unchanged_count)
+        if not batch.updates:
+            return self._empty_result(batch.processed_rows, unchanged_count, skipped=False)
+
+        # Bulk write all trends, in chunks so one huge export does not become one huge request
+        counts = {"inserted_count": 0, "matched_count": 0, "modified_count": 0}
+        for chunk in batch.op_chunks():
+            bulk_result = await self.collection.bulk_write(chunk, ordered=False)
+            counts["inserted_count"] += bulk_result.upserted_count
+            counts["matched_count"] += bulk_result.matched_count
+            counts["modified_count"] += bulk_result.modified_count
+
+        # Long-term per-geo history goes to the time-series collection, not the trend document
+        try:
+            await get_trend_series().record(batch.point_docs())
+        except Exception as e:
+            print(f"Recording trend volume points failed: {e!r}")
+
+        # Categorization runs in the background so it never adds to scrape latency
+        categorization_queued = get_trend_categorizer().submit(u.trend for u in batch.updates)
 
         return {
-            "processed_rows": len(df),
-            "inserted_count": bulk_result.upserted_count if bulk_result else 0,
-            "matched_count": bulk_result.matched_count if bulk_result else 0,
-            "modified_count": bulk_result.modified_count if bulk_result else 0,
-            "categorized_count": categorized_count,
+            "processed_rows": batch.processed_rows,
+            **counts,
+            "unchanged_count": unchanged_count,
+            "categorization_queued": categorization_queued,
+            "skipped": False,
         }
\ No newline at end of file
@@ -0,0 +1,204 @@
+import asyncio
+import math
+import os
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+
+from bson.raw_bson import RawBSONDocument
+
+from app.core.metrics import metrics
+from app.db.mongodb import get_mongo_db
+
+# Raw points are kept this long; older ranges are served from the rollups
+TREND_POINTS_TTL_DAYS = int(os.getenv("TREND_POINTS_TTL_DAYS", "30"))
+TREND_HOURLY_TTL_DAYS = int(os.getenv("TREND_HOURLY_TTL_DAYS", "400"))
+TREND_ROLLUP_INTERVAL_SECONDS = int(os.getenv("TREND_ROLLUP_INTERVAL_SECONDS", "900"))
+TREND_SERIES_MAX_POINTS = 1000
+
+POINTS_COLLECTION = "trend_volume_points"
+HOURLY_COLLECTION = "trend_volume_hourly"
+DAILY_COLLECTION = "trend_volume_daily"
+
+# resolution -> (collection, base bucket in seconds)
+RESOLUTIONS = {
+    "raw": (POINTS_COLLECTION, 60),
+    "hour": (HOURLY_COLLECTION, 3600),
+    "day": (DAILY_COLLECTION, 86400),
+}
+
+
+def as_naive_utc(dt: Optional[datetime]) -> Optional[datetime]:
+    """Stored timestamps are naive UTC; an aware bound (e.g. ...Z) is converted to match."""
+    if dt is None or dt.tzinfo is None:
+        return dt
+    return dt.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def pick_resolution(start: datetime, end: datetime) -> str:
+    """Finest resolution that still has data for the whole range and stays cheap to scan."""
+    span = end - start
+    if span <= timedelta(days=2) and start >= datetime.utcnow() - timedelta(days=TREND_POINTS_TTL_DAYS):
+        return "raw"
+    if span <= timedelta(days=90) and start >= datetime.utcnow() - timedelta(days=TREND_HOURLY_TTL_DAYS):
+        return "hour"
+    return "day"
+
+
+def _rollup_pipeline(match: dict, unit: str, into: str, raw: bool) -> list:
+    """Group points (raw) or finer buckets into `unit` buckets and upsert them into `into`."""
+    trend, geo = ("$meta.trend", "$meta.geo") if raw else ("$trend", "$geo")
+    return [
+        {"$match": match},
+        {"$sort": {"ts": 1}},
+        {"$group": {
+            "_id": {"trend": trend, "geo": geo, "ts": {"$dateTrunc": {"date": "$ts", "unit": unit}}},
+            "sum": {"$sum": "$value" if raw else "$sum"},
+            "count": {"$sum": 1 if raw else "$count"},
+            "min": {"$min": "$value" if raw else "$min"},
+            "max": {"$max": "$value" if raw else "$max"},
+            "last": {"$last": "$value" if raw else "$last"},
+        }},
+        {"$set": {"trend": "$_id.trend", "geo": "$_id.geo", "ts": "$_id.ts"}},
+        # _id is (trend, geo, bucket), so re-running a window just replaces its buckets
+        {"$merge": {"into": into, "whenMatched": "replace", "whenNotMatched": "insert"}},
+    ]
+
+
+class TrendSeries:
+    """
+    Long-term trend volume history.
+
+    Every ingest appends one point per (trend, geo) to a Mongo time-series collection
+    (meta = {trend, geo}) whose raw points expire after TREND_POINTS_TTL_DAYS. A background
+    loop rolls them up into hourly and daily bucket collections, so queries over months
+    read a few hundred pre-aggregated documents instead of every raw point.
+    """
+
+    def __init__(self, db=None):
+        self.db = db if db is not None else get_mongo_db()
+        self.points = self.db[POINTS_COLLECTION]
+        self.hourly = self.db[HOURLY_COLLECTION]
+        self.daily = self.db[DAILY_COLLECTION]
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        # Collections and indexes are declared in app.db.mongo_indexes
+        if self._task is None:
+            self._task = asyncio.create_task(self._rollup_loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    # --- writes ---
+    async def record(self, docs: List[RawBSONDocument]) -> int:
+        """Insert pre-encoded {ts, meta: {trend, geo}, value} points (built in the ingest pool)."""
+        if not docs:
+            return 0
+        await self.points.insert_many(docs, ordered=False)
+        metrics.incr("trend_series.points", len(docs))
+        return len(docs)
+
+    async def rollup(self, now: Optional[datetime] = None):
+        """
+        Recompute the current and previous hour from raw points, then the current and
+        previous day from hourly buckets. Idempotent, so overlapping runs are harmless.
+        """
+        now = now or datetime.utcnow()
+        hour_start = now.replace(minute=0, second=0, microsecond=0) - timedelta(hours=1)
+        day_start = now.replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=1)
+        await self.points.aggregate(
+            _rollup_pipeline({"ts": {"$gte": hour_start}}, "hour", HOURLY_COLLECTION, raw=True)
+        ).to_list(None)
+        await self.hourly.aggregate(
+            _rollup_pipeline({"ts": {"$gte": day_start}}, "day", DAILY_COLLECTION, raw=False)
+        ).to_list(None)
+        metrics.incr("trend_series.rollups")
+
+    async def _rollup_loop(self):
+        while True:
+            try:
+                await self.rollup()
+            except Exception as e:
+                print(f"Trend volume rollup failed: {e!r}")
+            await asyncio.sleep(TREND_ROLLUP_INTERVAL_SECONDS)
+
+    # --- reads ---
+    async def query(
+        self,
+        trend: str,
+        geo: Optional[str] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        resolution: str = "auto",
+        max_points: int = 500,
+    ) -> dict:
+        """
+        A trend's volume series over [start, end), downsampled to at most `max_points`
+        buckets. Without `geo`, buckets average over every geo the trend was seen in.
+        """
+        end = as_naive_utc(end) or datetime.utcnow()
+        start = as_naive_utc(start) or end - timedelta(days=7)
+        if resolution == "auto":
+            resolution = pick_resolution(start, end)
+        collection_name, base_seconds = RESOLUTIONS[resolution]
+        max_points = max(1, min(max_points, TREND_SERIES_MAX_POINTS))
+        bucket_seconds = max(base_seconds, math.ceil((end - start).total_seconds() / max_points))
+
+        raw = resolution == "raw"
+        trend_field, geo_field = ("meta.trend", "meta.geo") if raw else ("trend", "geo")
+        match = {trend_field: trend, "ts": {"$gte": start, "$lt": end}}
+        if geo is not None:
+            match[geo_field] = geo
+
+        pipeline = [
+            {"$match": match},
+            {"$sort": {"ts": 1}},
+            {"$group": {
+                "_id": {"$dateTrunc": {"date": "$ts", "unit": "second", "binSize": bucket_seconds}},
+                "sum": {"$sum": "$value" if raw else "$sum"},
+                "count": {"$sum": 1 if raw else "$count"},
+                "min": {"$min": "$value" if raw else "$min"},
+                "max": {"$max": "$value" if raw else "$max"},
+                "last": {"$last": "$value" if raw else "$last"},
+            }},
+            {"$sort": {"_id": 1}},
+            {"$project": {
+                "_id": 0,
+                "ts": "$_id",
+                "value": {"$round": [{"$divide": ["$sum", "$count"]}, 0]},
+                "min": 1,
+                "max": 1,
+                "last": 1,
+                "count": 1,
+            }},
+        ]
+        points = await self.db[collection_name].aggregate(pipeline).to_list(None)
+        return {
+            "trend": trend,
+            "geo": geo,
+            "resolution": resolution,
+            "bucket_seconds": bucket_seconds,
+            "start": start,
+            "end": end,
+            "points": points,
+        }
+
+
+trend_series: Optional[TrendSeries] = None
+
+
+def get_trend_series() -> TrendSeries:
+    global trend_series
+    if trend_series is None:
+        trend_series = TrendSeries()
+    return trend_series
+
+
+async def close_trend_series():
+    global trend_series
+    if trend_series is not None:
+        await trend_series.stop()
+        trend_series = None
@@ -1,21 +1,29 @@
 import os
 from email.message import EmailMessage
+from typing import List, Optional, Tuple
 from aiosmtplib import send
 import httpx
 from dotenv import load_dotenv
 
+from app.core.metrics import metrics
+
 load_dotenv()
 
+# "brevo" sends through the Brevo API; "fake" keeps messages in memory (local dev / tests)
+EMAIL_PROVIDER = os.getenv("EMAIL_PROVIDER", "brevo").lower()
+EMAIL_MAX_CONNECTIONS = int(os.getenv("EMAIL_MAX_CONNECTIONS", "10"))
+EMAIL_TIMEOUT = float(os.getenv("EMAIL_TIMEOUT", "10"))
+
 # Render is blocking smtp port 587 --- so we need to use a transactional email API- Brevo API
 # async def send_email_otp(to_email: str, otp: str):
 #     message = EmailMessage()
 #     from_email = os.getenv("EMAIL_USERNAME")
-#     
+#
 #     message["From"] = from_email
 #     message["To"] = to_email
 #     message["Subject"] = "Your OTP for ExplainIt.Tech"
 #     message.set_content(f"Your OTP is: {otp}\nIt will expire in 5 minutes.")
-# 
+#
 #     await send(
 #         message,
 #         hostname=os.getenv("EMAIL_HOST"),
@@ -25,26 +33,94 @@ load_dotenv()
 #         start_tls=True,   # ✅ this enables STARTTLS for Outlook
 #     )
 
-async def send_email_otp(to_email:str, otp:str):
-    BREVO_API_KEY = os.getenv("BREVO_API_KEY")
-    BREVO_SENDER = os.getenv("EMAIL_USERNAME")
-    url = os.getenv("BREVO_URL")
-
-    headers = {
-        "accept": "application/json",
-        "content-type": "application/json",
-        "api-key": BREVO_API_KEY
-    }
-
-    data = {
-        "sender": {"email": BREVO_SENDER, "name": "Explainit.tech"},
-        "to": [{"email": to_email}],
-        "subject": "Login OTP for Explainit.tech",
-        "htmlContent": f"<html><head></head><body><p>Hello,</p>This is Your OTP is:{otp}</p> <p>It will expire in 5 minutes.</p><p>Thank you.</p></body></html>"
-    }
-
-    
-    async with httpx.AsyncClient() as client:
-        response = await client.post(url, headers=headers, json=data)
+def render_otp_email(otp: str) -> Tuple[str, str]:
+    """(subject, html) of the login OTP email."""
+    subject = "Login OTP for Explainit.tech"
+    html = f"<html><head></head><body><p>Hello,</p>This is Your OTP is:{otp}</p> <p>It will expire in 5 minutes.</p><p>Thank you.</p></body></html>"
+    return subject, html
+
+
+class BrevoEmailClient:
+    """Brevo transactional email API over one pooled keep-alive httpx client."""
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        sender: Optional[str] = None,
+        url: Optional[str] = None,
+        max_connections: int = EMAIL_MAX_CONNECTIONS,
+    ):
+        self.sender = sender or os.getenv("EMAIL_USERNAME")
+        self.url = url or os.getenv("BREVO_URL")
+        self._http = httpx.AsyncClient(
+            headers={
+                "accept": "application/json",
+                "content-type": "application/json",
+                "api-key": api_key or os.getenv("BREVO_API_KEY") or "",
+            },
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+                keepalive_expiry=60,
+            ),
+            timeout=httpx.Timeout(EMAIL_TIMEOUT, connect=5.0),
+        )
+
+    async def send(self, to_email: str, subject: str, html: str) -> dict:
+        """Send one email; raises on transport errors and non-2xx responses."""
+        data = {
+            "sender": {"email": self.sender, "name": "Explainit.tech"},
+            "to": [{"email": to_email}],
+            "subject": subject,
+            "htmlContent": html,
+        }
+        response = await self._http.post(self.url, json=data)
         response.raise_for_status()
-        return {"status": True, "response": response}
\ No newline at end of file
+        metrics.incr("email.sent", provider="brevo")
+        return {"status": True, "response": response}
+
+    async def aclose(self):
+        await self._http.aclose()
+
+
+class FakeEmailProvider:
+    """Keeps sent messages in `sent` instead of delivering them; fails the first `fail_times` sends."""
+
+    def __init__(self, fail_times: int = 0):
+        self.sent: List[dict] = []
+        self.fail_times = fail_times
+        self.calls = 0
+
+    async def send(self, to_email: str, subject: str, html: str) -> dict:
+        self.calls += 1
+        if self.calls <= self.fail_times:
+            raise RuntimeError(f"fake email provider failure {self.calls}/{self.fail_times}")
+        self.sent.append({"to": to_email, "subject": subject, "html": html})
+        print(f"[fake email] to={to_email} subject={subject!r}")
+        metrics.incr("email.sent", provider="fake")
+        return {"status": True, "response": None}
+
+    async def aclose(self):
+        pass
+
+
+email_client = None
+
+
+def get_email_client():
+    global email_client
+    if email_client is None:
+        email_client = FakeEmailProvider() if EMAIL_PROVIDER == "fake" else BrevoEmailClient()
+    return email_client
+
+
+async def close_email_client():
+    global email_client
+    if email_client is not None:
+        await email_client.aclose()
+        email_client = None
+
+
+async def send_email_otp(to_email:str, otp:str):
+    subject, html = render_otp_email(otp)
+    return await get_email_client().send(to_email, subject, html)
@@ -0,0 +1,65 @@
+"""
+HTTP validators for cacheable GET responses: strong ETags, Last-Modified and the
+If-None-Match / If-Modified-Since checks that turn a repeat request into a 304.
+"""
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Mapping, Optional
+
+from fastapi import Response
+
+from app.core.metrics import metrics
+from app.core.responses import RawJSONResponse
+
+
+def _as_utc(dt: datetime) -> datetime:
+    return dt.astimezone(timezone.utc) if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+
+def make_etag(updated_at: Optional[datetime], body: bytes) -> str:
+    """Strong ETag: the row's modification time plus a hash of the exact bytes served."""
+    stamp = int(_as_utc(updated_at).timestamp()) if updated_at else 0
+    return f'"{stamp:x}-{hashlib.sha256(body).hexdigest()[:32]}"'
+
+
+def http_date(dt: datetime) -> str:
+    return format_datetime(_as_utc(dt), usegmt=True)
+
+
+def is_not_modified(headers: Mapping[str, str], etag: Optional[str], last_modified: Optional[datetime]) -> bool:
+    """RFC 9110 13.2.2: If-None-Match wins; If-Modified-Since is only used without it."""
+    if_none_match = headers.get("if-none-match")
+    if if_none_match is not None:
+        if etag is None:
+            return False
+        tags = [tag.strip() for tag in if_none_match.split(",")]
+        # weak comparison, so a W/ tag from a compressing proxy still matches
+        return "*" in tags or any(tag.removeprefix("W/") == etag for tag in tags)
+
+    if_modified_since = headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = _as_utc(parsedate_to_datetime(if_modified_since))
+        except (TypeError, ValueError):
+            return False
+        # HTTP dates have one-second resolution
+        return _as_utc(last_modified).replace(microsecond=0) <= since
+    return False
+
+
+def cached_json_response(
+    headers: Mapping[str, str],
+    body: bytes,
+    etag: str,
+    last_modified: Optional[datetime],
+    cache_control: str,
+) -> Response:
+    """A pre-rendered JSON body with its validators, or a bodiless 304 if the client's copy is current."""
+    response_headers = {"ETag": etag, "Cache-Control": cache_control}
+    if last_modified is not None:
+        response_headers["Last-Modified"] = http_date(last_modified)
+    if is_not_modified(headers, etag, last_modified):
+        metrics.incr("http_cache.not_modified")
+        return Response(status_code=304, headers=response_headers)
+    return RawJSONResponse(body, headers=response_headers)
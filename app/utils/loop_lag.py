@@ -0,0 +1,19 @@
+import asyncio
+import time
+
+from app.core.metrics import metrics
+
+LOOP_LAG_INTERVAL = 0.25
+
+
+async def monitor_loop_lag(interval: float = LOOP_LAG_INTERVAL):
+    """
+    Sleep `interval` in a loop and record how late each wake-up is. Anything that blocks
+    the event loop (CPU work, sync I/O) shows up as `event_loop.lag_seconds`.
+    """
+    while True:
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        lag = max(time.perf_counter() - started - interval, 0.0)
+        metrics.observe("event_loop.lag_seconds", lag)
+        metrics.gauge("event_loop.lag_last_seconds", round(lag, 4))
@@ -0,0 +1,50 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Set
+
+from app.core.metrics import metrics
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls for the same key: the first caller runs the work,
+    every caller that arrives while it is running awaits the same result.
+
+    The work runs in its own task, so a caller that disconnects does not cancel
+    it for the others.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[str, asyncio.Future] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        metrics.register_gauges(f"singleflight.{name}", lambda: {"inflight": len(self._calls)})
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._calls
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        fut = self._calls.get(key)
+        if fut is not None:
+            metrics.incr("singleflight.shared", name=self.name)
+            return await asyncio.shield(fut)
+
+        metrics.incr("singleflight.leader", name=self.name)
+        fut = asyncio.get_running_loop().create_future()
+        # Mark the exception as retrieved even if every waiter has gone away
+        fut.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._calls[key] = fut
+
+        def finish(task: asyncio.Task):
+            self._tasks.discard(task)
+            self._calls.pop(key, None)
+            if task.cancelled():
+                fut.cancel()
+            elif task.exception() is not None:
+                fut.set_exception(task.exception())
+            else:
+                fut.set_result(task.result())
+
+        task = asyncio.ensure_future(fn())
+        self._tasks.add(task)
+        task.add_done_callback(finish)
+        return await asyncio.shield(fut)
@@ -0,0 +1,16 @@
+from typing import AsyncIterator
+
+from app.core.responses import dumps
+
+
+async def ndjson_stream(events: AsyncIterator[dict]) -> AsyncIterator[bytes]:
+    """One JSON document per line (application/x-ndjson)."""
+    async for event in events:
+        yield dumps(event) + b"\n"
+
+
+async def sse_stream(events: AsyncIterator[dict]) -> AsyncIterator[bytes]:
+    """Server-Sent Events; the event's "event" key becomes the SSE event name."""
+    async for event in events:
+        name = event.get("event", "message")
+        yield b"event: " + name.encode() + b"\ndata: " + dumps(event) + b"\n\n"
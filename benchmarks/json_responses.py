@@ -0,0 +1,118 @@
+"""
+Serialization cost per response, FastAPI's default path vs app.core.responses, for the
+payloads the API actually returns. No server or database needed.
+
+- keyword:       KeywordResponse (response_model route, e.g. POST /keywords)
+- keyword batch: KeywordBatchResponse with 100 keywords
+- trends:        a trending_searches page as returned by /admin/trends/rising (dicts with
+                 datetimes, ObjectIds and the momentum subdocument, no response_model)
+
+    python -m benchmarks.json_responses [iterations]
+"""
+import asyncio
+import sys
+import time
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+from starlette.responses import JSONResponse
+
+from app.core.responses import FastJSONResponse, dumps
+from app.schemas.keyword import KeywordBatchItem, KeywordBatchResponse, KeywordResponse, KeywordSuggestion
+
+
+def keyword_payload(i: int = 0, suggestions: int = 40) -> KeywordResponse:
+    sources = ["google_autocomplete", "google_related", "youtube", "news"]
+    return KeywordResponse(
+        keyword=f"keyword {i}",
+        suggestions=[
+            KeywordSuggestion(suggestion=f"keyword {i} suggestion {n}", source=sources[n % len(sources)])
+            for n in range(suggestions)
+        ],
+        monthly_searches=12000,
+        cpc=0.42,
+    )
+
+
+def batch_payload(keywords: int = 100) -> KeywordBatchResponse:
+    return KeywordBatchResponse(
+        results=[KeywordBatchItem(keyword=f"keyword {i}", status="created", data=keyword_payload(i, 10)) for i in range(keywords)],
+        counts={"created": keywords},
+    )
+
+
+def trend_payload(rows: int = 200) -> list:
+    now = datetime(2026, 1, 1, 12, 0)
+    return [
+        {
+            "_id": ObjectId(),
+            "trend": f"trend {i}",
+            "search_volume": 20000 + i,
+            "started": now - timedelta(hours=i),
+            "ended": None,
+            "trend_breakdown": f"trend {i} news,trend {i} live",
+            "explore_link": f"https://trends.google.com/explore?q=trend+{i}",
+            "geos": ["IN", "US"],
+            "last_updated": now,
+            "status": "Open",
+            "category": "Sports",
+            "subcategory": None,
+            "is_growing": True,
+            "momentum": {"IN:24": {
+                "ewma": 1234.5, "slope": 12.25, "acceleration": -0.5, "age_hours": 3.0, "updated_at": now,
+                "volume": 2000, "is_growing": True, "score": 0.012345,
+            }},
+            "momentum_slice": "IN:24",
+            "momentum_score": 0.012345,
+            "volume_history": [{"ts": now - timedelta(hours=h), "value": 1000 * h} for h in range(6)],
+        }
+        for i in range(rows)
+    ]
+
+
+def per_call_us(fn, iterations: int) -> float:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+def main(iterations: int):
+    loop = asyncio.new_event_loop()
+
+    def fastapi_model(model_cls, value):
+        """What FastAPI does for a response_model route: validate, serialize, stdlib json render."""
+        field = create_model_field(name="Response", type_=model_cls, mode="serialization")
+        return lambda: JSONResponse(loop.run_until_complete(serialize_response(field=field, response_content=value))).body
+
+    def fastapi_plain(value):
+        """No response_model: jsonable_encoder, then stdlib json render."""
+        return lambda: JSONResponse(jsonable_encoder(value, custom_encoder={ObjectId: str})).body
+
+    keyword = keyword_payload()
+    batch = batch_payload()
+    trends = trend_payload()
+    cases = [
+        ("keyword", fastapi_model(KeywordResponse, keyword),
+         lambda: KeywordResponse.__pydantic_serializer__.to_json(keyword, by_alias=True)),
+        ("keyword batch (100)", fastapi_model(KeywordBatchResponse, batch),
+         lambda: KeywordBatchResponse.__pydantic_serializer__.to_json(batch, by_alias=True)),
+        ("trends (200 rows)", fastapi_plain(trends), lambda: FastJSONResponse(trends).body),
+    ]
+
+    print(f"{'payload':<22} {'bytes':>8} {'fastapi us':>11} {'fast us':>9} {'speedup':>8}")
+    for name, legacy, fast in cases:
+        assert len(fast()) > 2
+        legacy_us = per_call_us(legacy, iterations)
+        fast_us = per_call_us(fast, iterations)
+        print(f"{name:<22} {len(fast()):>8} {legacy_us:>11.1f} {fast_us:>9.1f} {legacy_us / fast_us:>7.1f}x")
+
+    # the default encoder cannot emit ObjectIds at all; the fast path handles them natively
+    assert dumps({"_id": ObjectId("0" * 24)}) == b'{"_id":"000000000000000000000000"}'
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 500)
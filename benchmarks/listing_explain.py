@@ -0,0 +1,92 @@
+"""
+Query plans of the trend listing shapes against the declared trending_searches indexes.
+Fills a scratch collection in MONGODB_URI / MONGO_DB_NAME with synthetic trends, builds
+the declared indexes on it, runs explain() for every listing shape and drops it again.
+A plan with an in-memory SORT stage is flagged unless the shape is expected to have one.
+
+    python -m benchmarks.listing_explain [rows]
+"""
+import asyncio
+import random
+import sys
+from datetime import datetime, timedelta
+
+from app.db.mongo_indexes import INDEXES
+from app.db.mongodb import get_mongo_db
+from app.services.trend_query import TrendQuery
+
+SCRATCH = "trending_searches_explain"
+
+# (filters, sort, expected index or None for an in-memory sort)
+SHAPES = [
+    ({}, "momentum", "momentum_score_-1__id_-1"),
+    ({}, "volume", "search_volume_-1__id_-1"),
+    ({"min_volume": 1000, "max_volume": 50000}, "volume", "search_volume_-1__id_-1"),
+    ({}, "recency", None),
+    ({"status": "Open", "geo": "IN"}, "momentum", "status_1_geos_1_momentum_score_-1__id_-1"),
+    ({"status": "Open", "geo": "IN"}, "volume", "status_1_geos_1_search_volume_-1__id_-1"),
+    ({"status": "Open", "geo": "IN"}, "recency", "status_1_geos_1_last_updated_-1__id_-1"),
+    ({"status": "Open", "geo": "IN", "category": "Sports", "is_growing": True}, "momentum",
+     "status_1_geos_1_momentum_score_-1__id_-1"),
+    ({"status": "Open"}, "momentum", "momentum_score_-1__id_-1"),
+    ({"geo": "US"}, "volume", "search_volume_-1__id_-1"),
+    ({"category": "Sports", "subcategory": "Cricket"}, "momentum", "momentum_score_-1__id_-1"),
+    ({"is_growing": True}, "momentum", "momentum_score_-1__id_-1"),
+]
+
+
+def make_docs(rows: int) -> list:
+    now = datetime.utcnow()
+    rng = random.Random(7)
+    return [
+        {
+            "trend": f"trend {i}",
+            "search_volume": rng.choice([200, 500, 1000, 2000, 5000, 10000, 50000, 100000]),
+            "momentum_score": round(rng.uniform(-0.5, 0.5), 6),
+            "last_updated": now - timedelta(minutes=rng.randrange(10_000)),
+            "status": rng.choice(["Open", "Open", "Open", "Processed", "Ignored"]),
+            "geos": rng.sample(["IN", "US", "GB", "BR"], rng.randint(1, 2)),
+            "category": rng.choice(["Sports", "Politics", "Entertainment", None]),
+            "subcategory": rng.choice(["Cricket", "Football", None]),
+            "is_growing": rng.random() < 0.3,
+        }
+        for i in range(rows)
+    ]
+
+
+def _stages(plan: dict) -> list:
+    stages = [plan]
+    for child in [plan.get("inputStage"), *plan.get("inputStages", [])]:
+        if child:
+            stages += _stages(child)
+    return stages
+
+
+async def main(rows: int):
+    db = get_mongo_db()
+    collection = db[SCRATCH]
+    await collection.drop()
+    try:
+        await collection.insert_many(make_docs(rows))
+        await collection.create_indexes(INDEXES["trending_searches"])
+        query = TrendQuery(SCRATCH)
+        print(f"{'shape':<62} {'index':<42} {'sort':>5} {'keys':>7} {'docs':>7}")
+        for filters, sort, expected in SHAPES:
+            plan = await query.find(**filters, sort=sort, limit=50).explain()
+            stages = _stages(plan["queryPlanner"]["winningPlan"])
+            index = next((s["indexName"] for s in stages if s.get("stage") == "IXSCAN"), "COLLSCAN")
+            in_memory = any(s.get("stage") == "SORT" for s in stages)
+            stats = plan.get("executionStats", {})
+            ok = (expected is None and in_memory) or (index == expected and not in_memory)
+            shape = f"{filters or 'none'} by {sort}"
+            print(
+                f"{shape:<62} {index:<42} {'mem' if in_memory else 'idx':>5} "
+                f"{stats.get('totalKeysExamined', '-'):>7} {stats.get('totalDocsExamined', '-'):>7}"
+                f"{'' if ok else '  <- expected ' + (expected or 'in-memory sort')}"
+            )
+    finally:
+        await collection.drop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 20_000))
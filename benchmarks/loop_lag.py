@@ -0,0 +1,61 @@
+"""
+Event-loop lag while a large trending CSV is ingested, parsing inline on the loop vs in
+the ingest process pool. A ticker sleeps 10ms in a loop; lag is how late it wakes up,
+i.e. how long any other request on the same worker would have been stuck. No Mongo needed.
+
+    python -m benchmarks.loop_lag [rows ...]
+"""
+import asyncio
+import sys
+import time
+from datetime import datetime
+
+from app.services.ingest_pool import IngestPool
+from app.services.trend_ingest import prepare_trend_batch
+from benchmarks.trend_ingest import make_csv
+
+TICK = 0.01
+
+
+async def ticker(lags: list, stop: asyncio.Event):
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(TICK)
+        lags.append(max(time.perf_counter() - started - TICK, 0.0))
+
+
+async def measure(pool: IngestPool, csv_bytes: bytes) -> dict:
+    lags: list = []
+    stop = asyncio.Event()
+    tick = asyncio.create_task(ticker(lags, stop))
+    await asyncio.sleep(5 * TICK)
+    started = time.perf_counter()
+    await pool.run(prepare_trend_batch, [(csv_bytes, "IN", "24")], datetime.utcnow())
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await tick
+    lags.sort()
+    return {
+        "seconds": elapsed,
+        "max_lag": lags[-1],
+        "p99_lag": lags[int(len(lags) * 0.99) - 1] if len(lags) > 1 else lags[-1],
+    }
+
+
+async def main(sizes):
+    inline = IngestPool(workers=0)
+    pooled = IngestPool(workers=2)
+    await pooled.start()
+    print(f"{'rows':>8} {'mode':>7} {'ingest s':>9} {'max lag ms':>11} {'p99 lag ms':>11}")
+    try:
+        for rows in sizes:
+            csv_bytes = make_csv(rows)
+            for mode, pool in (("inline", inline), ("pool", pooled)):
+                r = await measure(pool, csv_bytes)
+                print(f"{rows:>8} {mode:>7} {r['seconds']:>9.2f} {r['max_lag'] * 1000:>11.1f} {r['p99_lag'] * 1000:>11.1f}")
+    finally:
+        await pooled.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main([int(a) for a in sys.argv[1:]] or [10_000, 100_000]))
@@ -0,0 +1,100 @@
+"""
+Rows/second of the CPU side of the trending CSV ingest (parse + bulk op construction),
+legacy row-wise path vs the vectorized one. No Mongo needed.
+
+    python -m benchmarks.trend_ingest [1000 10000 100000]
+"""
+import re
+import sys
+import time
+from datetime import datetime
+from io import BytesIO
+
+import pandas as pd
+from pymongo import UpdateOne
+
+from app.services.trend_ingest import build_trend_ops, load_csv_frame
+
+VOLUMES = ["200+", "1K+", "20K+", "5M+", "1.2M", "", "50K+", "2,000+"]
+
+
+def make_csv(rows: int) -> bytes:
+    lines = ["Trends,Search volume,Started,Ended,Trend breakdown,Explore link"]
+    for i in range(rows):
+        ended = "" if i % 3 else '"September 21, 2025 at 1:30:00 PM UTC+5:30"'
+        lines.append(
+            f'trend {i},"{VOLUMES[i % len(VOLUMES)]}","September 20, 2025 at 10:00:00 AM UTC+5:30",'
+            f'{ended},"trend {i} news,trend {i} live",https://trends.google.com/explore?q=trend+{i}'
+        )
+    return ("\n".join(lines) + "\n").encode()
+
+
+def parse_search_volume(volume_str: str) -> int:
+    """The previous per-value parser: '5M+', '20K+', '1.2M' -> int, 0 if unknown or empty."""
+    if not volume_str:
+        return 0
+    volume_str = volume_str.strip().replace("+", "").replace(",", "")
+    match = re.match(r"^(\d*\.?\d+)([KMkm]?)$", volume_str)
+    if not match:
+        return 0
+    number, suffix = match.groups()
+    number = float(number)
+    if suffix.upper() == "K":
+        number *= 1_000
+    elif suffix.upper() == "M":
+        number *= 1_000_000
+    return int(number)
+
+
+def legacy_ingest(csv_bytes: bytes):
+    """The previous implementation: .apply per volume, iterrows, to_pydatetime per row."""
+    ts_now = datetime.utcnow()
+    df = pd.read_csv(BytesIO(csv_bytes))
+    df.columns = [c.strip() for c in df.columns]
+    df["search_volume"] = df["Search volume"].fillna("0").apply(parse_search_volume)
+    df["started"] = pd.to_datetime(df["Started"], errors="coerce", utc=True)
+    df["ended"] = pd.to_datetime(df["Ended"], errors="coerce", utc=True)
+    df["trend_breakdown"] = df["Trend breakdown"].fillna("").str.strip()
+    df["explore_link"] = df["Explore link"]
+    df = df[df["search_volume"] > 0]
+    ops = []
+    for _, row in df.iterrows():
+        doc = {
+            "trend": row["Trends"].strip(),
+            "search_volume": row["search_volume"],
+            "started": row["started"].to_pydatetime() if pd.notna(row["started"]) else None,
+            "ended": row["ended"].to_pydatetime() if pd.notna(row["ended"]) else None,
+            "trend_breakdown": row["trend_breakdown"],
+            "explore_link": row["explore_link"],
+            "last_updated": ts_now,
+            "volume_history": [{"ts": ts_now, "value": row["search_volume"]}],
+        }
+        ops.append(UpdateOne({"trend": doc["trend"]}, {"$set": doc}, upsert=True))
+    return ops
+
+
+def vectorized_ingest(csv_bytes: bytes):
+    ops = build_trend_ops(load_csv_frame(csv_bytes, "IN", "24"), datetime.utcnow())
+    return ops
+
+
+def bench(fn, csv_bytes: bytes, rows: int) -> float:
+    started = time.perf_counter()
+    fn(csv_bytes)
+    return rows / (time.perf_counter() - started)
+
+
+def main(sizes):
+    import warnings
+
+    warnings.simplefilter("ignore")  # dateutil fallback warning on the legacy path
+    print(f"{'rows':>8} {'legacy rows/s':>15} {'vectorized rows/s':>19} {'speedup':>8}")
+    for rows in sizes:
+        csv_bytes = make_csv(rows)
+        legacy = bench(legacy_ingest, csv_bytes, rows)
+        vectorized = bench(vectorized_ingest, csv_bytes, rows)
+        print(f"{rows:>8} {legacy:>15,.0f} {vectorized:>19,.0f} {vectorized / legacy:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or [1_000, 10_000, 100_000])
@@ -9,6 +9,8 @@ import app.db.models.email_otp
 import app.db.models.token
 import app.db.models.keyword
 import app.db.models.article
+import app.db.models.email_outbox
+import app.db.models.cache_version
 
 
 load_dotenv()
@@ -0,0 +1 @@
+ALTER TABLE email_otps ADD COLUMN attempts INTEGER DEFAULT 0 NOT NULL;
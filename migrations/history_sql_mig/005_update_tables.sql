@@ -0,0 +1,16 @@
+CREATE TABLE email_outbox (
+	id SERIAL NOT NULL, 
+	to_email VARCHAR NOT NULL, 
+	subject VARCHAR NOT NULL, 
+	html_content TEXT NOT NULL, 
+	status VARCHAR DEFAULT 'pending' NOT NULL, 
+	attempts INTEGER DEFAULT 0 NOT NULL, 
+	next_attempt_at TIMESTAMP WITHOUT TIME ZONE DEFAULT now() NOT NULL, 
+	last_error TEXT, 
+	created_at TIMESTAMP WITHOUT TIME ZONE DEFAULT now(), 
+	PRIMARY KEY (id)
+)
+
+;
+
+CREATE INDEX ix_email_outbox_due ON email_outbox (status, next_attempt_at);
@@ -0,0 +1 @@
+CREATE INDEX ix_articles_status_published_at ON articles (status, published_at);
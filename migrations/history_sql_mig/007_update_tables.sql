@@ -0,0 +1,4 @@
+ALTER TABLE email_outbox ADD COLUMN expires_at TIMESTAMP WITHOUT TIME ZONE;
+
+-- Permanently failed rows are no longer kept; they may contain OTP codes
+DELETE FROM email_outbox WHERE status = 'failed';
@@ -0,0 +1,6 @@
+-- Declared by the model (id index=True) but missing from 005
+CREATE INDEX ix_email_outbox_id ON email_outbox (id);
+
+-- The sender compares these with datetime.utcnow(); now() in a naive column is the server's local time
+ALTER TABLE email_outbox ALTER COLUMN next_attempt_at SET DEFAULT timezone('utc', now());
+ALTER TABLE email_outbox ALTER COLUMN created_at SET DEFAULT timezone('utc', now());
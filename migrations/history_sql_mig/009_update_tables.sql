@@ -0,0 +1,7 @@
+CREATE TABLE cache_versions (
+	name VARCHAR NOT NULL, 
+	version BIGINT DEFAULT '0' NOT NULL, 
+	PRIMARY KEY (name)
+)
+
+;
@@ -0,0 +1,47 @@
+import asyncio
+
+from app.services.article_service import ArticleCache, RenderedResponse
+
+
+class VersionSession:
+    """Session stand-in whose only query is the cache_versions lookup."""
+
+    version = 0
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        pass
+
+    async def execute(self, query):
+        version = VersionSession.version
+
+        class Result:
+            def scalar_one_or_none(self):
+                return version
+        return Result()
+
+
+def test_write_in_another_worker_clears_the_cache_on_sync():
+    cache = ArticleCache(session_factory=VersionSession)
+    entry = RenderedResponse(b"{}", '"1-abc"')
+
+    async def go():
+        await cache.sync()
+        cache.articles.set("hello", entry, 60)
+        cache.lists.set("1:20::", entry, 60)
+
+        await cache.sync()                      # nothing written
+        assert cache.articles.get("hello") is entry
+
+        cache.invalidate("other", version=1)    # a write in this worker
+        VersionSession.version = 1
+        await cache.sync()
+        assert cache.articles.get("hello") is entry
+
+        VersionSession.version = 2              # a write in another worker
+        await cache.sync()
+        assert cache.articles.get("hello") is None and len(cache.lists) == 0
+
+    asyncio.run(go())
@@ -0,0 +1,29 @@
+import pytest
+from fastapi import HTTPException
+from jose import jwt
+
+from app.core import security
+from app.core.auth import TokenVerifier
+
+
+def forged_token() -> str:
+    return jwt.encode({"sub": "admin@example.com", "exp": 4102444800}, security.DEFAULT_SECRET_KEY, algorithm=security.ALGORITHM)
+
+
+def test_placeholder_secret_is_refused(monkeypatch):
+    monkeypatch.setattr(security, "SECRET_KEY", security.DEFAULT_SECRET_KEY)
+    with pytest.raises(security.InsecureSecretKey):
+        security.check_secret_key()
+    with pytest.raises(security.InsecureSecretKey):
+        security.create_access_token({"sub": "admin@example.com"})
+    with pytest.raises(HTTPException) as e:
+        TokenVerifier().verify(forged_token())
+    assert e.value.status_code == 401
+
+
+def test_configured_secret_round_trips(monkeypatch):
+    monkeypatch.setattr(security, "SECRET_KEY", "a-real-secret")
+    token = security.create_access_token({"sub": "admin@example.com"})
+    assert TokenVerifier().verify(token)["sub"] == "admin@example.com"
+    with pytest.raises(HTTPException):
+        TokenVerifier().verify(forged_token())
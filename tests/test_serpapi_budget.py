@@ -0,0 +1,43 @@
+import asyncio
+
+import pytest
+
+from app.services.serpapi_budget import SerpApiBudget
+
+
+class FlakyUsage:
+    """serpapi_usage stand-in whose month update fails `failures` times."""
+
+    def __init__(self, failures: int):
+        self.failures = failures
+        self.docs = {}
+
+    async def find_one_and_update(self, filter, update, upsert, return_document):
+        key = filter["_id"]
+        if key.startswith("month:") and self.failures:
+            self.failures -= 1
+            raise ConnectionError("mongo down")
+        doc = self.docs.setdefault(key, {"_id": key})
+        for field, value in update.get("$inc", {}).items():
+            doc[field] = doc.get(field, 0) + value
+        return doc
+
+
+def test_failed_month_flush_does_not_double_count_the_day():
+    usage = FlakyUsage(failures=1)
+    budget = SerpApiBudget(daily_credits=100, monthly_credits=1000, global_rate=0, engine_rates={}, engine_costs={},
+                           db={"serpapi_usage": usage})
+
+    async def go():
+        for _ in range(3):
+            await budget.acquire("google")
+        budget.refund("google")
+        with pytest.raises(ConnectionError):
+            await budget.flush()
+        await budget.flush()
+
+    asyncio.run(go())
+    day, month = (usage.docs[budget._periods[name]] for name in ("day", "month"))
+    assert day["credits"] == 2 and day["engines.google"] == 2
+    assert month["credits"] == 2
+    assert budget.spent("day") == 2 and budget.spent("month") == 2
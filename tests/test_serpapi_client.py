@@ -0,0 +1,54 @@
+import asyncio
+
+import httpx
+
+from app.services.serpapi_budget import SerpApiBudget
+from app.services.serpapi_client import SerpApiClient
+
+
+def make_client(handler):
+    budget = SerpApiBudget(daily_credits=10, global_rate=0, engine_rates={}, engine_costs={}, db={"serpapi_usage": None})
+    client = SerpApiClient(
+        api_key="test-key", base_url="https://serpapi.test/search.json",
+        budget=budget, transport=httpx.MockTransport(handler),
+    )
+    return client, budget
+
+
+def run(client, params):
+    async def go():
+        try:
+            return await client.search(params)
+        finally:
+            await client.aclose()
+    return asyncio.run(go())
+
+
+def test_success_returns_json_and_charges():
+    seen = {}
+
+    def handler(request):
+        seen.update(request.url.params)
+        return httpx.Response(200, json={"suggestions": [{"value": "python"}]})
+
+    client, budget = make_client(handler)
+    result = run(client, {"engine": "google_autocomplete", "q": "pyth"})
+
+    assert result == {"suggestions": [{"value": "python"}]}
+    assert seen["api_key"] == "test-key" and seen["q"] == "pyth" and seen["output"] == "json"
+    assert budget.spent("day") == 1
+
+
+def test_non_200_returns_empty_and_refunds():
+    client, budget = make_client(lambda request: httpx.Response(500, text="upstream error"))
+    assert run(client, {"engine": "google", "q": "x"}) == {}
+    assert budget.spent("day") == 0
+
+
+def test_timeout_returns_empty_and_refunds():
+    def handler(request):
+        raise httpx.ReadTimeout("timed out", request=request)
+
+    client, budget = make_client(handler)
+    assert run(client, {"engine": "google_trends", "q": "x"}) == {}
+    assert budget.spent("day") == 0
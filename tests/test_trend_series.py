@@ -0,0 +1,73 @@
+from datetime import datetime, timedelta
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.trend_keyword import keyword_routes
+from app.services.trend_series import TrendSeries, pick_resolution
+
+
+class FakeCursor:
+    async def to_list(self, length):
+        return []
+
+
+class FakeCollection:
+    def __init__(self, name, pipelines):
+        self.name, self.pipelines = name, pipelines
+
+    def aggregate(self, pipeline):
+        self.pipelines.append((self.name, pipeline))
+        return FakeCursor()
+
+
+class FakeDb:
+    def __init__(self):
+        self.pipelines = []
+
+    def __getitem__(self, name):
+        return FakeCollection(name, self.pipelines)
+
+
+def make_client() -> TestClient:
+    app = FastAPI()
+    app.include_router(keyword_routes.router, prefix="/trends")
+    return TestClient(app)
+
+
+def test_z_suffixed_range_is_queried_as_naive_utc(monkeypatch):
+    db = FakeDb()
+    monkeypatch.setattr(keyword_routes, "get_trend_series", lambda: TrendSeries(db=db))
+
+    start = (datetime.utcnow() - timedelta(hours=6)).replace(microsecond=0)
+    end = start + timedelta(hours=3)
+    response = make_client().get("/trends/series", params={
+        "trend": "python",
+        "start": start.isoformat() + "Z",
+        "end": (end + timedelta(hours=5, minutes=30)).isoformat() + "+05:30",
+    })
+
+    assert response.status_code == 200, response.text
+    assert response.json()["resolution"] == "raw"
+    collection, pipeline = db.pipelines[0]
+    assert collection == "trend_volume_points"
+    assert pipeline[0]["$match"]["ts"] == {"$gte": start, "$lt": end}
+
+
+def test_reversed_range_is_rejected_across_offsets():
+    response = make_client().get("/trends/series", params={
+        "trend": "python", "start": "2026-01-02T00:00:00Z", "end": "2026-01-02T03:00:00+05:00",
+    })
+    assert response.status_code == 400
+    # an aware bound against a naive one
+    response = make_client().get("/trends/series", params={
+        "trend": "python", "start": "2026-01-02T05:00:00Z", "end": "2026-01-02T03:00:00",
+    })
+    assert response.status_code == 400
+
+
+def test_pick_resolution_by_span():
+    now = datetime.utcnow()
+    assert pick_resolution(now - timedelta(days=1), now) == "raw"
+    assert pick_resolution(now - timedelta(days=30), now) == "hour"
+    assert pick_resolution(now - timedelta(days=365), now) == "day"